@@ -0,0 +1,110 @@
+"""Time the local CLI search index: building it, updating it, and queries.
+
+    $ python benchmarks/cli_search.py [iterations] [--synthetic]
+
+Uses the full topic reference and hierarchy from the upstream, or a
+generated corpus of a similar size with --synthetic (or when the upstream
+can't be reached).  The update re-indexes a corpus with 1% of its nodes
+changed, as happens when a source changes between refreshes.
+"""
+
+import itertools
+import random
+import statistics
+import sys
+import time
+
+from jnpr_pathfinder_mcp import resources, search
+from jnpr_pathfinder_mcp.server import cli_explorer
+
+QUERIES = [
+    "show bgp neighbor",
+    "protocols bgp group",
+    "interfaces unit family inet address",
+    "set system login user",
+    "ospf area interface",
+    "firewall filter term",
+    "show route table",
+    "mpls lsp",
+    "class-of-service schedulers",
+    "request system reboot",
+]
+
+# the CLI's keywords, then a long tail of rarer words, drawn with a Zipf
+# like distribution as in real documentation.
+KEYWORDS = """
+    bgp ospf isis mpls ldp rsvp evpn vxlan interfaces unit family inet inet6 address filter
+    term policy statement route table neighbor group system login user services snmp syslog
+    chassis fpc pic port class scheduler forwarding security zone
+""".split()
+VOCABULARY = KEYWORDS + [f"word{n}" for n in range(20000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def generated_corpus() -> list[tuple]:
+    rng = random.Random(7)
+    documents = []
+    for n in range(60000):
+        depth = rng.randint(1, 6)
+        segments = rng.choices(VOCABULARY[: len(KEYWORDS) * 4], k=depth)
+        path = "/".join(segments[:-1] + [f"{segments[-1]}-{n}"])
+        text = " ".join(rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(5, 40)))
+        documents.append(cli_explorer._search_document("hierarchy", path, {"description": text}))
+    return documents
+
+
+def live_corpus() -> list[tuple]:
+    reference = cli_explorer.upstream.get(
+        "topic_reference", cli_explorer.URLS["topic_reference"], verify=cli_explorer.VERIFY_SSL
+    )
+    hierarchy = cli_explorer._fetch_hierarchy()
+    return list(
+        itertools.chain(
+            cli_explorer._tree_documents("reference", resources.document(reference)),
+            cli_explorer._tree_documents("hierarchy", resources.document(hierarchy)),
+        )
+    )
+
+
+def summary(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"median {statistics.median(samples):8.1f} us  p99 {p99:8.1f} us"
+
+
+def main(iterations: int, synthetic: bool) -> None:
+    corpus = None
+    if not synthetic:
+        try:
+            corpus = live_corpus()
+        except Exception as e:
+            print(f"upstream unavailable ({e}), using a generated corpus")
+    if corpus is None:
+        corpus = generated_corpus()
+
+    index = search.BM25Index()
+    start = time.perf_counter()
+    index.update(corpus)
+    print(f"build   {len(corpus):7d} documents  {time.perf_counter() - start:8.3f} s")
+
+    rng = random.Random(11)
+    changed = list(corpus)
+    for i in rng.sample(range(len(changed)), len(changed) // 100):
+        key, path, text, fields = changed[i]
+        changed[i] = (key, path, text + " changed", fields)
+    start = time.perf_counter()
+    counts = index.update(changed)
+    print(f"update  {counts['changed']:7d} changed    {time.perf_counter() - start:8.3f} s")
+
+    for query in QUERIES:
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            total, _ = index.search(query, limit=20)
+            samples.append((time.perf_counter() - start) * 1e6)
+        print(f"{query:38} {total:6d} matches  {summary(samples)}")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--synthetic"]
+    main(int(args[0]) if args else 200, "--synthetic" in sys.argv)
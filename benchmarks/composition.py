@@ -0,0 +1,58 @@
+"""Compare tool listing and call dispatch latency of the composition modes.
+
+    $ python benchmarks/composition.py [iterations]
+
+Each mode composes the three sub-servers onto a fresh root server, and a
+no-op `ping` tool is added to the HCT server beforehand, so the call timings
+are the cost of dispatch through the root server and not of the upstream.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from fastmcp import Client, FastMCP  # type: ignore
+
+from jnpr_pathfinder_mcp.server import pathfinder
+from jnpr_pathfinder_mcp.server.hct import mcp as hct_mcp
+
+
+@hct_mcp.tool
+def ping() -> str:
+    """Do nothing, quickly."""
+    return "pong"
+
+
+async def timings(client: Client, operation, iterations: int) -> list[float]:
+    await operation(client)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await operation(client)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def summary(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return f"median {statistics.median(samples):8.1f} us  p99 {p99:8.1f} us"
+
+
+async def main(iterations: int) -> None:
+    operations = {
+        "list_tools": lambda client: client.list_tools(),
+        "call_tool": lambda client: client.call_tool("juniper_hardware_compatibility_tool_ping"),
+    }
+    for mode in ("mount", "static"):
+        server = pathfinder.compose(FastMCP(f"bench_{mode}"), mode)
+        async with Client(server) as client:
+            tools = len(await client.list_tools())
+            for name, operation in operations.items():
+                samples = await timings(client, operation, iterations)
+                print(f"{mode:6} {name:10} ({tools} tools)  {summary(samples)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
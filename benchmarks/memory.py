@@ -0,0 +1,83 @@
+"""Compare the memory held by the catalogs as dicts and as records.
+
+    $ python benchmarks/memory.py [cache_dir]
+
+Uses the platform_catalog and hct_component_catalog snapshots from the cache
+directory (or $JNPR_PATHFINDER_CACHE_DIR) when they're there, and a
+generated catalog of a similar size when they aren't.  Both forms are built
+from the same decoded JSON text, the way they're loaded from a snapshot.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+from jnpr_pathfinder_mcp import records
+
+
+def generated_snapshots() -> dict[str, str]:
+    platforms = {
+        f"model_{family}_{n}": {
+            "family": f"family_{family}_series",
+            "product_key": 1000 * family + n,
+        }
+        for family in range(30)
+        for n in range(40)
+    }
+    components = [
+        {
+            "name": f"PART-{category}-{n:04d}",
+            "category": f"Category {category} Optics and Transceivers",
+            "category_key": str(category),
+            "description": f"Component {n} of category {category}",
+        }
+        for category in range(40)
+        for n in range(200)
+    ]
+    platform_entries = [
+        {"platform": f"PLATFORM{n}", "family": f"Family {n % 12}", "series": f"Series {n % 48}"}
+        for n in range(1200)
+    ]
+    return {
+        "platform_catalog": json.dumps(platforms),
+        "hct_component_catalog": json.dumps(components),
+        "hct_platforms": json.dumps(platform_entries),
+    }
+
+
+def snapshots(cache_dir: str | None) -> dict[str, str]:
+    found = generated_snapshots()
+    if cache_dir:
+        for name in ("platform_catalog", "hct_component_catalog"):
+            path = Path(cache_dir) / f"{name}.json"
+            if path.exists():
+                found[name] = path.read_text(encoding="utf-8")
+    return found
+
+
+def as_records(name: str, text: str):
+    snapshot = json.loads(text)
+    if name == "platform_catalog":
+        return {sys.intern(k): records.CatalogEntry(**v) for k, v in snapshot.items()}
+    if name == "hct_component_catalog":
+        return [records.Component(**component) for component in snapshot]
+    return [records.Platform(**platform) for platform in snapshot]
+
+
+def main(cache_dir: str | None) -> None:
+    total_before = total_after = 0
+    for name, text in snapshots(cache_dir).items():
+        before = records.deep_size(json.loads(text))
+        after = records.deep_size(as_records(name, text))
+        total_before += before
+        total_after += after
+        print(f"{name:24} dicts {before / 1024:9.1f} KiB  records {after / 1024:9.1f} KiB")
+    print(
+        f"{'total':24} dicts {total_before / 1024:9.1f} KiB  records {total_after / 1024:9.1f} KiB"
+        f"  ({total_after / total_before:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else os.environ.get("JNPR_PATHFINDER_CACHE_DIR"))
@@ -4,7 +4,11 @@ from jnpr_pathfinder_mcp.server.pathfinder import mcp
 from jnpr_pathfinder_mcp.helpers import run_cli
 
 def main():
-    run_cli(prog="Juniper Pathfinder Apps MCP Server", server=mcp)
+    run_cli(
+        prog="Juniper Pathfinder Apps MCP Server",
+        server=mcp,
+        import_path="jnpr_pathfinder_mcp.server.pathfinder:mcp",
+    )
 
 if __name__ == "__main__":  # pragma: no cover
     main()
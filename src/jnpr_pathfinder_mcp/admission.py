@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Any, Optional
+
+from fastmcp import FastMCP  # type: ignore
+from fastmcp.exceptions import ToolError  # type: ignore
+from fastmcp.server.dependencies import get_http_request  # type: ignore
+from fastmcp.server.middleware import Middleware, MiddlewareContext  # type: ignore
+
+log = logging.getLogger(__name__)
+
+## Admission control for tool calls served over http.
+##
+## Calls beyond the in-flight limits (global, and per tool for expensive
+## ones) wait in a bounded queue.  Once the queue is full, or a call has
+## waited QUEUE_TIMEOUT seconds, it's rejected straight away with a hint of
+## when to retry, instead of piling up until clients time out.  That keeps
+## the latency of admitted calls close to their own run time.  Optionally,
+## each client is held to a number of calls running or waiting at once, so
+## one runaway agent can't fill the queue for everyone.
+##
+## Limits apply per process, so with --workers N the server admits up to N
+## times as many calls.
+
+# tool calls running at once, 0 disables admission control.
+MAX_IN_FLIGHT = int(os.environ.get("JNPR_PATHFINDER_MAX_IN_FLIGHT", "32"))
+# per tool limits, e.g. "feature_tree=2,product_keys=1", by name or prefixed name.
+TOOL_LIMITS_ENV = "JNPR_PATHFINDER_TOOL_LIMITS"
+# calls waiting for a slot, more are rejected.
+MAX_QUEUE = int(os.environ.get("JNPR_PATHFINDER_MAX_QUEUE", "64"))
+# seconds a call waits for a slot before it's rejected.
+QUEUE_TIMEOUT = float(os.environ.get("JNPR_PATHFINDER_QUEUE_TIMEOUT", "10"))
+# calls one client can have running or waiting at once, 0 for no quota.
+CLIENT_QUOTA = int(os.environ.get("JNPR_PATHFINDER_CLIENT_QUOTA", "0"))
+# clients identify themselves with this header, or are known by address.
+CLIENT_HEADER = "x-client-id"
+# weight of the newest sample in the average call duration.
+DURATION_ALPHA = 0.2
+
+
+def _configured_limits() -> dict[str, int]:
+    limits: dict[str, int] = {}
+    for item in os.environ.get(TOOL_LIMITS_ENV, "").split(","):
+        if not item.strip():
+            continue
+        name, _, limit = item.partition("=")
+        limits[name.strip()] = int(limit)
+    return limits
+
+
+def _client_id() -> str:
+    try:
+        request = get_http_request()
+    except RuntimeError:
+        return "local"
+    client_id = request.headers.get(CLIENT_HEADER)
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "unknown"
+
+
+class RejectedError(ToolError):
+    """A tool call turned away because the server is busy."""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Server busy ({reason}), retry after {retry_after:.0f}s.")
+
+
+class AdmissionControl(Middleware):
+    """Limits tool calls in flight, globally and per tool, with a bounded queue."""
+
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        tool_limits: Optional[dict[str, int]] = None,
+        max_queue: int = MAX_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT,
+        client_quota: int = CLIENT_QUOTA,
+    ):
+        self.max_in_flight = max_in_flight
+        self.tool_limits = _configured_limits() if tool_limits is None else tool_limits
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_quota = client_quota
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tool_slots: dict[str, asyncio.Semaphore] = {}
+        self._clients: dict[str, int] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.duration: Optional[float] = None
+        self.counts = dict.fromkeys(("admitted", "queued", "queue_full", "timeout", "quota"), 0)
+
+    def _tool_semaphore(self, tool: str) -> Optional[asyncio.Semaphore]:
+        if tool not in self._tool_slots:
+            limit = self.tool_limits.get(tool)
+            if limit is None:
+                matches = [n for n in self.tool_limits if tool.endswith(f"_{n}")]
+                limit = self.tool_limits[max(matches, key=len)] if matches else None
+            self._tool_slots[tool] = asyncio.Semaphore(limit) if limit else None  # type: ignore
+        return self._tool_slots[tool]
+
+    def retry_after(self) -> float:
+        """How long until a slot is likely to be free for a new call: the
+        queue ahead of it, worked off at the average call duration."""
+        duration = self.duration if self.duration is not None else 1.0
+        return max(1.0, math.ceil(duration * (self.waiting + 1) / self.max_in_flight))
+
+    async def _acquire(self, semaphore: asyncio.Semaphore, deadline: float) -> None:
+        try:
+            await asyncio.wait_for(semaphore.acquire(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.counts["timeout"] += 1
+            raise RejectedError("timed out waiting for a slot", self.retry_after()) from None
+
+    async def _admit(self, tool: str) -> list[asyncio.Semaphore]:
+        """Wait for the global slot and the tool's, returning the semaphores held."""
+        held = []
+        tool_semaphore = self._tool_semaphore(tool)
+        semaphores = [self._slots] + ([tool_semaphore] if tool_semaphore else [])
+        if any(s.locked() for s in semaphores):
+            if self.waiting >= self.max_queue:
+                self.counts["queue_full"] += 1
+                raise RejectedError("queue full", self.retry_after())
+            self.counts["queued"] += 1
+        deadline = time.monotonic() + self.queue_timeout
+        self.waiting += 1
+        try:
+            # the tool's own slot first, so a call waiting on a busy tool
+            # doesn't hold a global slot others could use.
+            for semaphore in reversed(semaphores):
+                await self._acquire(semaphore, deadline)
+                held.append(semaphore)
+        except BaseException:
+            for semaphore in held:
+                semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+        return held
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: Any) -> Any:
+        if self.max_in_flight <= 0:
+            return await call_next(context)
+        tool = context.message.name
+        client = _client_id()
+        if self.client_quota and self._clients.get(client, 0) >= self.client_quota:
+            self.counts["quota"] += 1
+            raise RejectedError(f"client {client} has {self.client_quota} calls pending", 1.0)
+        self._clients[client] = self._clients.get(client, 0) + 1
+        try:
+            held = await self._admit(tool)
+            self.counts["admitted"] += 1
+            self.in_flight += 1
+            started = time.monotonic()
+            try:
+                return await call_next(context)
+            finally:
+                elapsed = time.monotonic() - started
+                self.duration = (
+                    elapsed
+                    if self.duration is None
+                    else self.duration + DURATION_ALPHA * (elapsed - self.duration)
+                )
+                self.in_flight -= 1
+                for semaphore in held:
+                    semaphore.release()
+        except RejectedError as e:
+            log.info("on_call_tool - rejected %s from %s: %s", tool, client, e.reason)
+            raise
+        finally:
+            self._clients[client] -= 1
+            if not self._clients[client]:
+                del self._clients[client]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "tool_limits": self.tool_limits,
+            "client_quota": self.client_quota,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "clients": len(self._clients),
+            "average_duration_ms": None
+            if self.duration is None
+            else round(self.duration * 1000, 1),
+            **self.counts,
+        }
+
+
+def install(server: FastMCP) -> Optional[AdmissionControl]:
+    """Add admission control to a server, once, unless it's disabled."""
+    for middleware in server.middleware:
+        if isinstance(middleware, AdmissionControl):
+            return middleware
+    if MAX_IN_FLIGHT <= 0:
+        return None
+    control = AdmissionControl()
+    server.add_middleware(control)
+    return control
+
+
+def stats(server: FastMCP) -> Optional[dict[str, Any]]:
+    """The admission statistics of a server, or None if it has no admission control."""
+    for middleware in server.middleware:
+        if isinstance(middleware, AdmissionControl):
+            return middleware.stats()
+    return None
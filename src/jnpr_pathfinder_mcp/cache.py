@@ -0,0 +1,144 @@
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from jnpr_pathfinder_mcp import tracing
+
+log = logging.getLogger(__name__)
+
+# Worker processes are spawned, not forked, so the cache location is passed
+# to them through the environment.
+CACHE_DIR_ENV = "JNPR_PATHFINDER_CACHE_DIR"
+# snapshots older than this many seconds are rebuilt, 0 keeps them forever.
+SNAPSHOT_MAX_AGE = float(os.environ.get("JNPR_PATHFINDER_SNAPSHOT_MAX_AGE", "86400"))
+# snapshots of state updated by tool calls are written this many seconds after
+# the first change, with every change made in the meantime.
+SNAPSHOT_WRITE_DELAY = float(os.environ.get("JNPR_PATHFINDER_SNAPSHOT_WRITE_DELAY", "5"))
+
+_warmers: dict[str, Callable[[], Any]] = {}
+# snapshot name -> the function building its latest value, for the writes pending.
+_pending: dict[str, Callable[[], Any]] = {}
+_pending_lock = threading.Lock()
+
+
+def configure(cache_dir: str) -> None:
+    """Set the directory used for snapshots shared between processes."""
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    os.environ[CACHE_DIR_ENV] = str(cache_dir)
+
+
+def cache_dir() -> Optional[Path]:
+    """Return the shared snapshot directory, or None if snapshots are disabled."""
+    path = os.environ.get(CACHE_DIR_ENV)
+    return Path(path) if path else None
+
+
+def _snapshot_path(name: str) -> Optional[Path]:
+    directory = cache_dir()
+    if directory is None:
+        return None
+    return directory / f"{name}.json"
+
+
+@tracing.traced("cache load_snapshot")
+def load_snapshot(name: str) -> Optional[Any]:
+    """Load a snapshot written by this or another process.
+
+    Returns: the decoded snapshot, or None if there isn't one or it's older
+        than SNAPSHOT_MAX_AGE.
+    """
+    path = _snapshot_path(name)
+    tracing.annotate({"pathfinder.cache.name": name, "pathfinder.cache.hit": False})
+    if path is None or not path.exists():
+        return None
+    try:
+        age = time.time() - path.stat().st_mtime
+        if SNAPSHOT_MAX_AGE and age > SNAPSHOT_MAX_AGE:
+            log.info("load_snapshot - %s is %.0fs old, rebuilding", path, age)
+            return None
+        with path.open("r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        tracing.annotate({"pathfinder.cache.hit": True})
+        return snapshot
+    except (OSError, ValueError) as e:
+        log.warning("load_snapshot - ignoring unreadable snapshot %s: %s", path, e)
+        return None
+
+
+def save_snapshot(name: str, value: Any) -> None:
+    """Atomically write a snapshot so concurrent readers never see a partial file."""
+    path = _snapshot_path(name)
+    if path is None:
+        return
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def register_warmer(name: str, warmer: Callable[[], Any]) -> None:
+    """Register a function that fills a cache, run by warm() before workers start."""
+    _warmers[name] = warmer
+
+
+def warm() -> None:
+    """Run all registered warmers, logging (but not raising) failures."""
+    for name, warmer in _warmers.items():
+        try:
+            log.info("warm - warming %s", name)
+            warmer()
+        except Exception as e:
+            log.exception("warm - failed to warm %s: %s", name, e)
+
+
+def save_snapshot_soon(name: str, build: Callable[[], Any]) -> None:
+    """Write the snapshot `build()` returns within SNAPSHOT_WRITE_DELAY seconds.
+
+    For state that changes on every tool call: changes until the write are
+    written together, and `build` is only called once, when writing.
+    Pending writes are also made at exit.
+    """
+    if cache_dir() is None:
+        return
+    if SNAPSHOT_WRITE_DELAY <= 0:
+        save_snapshot(name, build())
+        return
+    with _pending_lock:
+        scheduled = name in _pending
+        _pending[name] = build
+    if not scheduled:
+        timer = threading.Timer(SNAPSHOT_WRITE_DELAY, _write_pending, (name,))
+        timer.daemon = True
+        timer.start()
+
+
+def _write_pending(name: str) -> None:
+    with _pending_lock:
+        build = _pending.pop(name, None)
+    if build is None:
+        return
+    try:
+        save_snapshot(name, build())
+    except (OSError, TypeError, ValueError) as e:
+        log.warning("_write_pending - couldn't write snapshot %s: %s", name, e)
+
+
+def flush_snapshots() -> None:
+    """Make the pending snapshot writes now."""
+    with _pending_lock:
+        names = list(_pending)
+    for name in names:
+        _write_pending(name)
+
+
+atexit.register(flush_snapshots)
@@ -0,0 +1,232 @@
+import argparse
+import functools
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+log = logging.getLogger(__name__)
+
+## An offline copy of the Pathfinder datasets in one memory-mapped file.
+##
+## The file is split into sections (HCT components and platforms, features
+## by key, CLI hierarchy nodes by path), each a table of fixed size entries
+## sorted by key, pointing at the key's bytes and at its value: a zlib
+## compressed JSON block.  Opening the file only reads the section
+## directory, lookups binary search the table in place, and only the blocks
+## that are read are decompressed, so every server process can map the same
+## file, sharing its pages, at almost no cost however big it is.
+##
+## Layout (little endian):
+##   magic, section count (I)
+##   per section: name length (H), name, entry count (I), table offset (Q)
+##   keys and blocks
+##   per section, a table of entries: key offset (Q), key length (I),
+##     block offset (Q), block length (I)
+
+DATASET_ENV = "JNPR_PATHFINDER_DATASET"
+MAGIC = b"JPFDSET1"
+COMPRESSION_LEVEL = 6
+
+HCT_COMPONENTS = "hct_component"
+HCT_PLATFORMS = "hct_platform"
+FEATURES = "feature"
+CLI_PATHS = "cli_path"
+
+_COUNT = struct.Struct("<I")
+_DIRECTORY = struct.Struct("<IQ")
+_NAME = struct.Struct("<H")
+_ENTRY = struct.Struct("<QIQI")
+
+
+class DatasetWriter:
+    """Collects keyed values by section and writes them as a dataset file."""
+
+    def __init__(self) -> None:
+        self._sections: dict[str, dict[bytes, bytes]] = {}
+
+    def add(self, section: str, key: str, value: Any) -> None:
+        block = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        self._sections.setdefault(section, {})[key.encode("utf-8")] = zlib.compress(
+            block, COMPRESSION_LEVEL
+        )
+
+    def write(self, path: str | Path) -> None:
+        """Atomically write the dataset, so processes with the old file mapped
+        keep reading it undisturbed."""
+        path = Path(path)
+        names = sorted(self._sections)
+        header = len(MAGIC) + _COUNT.size
+        header += sum(_NAME.size + len(name.encode("utf-8")) + _DIRECTORY.size for name in names)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(b"\0" * header)
+                tables = {}
+                for name in names:
+                    entries = []
+                    for key, block in sorted(self._sections[name].items()):
+                        key_offset = f.tell()
+                        f.write(key)
+                        entries.append((key_offset, len(key), f.tell(), len(block)))
+                        f.write(block)
+                    tables[name] = entries
+                directory = [MAGIC, _COUNT.pack(len(names))]
+                for name in names:
+                    encoded = name.encode("utf-8")
+                    directory += [
+                        _NAME.pack(len(encoded)),
+                        encoded,
+                        _DIRECTORY.pack(len(tables[name]), f.tell()),
+                    ]
+                    f.write(b"".join(_ENTRY.pack(*entry) for entry in tables[name]))
+                f.seek(0)
+                f.write(b"".join(directory))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+class Dataset:
+    """A dataset file, mapped read-only."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{self.path} is not a dataset file.")
+        self.sections: dict[str, tuple[int, int]] = {}
+        offset = len(MAGIC)
+        (count,) = _COUNT.unpack_from(self._mm, offset)
+        offset += _COUNT.size
+        for _ in range(count):
+            (length,) = _NAME.unpack_from(self._mm, offset)
+            offset += _NAME.size
+            name = self._mm[offset : offset + length].decode("utf-8")
+            offset += length
+            self.sections[name] = _DIRECTORY.unpack_from(self._mm, offset)
+            offset += _DIRECTORY.size
+
+    def __len__(self) -> int:
+        return len(self._mm)
+
+    def _entry(self, section: str, i: int) -> tuple[int, int, int, int]:
+        return _ENTRY.unpack_from(self._mm, self.sections[section][1] + i * _ENTRY.size)
+
+    def _key(self, entry: tuple[int, int, int, int]) -> bytes:
+        return self._mm[entry[0] : entry[0] + entry[1]]
+
+    def _value(self, entry: tuple[int, int, int, int]) -> Any:
+        return json.loads(zlib.decompress(self._mm[entry[2] : entry[2] + entry[3]]))
+
+    def get(self, section: str, key: str, default: Any = None) -> Any:
+        """The value for a key, by binary search of the section's table."""
+        if section not in self.sections:
+            return default
+        wanted = key.encode("utf-8")
+        lo, hi = 0, self.sections[section][0]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(section, mid)
+            found = self._key(entry)
+            if found == wanted:
+                return self._value(entry)
+            if found < wanted:
+                lo = mid + 1
+            else:
+                hi = mid
+        return default
+
+    def keys(self, section: str) -> Iterator[str]:
+        for i in range(self.sections.get(section, (0, 0))[0]):
+            yield self._key(self._entry(section, i)).decode("utf-8")
+
+    def values(self, section: str) -> Iterator[Any]:
+        for i in range(self.sections.get(section, (0, 0))[0]):
+            yield self._value(self._entry(section, i))
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+@functools.lru_cache(maxsize=4)
+def _open(path: str) -> Optional[Dataset]:
+    try:
+        dataset = Dataset(path)
+    except (OSError, ValueError) as e:
+        log.warning("_open - ignoring unusable dataset %s: %s", path, e)
+        return None
+    log.info("_open - mapped %s, %d bytes, sections %s", path, len(dataset), list(dataset.sections))
+    return dataset
+
+
+def current() -> Optional[Dataset]:
+    """The dataset named by JNPR_PATHFINDER_DATASET, or None if there isn't one."""
+    path = os.environ.get(DATASET_ENV)
+    return _open(path) if path else None
+
+
+def section(name: str) -> Optional[Dataset]:
+    """The current dataset if it has a section, or None."""
+    dataset = current()
+    return dataset if dataset is not None and name in dataset.sections else None
+
+
+def build(path: str | Path) -> dict[str, int]:
+    """Fetch the datasets from the upstream and write them to a dataset file.
+
+    Returns: the number of entries written to each section.
+    """
+    from jnpr_pathfinder_mcp.server import cli_explorer, feature_explorer, hct
+
+    configured = os.environ.pop(DATASET_ENV, None)
+    try:
+        # read from the upstream, not from a dataset loaded earlier.
+        hct._platform_hierarchy.cache_clear()
+        writer = DatasetWriter()
+        counts = dict.fromkeys((HCT_COMPONENTS, HCT_PLATFORMS, FEATURES, CLI_PATHS), 0)
+        components: dict[str, list[dict[str, Any]]] = {}
+        for component in hct._build_component_catalog():
+            components.setdefault(component.name, []).append(component.as_dict())
+        for name, entries in components.items():
+            writer.add(HCT_COMPONENTS, name, entries)
+            counts[HCT_COMPONENTS] += 1
+        for key, platform in hct._platform_hierarchy().platforms.items():
+            writer.add(HCT_PLATFORMS, key, platform.as_dict())
+            counts[HCT_PLATFORMS] += 1
+        for key, node in feature_explorer._feature_nodes().items():
+            writer.add(FEATURES, key, node)
+            counts[FEATURES] += 1
+        for node_path, outline in cli_explorer._hierarchy_outlines():
+            writer.add(CLI_PATHS, node_path, outline)
+            counts[CLI_PATHS] += 1
+        writer.write(path)
+    finally:
+        if configured is not None:
+            os.environ[DATASET_ENV] = configured
+    _open.cache_clear()
+    return counts
+
+
+def main() -> None:  # pragma: nocover
+    parser = argparse.ArgumentParser(
+        prog="jnpr_pathfinder_mcp.dataset",
+        description="Build an offline dataset file for the Pathfinder MCP servers.",
+    )
+    parser.add_argument("path", help="the dataset file to write")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    for name, count in build(args.path).items():
+        print(f"{name}: {count}")
+
+
+if __name__ == "__main__":  # pragma: nocover
+    main()
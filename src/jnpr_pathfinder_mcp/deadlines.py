@@ -0,0 +1,190 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional
+
+import requests
+from fastmcp.exceptions import ToolError  # type: ignore
+from fastmcp.server.dependencies import get_context  # type: ignore
+
+from jnpr_pathfinder_mcp import profiling, tracing
+
+log = logging.getLogger(__name__)
+
+## End-to-end deadlines for tool calls.
+##
+## Tool functions are synchronous and block on requests, so the deadline
+## decorator runs them in a worker thread.  That keeps the event loop free to
+## notice an MCP cancellation, which is then passed to the thread through a
+## Deadline that every upstream request checks while it waits and reads.
+
+# per tool overrides, e.g. "feature_tree=120,search=10"
+TOOL_TIMEOUTS_ENV = "JNPR_PATHFINDER_TOOL_TIMEOUTS"
+# callers can shorten (never lengthen) a tool's deadline by sending
+# {"_meta": {"timeout": <seconds>}} with the tools/call request.
+META_TIMEOUT_KEY = "timeout"
+
+
+class Interrupted(requests.RequestException):
+    """Upstream work was stopped before it finished."""
+
+
+class DeadlineExceeded(Interrupted, requests.Timeout):
+    """The tool call ran out of time."""
+
+
+class Cancelled(Interrupted):
+    """The MCP client cancelled the tool call."""
+
+
+class Deadline:
+    """An absolute point in time by which work must finish, and a cancel flag."""
+
+    def __init__(self, timeout: Optional[float]):
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+        self._cancelled = threading.Event()
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self) -> None:
+        """Raise if the work should stop now."""
+        if self.cancelled:
+            raise Cancelled("The tool call was cancelled.")
+        if self.remaining() == 0:
+            raise DeadlineExceeded("The tool call's deadline was exceeded.")
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep, waking early (and raising) on cancellation or if the deadline
+        would pass first."""
+        remaining = self.remaining()
+        if remaining is not None and remaining < seconds:
+            raise DeadlineExceeded(f"Waiting {seconds:.1f}s would exceed the tool call's deadline.")
+        self._cancelled.wait(seconds)
+        self.check()
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def use(deadline: Deadline) -> Iterator[Deadline]:
+    """Make `deadline` the current deadline for code run in this context."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def check() -> None:
+    deadline = current()
+    if deadline is not None:
+        deadline.check()
+
+
+def sleep(seconds: float) -> None:
+    deadline = current()
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
+
+
+def timeout(requested: Optional[float]) -> Optional[float]:
+    """The socket timeout to use for a request: whichever of the requested
+    timeout and the time left on the current deadline is shorter."""
+    deadline = current()
+    remaining = None if deadline is None else deadline.remaining()
+    if remaining is None:
+        return requested
+    if requested is None:
+        return remaining
+    return min(requested, remaining)
+
+
+def _configured_timeouts() -> dict[str, float]:
+    timeouts: dict[str, float] = {}
+    for item in os.environ.get(TOOL_TIMEOUTS_ENV, "").split(","):
+        if not item.strip():
+            continue
+        name, _, seconds = item.partition("=")
+        timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+def _caller_timeout() -> Optional[float]:
+    """The timeout the MCP client asked for in the request's _meta, if any."""
+    try:
+        meta = get_context().request_context.meta
+    except (RuntimeError, ValueError, AttributeError):
+        return None
+    value = getattr(meta, META_TIMEOUT_KEY, None) if meta is not None else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def with_deadline(seconds: float) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a tool so it runs in a worker thread under a deadline.
+
+    The deadline is `seconds`, unless overridden for the tool by name in
+    JNPR_PATHFINDER_TOOL_TIMEOUTS, or shortened by the caller.  If the call
+    is cancelled or times out, the tool's in-flight upstream requests are
+    abandoned as soon as they next check the deadline.  The thread is
+    profiled when profiling is on for the tool (see profiling.py), and the
+    call is traced when tracing is on (see tracing.py).
+    """
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            limit = _configured_timeouts().get(fn.__name__, seconds)
+            requested = _caller_timeout()
+            if requested is not None:
+                limit = min(limit, requested)
+            deadline = Deadline(limit)
+
+            def run() -> Any:
+                with use(deadline), profiling.profile(fn.__name__, kwargs):
+                    return fn(*args, **kwargs)
+
+            attributes = {"mcp.tool.name": fn.__name__, "pathfinder.deadline": limit}
+            with tracing.span(f"tool {fn.__name__}", attributes):
+                try:
+                    return await asyncio.wait_for(asyncio.to_thread(run), timeout=limit)
+                except asyncio.TimeoutError:
+                    deadline.cancel()
+                    log.warning("%s - did not finish within %.1fs", fn.__name__, limit)
+                    raise ToolError(f"{fn.__name__} did not finish within {limit:.1f}s.")
+                except DeadlineExceeded as e:
+                    raise ToolError(f"{fn.__name__} did not finish within {limit:.1f}s: {e}")
+                except asyncio.CancelledError:
+                    log.info("%s - cancelled, stopping upstream requests", fn.__name__)
+                    deadline.cancel()
+                    raise
+
+        return wrapper
+
+    return decorator
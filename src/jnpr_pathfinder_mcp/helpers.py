@@ -1,4 +1,19 @@
 import argparse
+import importlib
+import logging
+import os
+
+import uvicorn
+
+from jnpr_pathfinder_mcp import admission, cache, profiling, tracing
+
+log = logging.getLogger(__name__)
+
+# Spawned worker processes find the server to serve through the environment.
+SERVER_ENV = "JNPR_PATHFINDER_SERVER"
+# seconds workers are given to finish in-flight tool calls when stopping.
+GRACEFUL_SHUTDOWN = float(os.environ.get("JNPR_PATHFINDER_GRACEFUL_SHUTDOWN", "30"))
+
 
 def parse_args(prog='jnpr_pathfinder_mcp'):
     parser = argparse.ArgumentParser(
@@ -9,20 +24,108 @@ def parse_args(prog='jnpr_pathfinder_mcp'):
     )
     parser.add_argument("--host", help="host for http transport", default=None)
     parser.add_argument("--port", help="port for http transport", type=int, default=None)
+    parser.add_argument(
+        "--workers", help="number of worker processes for http transport", type=int, default=1
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="directory for cache snapshots shared between worker processes",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="write profiles of tool calls to DIR (see JNPR_PATHFINDER_PROFILE_* for which)",
+        default=None,
+    )
+    parser.add_argument(
+        "--trace",
+        choices=tracing.EXPORTERS,
+        help="export OpenTelemetry traces to an OTLP collector or to a file",
+        default=None,
+    )
     return parser.parse_args()
 
 
-def run_cli(prog, server):
+def worker_app():
+    """Build the http app in a worker process, used as a uvicorn app factory.
+
+    Workers run the streamable http transport statelessly: each request
+    carries everything it needs, so any worker can answer any request and
+    MCP sessions don't need to stick to the worker that created them.  That
+    also means there is no session to hold resource subscriptions, or to
+    carry a client's cancellation to the worker running the call.
+    """
+    module_name, attr = os.environ[SERVER_ENV].split(":")
+    server = getattr(importlib.import_module(module_name), attr)
+    admission.install(server)
+    tracing.install()
+    return server.http_app(stateless_http=True)
+
+
+def run_workers(import_path, host, port, workers):
+    """Serve over http from several processes sharing the same port.
+
+    Workers import the server from `import_path`, 'module:attribute'.
+    """
+    os.environ[SERVER_ENV] = import_path
+    log.warning(
+        "run_workers - %d stateless workers: resource subscriptions and cancellation "
+        "of tool calls are not available",
+        workers,
+    )
+    if cache.cache_dir() is not None:
+        # fill the snapshots once so workers start warm instead of racing.
+        cache.warm()
+    uvicorn.run(
+        "jnpr_pathfinder_mcp.helpers:worker_app",
+        factory=True,
+        host=host or "127.0.0.1",
+        port=port or 8000,
+        workers=workers,
+        lifespan="on",
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN,
+    )
+
+
+def run_cli(prog, server, import_path=None):
+    """Serve `server` as the command line asks.
+
+    `import_path`, the server's 'module:attribute', is needed to run more
+    than one worker, since workers import the server themselves.
+    """
     args = parse_args(prog)
     kwargs = {'transport': args.transport}
 
     if args.transport == "stdio":
         if (args.host is not None or args.port is not None):
             raise ValueError("host/port cannot be used with stdio transport")
+        if args.workers != 1:
+            raise ValueError("workers cannot be used with stdio transport")
     elif args.transport == "http":
         kwargs['host'] = args.host
         kwargs['port'] = args.port
+        admission.install(server)
     else:
         raise ValueError(f"transport must be 'stdio' or 'http'")
 
-    server.run(**kwargs)
+    if args.workers < 1:
+        raise ValueError("workers must be at least 1")
+    if args.workers > 1 and import_path is None:
+        raise ValueError("workers can't be used with a server that has no import path")
+
+    if args.cache_dir:
+        cache.configure(args.cache_dir)
+
+    if args.profile:
+        profiling.enable(args.profile)
+
+    if args.trace:
+        # workers read it from the environment.
+        os.environ[tracing.TRACE_EXPORTER_ENV] = args.trace
+    tracing.install()
+
+    if args.workers > 1:
+        run_workers(import_path, args.host, args.port, args.workers)
+    else:
+        server.run(**kwargs)
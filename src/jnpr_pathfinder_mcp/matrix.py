@@ -0,0 +1,356 @@
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Any, Iterable, Optional, Union
+
+## A compact feature support matrix: feature x model x release.
+##
+## Each feature gets a bit position, so the features a model supports on a
+## release are one Python int used as a bitset.  A model's releases are kept
+## in release order, and only the first bitset is stored whole: each later
+## release stores the XOR with the one before it, which for consecutive
+## releases is a handful of bits, kept as a list of the flipped positions
+## when that's smaller than the bitset.  The deltas are what's stored and
+## snapshotted; a model's bitset for every release is decoded once, when the
+## matrix is built or a release is recorded, so a query is a lookup and a bit
+## test rather than a replay of the deltas.
+
+RELEASE_TOKEN_RE = re.compile(r"\d+|[A-Za-z]+")
+
+Delta = Union[int, array]
+
+
+def _encode(bits: int) -> Delta:
+    """Store a delta as a bitset or as its set positions, whichever is smaller."""
+    positions = array("I")
+    if bits.bit_count() * positions.itemsize >= (bits.bit_length() + 7) // 8:
+        return bits
+    while bits:
+        low = bits & -bits
+        positions.append(low.bit_length() - 1)
+        bits ^= low
+    return positions
+
+
+def _decode(delta: Delta) -> int:
+    if isinstance(delta, int):
+        return delta
+    bits = 0
+    for position in delta:
+        bits |= 1 << position
+    return bits
+
+
+def _size(delta: Delta) -> int:
+    if isinstance(delta, int):
+        return (delta.bit_length() + 7) // 8
+    return len(delta) * delta.itemsize
+
+
+def release_key(release: str) -> tuple[tuple[int, Any], ...]:
+    """Sort key for JUNOS releases, so 23.4R2 < 23.4R2-S1 < 24.2R1 < 24.10R1."""
+    return tuple(
+        (0, int(token)) if token.isdigit() else (1, token.upper())
+        for token in RELEASE_TOKEN_RE.findall(release)
+    )
+
+
+class ModelHistory:
+    """The supported-feature bitsets of one model, delta encoded across releases."""
+
+    __slots__ = ("releases", "keys", "deltas", "_full")
+
+    def __init__(self) -> None:
+        self.releases: list[str] = []
+        self.keys: list[tuple[tuple[int, Any], ...]] = []
+        self.deltas: list[Delta] = []
+        self._full: Optional[list[int]] = None
+
+    def _decoded(self) -> list[int]:
+        """The bitset of every release, decoded from the deltas once."""
+        if self._full is None:
+            full = []
+            bits = 0
+            for delta in self.deltas:
+                bits ^= _decode(delta)
+                full.append(bits)
+            self._full = full
+        return self._full
+
+    def bitset(self, release: str) -> Optional[int]:
+        """The features supported on `release`, or None if it isn't recorded."""
+        key = release_key(release)
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        return self._decoded()[i]
+
+    def record(self, release: str, bits: int) -> None:
+        key = release_key(release)
+        i = bisect_left(self.keys, key)
+        full = self._decoded()
+        previous = full[i - 1] if i else 0
+        if i < len(self.keys) and self.keys[i] == key:
+            full[i] = bits
+        else:
+            self.releases.insert(i, release)
+            self.keys.insert(i, key)
+            full.insert(i, bits)
+        # re-encode from the changed release on, earlier deltas are unaffected.
+        self.deltas[i:] = [_encode(b ^ a) for a, b in zip([previous] + full[i:-1], full[i:])]
+
+    def history(self, bit: int) -> list[dict[str, Any]]:
+        """The releases on which support for a feature changed."""
+        changes = []
+        supported = False
+        for release, bits in zip(self.releases, self._decoded()):
+            now = bool(bits >> bit & 1)
+            if now != supported or not changes:
+                changes.append({"release": release, "supported": now})
+            supported = now
+        return changes
+
+    def stored_bytes(self) -> int:
+        return sum(_size(delta) for delta in self.deltas)
+
+    def decoded_bytes(self) -> int:
+        return sum((bits.bit_length() + 7) // 8 for bits in self._decoded())
+
+
+class FeatureMatrix:
+    """Which models support which features on which releases."""
+
+    def __init__(self) -> None:
+        self.features: list[str] = []
+        self._feature_bits: dict[str, int] = {}
+        self.models: dict[str, ModelHistory] = {}
+        self._lock = threading.Lock()
+
+    def _bit(self, feature_key: str) -> int:
+        bit = self._feature_bits.get(feature_key)
+        if bit is None:
+            feature_key = sys.intern(feature_key)
+            bit = self._feature_bits[feature_key] = len(self.features)
+            self.features.append(feature_key)
+        return bit
+
+    def record(self, model: str, release: str, feature_keys: Iterable[str]) -> None:
+        """Record the full set of features a model supports on a release."""
+        with self._lock:
+            bits = 0
+            for feature_key in feature_keys:
+                bits |= 1 << self._bit(feature_key)
+            self.models.setdefault(sys.intern(model), ModelHistory()).record(
+                sys.intern(release), bits
+            )
+
+    def features_of(self, model: str, release: str) -> Optional[set[str]]:
+        """The features a model supports on a release, or None if that isn't recorded."""
+        with self._lock:
+            history = self.models.get(model)
+            bits = None if history is None else history.bitset(release)
+            if bits is None:
+                return None
+            return {self.features[bit] for bit in range(bits.bit_length()) if bits >> bit & 1}
+
+    def models_supporting(self, feature_key: str, release: str) -> dict[str, list[str]]:
+        """Split the models recorded for `release` by whether they support a feature.
+
+        Returns: dict with "supported" and "not_supported" model names, and
+            "no_data" for models we have no record of on that release.
+        """
+        with self._lock:
+            bit = self._feature_bits.get(feature_key)
+            result: dict[str, list[str]] = {"supported": [], "not_supported": [], "no_data": []}
+            for model, history in sorted(self.models.items()):
+                bits = history.bitset(release)
+                if bits is None:
+                    result["no_data"].append(model)
+                elif bit is not None and bits >> bit & 1:
+                    result["supported"].append(model)
+                else:
+                    result["not_supported"].append(model)
+            return result
+
+    def history(self, feature_key: str, model: str) -> Optional[list[dict[str, Any]]]:
+        """How support for a feature on a model changed across the recorded
+        releases, or None if there's no record of the model."""
+        with self._lock:
+            history = self.models.get(model)
+            if history is None:
+                return None
+            bit = self._feature_bits.get(feature_key)
+            if bit is None:
+                return [{"release": history.releases[0], "supported": False}]
+            return history.history(bit)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            cells = sum(len(h.releases) for h in self.models.values())
+            return {
+                "features": len(self.features),
+                "models": len(self.models),
+                "model_releases": cells,
+                "dense_bytes": cells * ((len(self.features) + 7) // 8),
+                "stored_bytes": sum(h.stored_bytes() for h in self.models.values()),
+                "decoded_bytes": sum(h.decoded_bytes() for h in self.models.values()),
+            }
+
+    def to_snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "features": list(self.features),
+                "models": {
+                    model: {
+                        "releases": list(history.releases),
+                        # bitsets as hex, position lists as lists.
+                        "deltas": [
+                            format(delta, "x") if isinstance(delta, int) else delta.tolist()
+                            for delta in history.deltas
+                        ],
+                    }
+                    for model, history in self.models.items()
+                },
+            }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict[str, Any]) -> "FeatureMatrix":
+        matrix = cls()
+        for feature_key in snapshot.get("features", []):
+            matrix._bit(feature_key)
+        for model, stored in snapshot.get("models", {}).items():
+            history = ModelHistory()
+            history.releases = list(stored["releases"])
+            history.keys = [release_key(release) for release in history.releases]
+            history.deltas = [
+                int(delta, 16) if isinstance(delta, str) else array("I", delta)
+                for delta in stored["deltas"]
+            ]
+            history._decoded()
+            matrix.models[model] = history
+        return matrix
+
+
+class CompatibilityMatrix:
+    """Which models run which releases, queryable in both directions.
+
+    Releases are kept in release order and each model has a bitset over
+    release positions, so "every release from A to B" is a mask test.  The
+    reverse relation, release -> models, is kept alongside.  Releases are
+    matched by `release_key`, so "24.2r1" is the same release as "24.2R1".
+    """
+
+    def __init__(self) -> None:
+        self.releases: list[str] = []
+        self._keys: list[tuple[tuple[int, Any], ...]] = []
+        self.models: dict[str, int] = {}
+        self._release_models: dict[tuple[tuple[int, Any], ...], set[str]] = {}
+        # releases whose full model list has been recorded, spelled as in `releases`.
+        self.complete: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _find(self, release: str) -> Optional[int]:
+        """The bit position of a known release, or None."""
+        key = release_key(release)
+        i = bisect_left(self._keys, key)
+        return i if i < len(self._keys) and self._keys[i] == key else None
+
+    def _position(self, release: str) -> int:
+        """The bit position of a release, making room for it if it's new."""
+        key = release_key(release)
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        release = sys.intern(release)
+        # shift every model's bits at and above the new position up by one.
+        low = (1 << i) - 1
+        for model, bits in self.models.items():
+            self.models[model] = (bits & low) | ((bits & ~low) << 1)
+        self.releases.insert(i, release)
+        self._keys.insert(i, key)
+        self._release_models[key] = set()
+        return i
+
+    def _add(self, model: str, release: str) -> None:
+        model = sys.intern(model)
+        i = self._position(release)
+        self.models[model] = self.models.get(model, 0) | 1 << i
+        self._release_models[self._keys[i]].add(model)
+
+    def add_release(self, release: str, models: Iterable[str]) -> None:
+        """Record the models compatible with a release."""
+        with self._lock:
+            i = self._position(release)
+            for model in models:
+                self._add(model, release)
+            self.complete.add(self.releases[i])
+
+    def is_complete(self, release: str) -> bool:
+        """Whether the full model list of a release has been recorded."""
+        with self._lock:
+            i = self._find(release)
+            return i is not None and self.releases[i] in self.complete
+
+    def add_model(self, model: str, releases: Iterable[str]) -> None:
+        """Record the releases compatible with a model."""
+        with self._lock:
+            self.models.setdefault(model, 0)
+            for release in releases:
+                self._add(model, release)
+
+    def models_for(self, release: str) -> Optional[list[str]]:
+        with self._lock:
+            models = self._release_models.get(release_key(release))
+            return None if models is None else sorted(models)
+
+    def releases_for(self, model: str) -> Optional[list[str]]:
+        with self._lock:
+            bits = self.models.get(model)
+            if bits is None:
+                return None
+            return [release for i, release in enumerate(self.releases) if bits >> i & 1]
+
+    def releases_between(self, start: str, end: str) -> list[str]:
+        with self._lock:
+            return self.releases[self._span(start, end)]
+
+    def _span(self, start: str, end: str) -> slice:
+        lo = bisect_left(self._keys, release_key(start))
+        hi = bisect_left(self._keys, release_key(end) + ((2, ""),))
+        return slice(lo, hi)
+
+    def models_across(self, start: str, end: str, every: bool = True) -> list[str]:
+        """The models compatible with every (or any) known release from
+        `start` to `end`, inclusive (and including `end`'s service releases)."""
+        with self._lock:
+            span = self._span(start, end)
+            if span.start >= span.stop:
+                return []
+            mask = ((1 << (span.stop - span.start)) - 1) << span.start
+            if every:
+                return sorted(model for model, bits in self.models.items() if bits & mask == mask)
+            return sorted(model for model, bits in self.models.items() if bits & mask)
+
+    def to_snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "releases": list(self.releases),
+                "complete": sorted(self.complete),
+                "models": {model: format(bits, "x") for model, bits in self.models.items()},
+            }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict[str, Any]) -> "CompatibilityMatrix":
+        compatibility = cls()
+        compatibility.releases = list(snapshot.get("releases", []))
+        compatibility._keys = [release_key(release) for release in compatibility.releases]
+        compatibility._release_models = {key: set() for key in compatibility._keys}
+        compatibility.complete = set(snapshot.get("complete", []))
+        for model, stored in snapshot.get("models", {}).items():
+            bits = compatibility.models[model] = int(stored, 16)
+            for i, key in enumerate(compatibility._keys):
+                if bits >> i & 1:
+                    compatibility._release_models[key].add(model)
+        return compatibility
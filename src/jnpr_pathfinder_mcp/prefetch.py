@@ -0,0 +1,230 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Optional
+
+from jnpr_pathfinder_mcp import deadlines, tracing, upstream
+
+log = logging.getLogger(__name__)
+
+## Speculative prefetching along the workflows the servers' INSTRUCTIONS
+## describe (categories -> components -> details -> supported platforms and
+## models, releases -> models -> features).
+##
+## When a step completes, the server names the requests the next step is
+## likely to make and they're fetched in the background, at low priority:
+## only while the upstream limiter has headroom and within a budget of
+## fetches per minute.  A prefetched response is handed to the first tool
+## call that makes the same request within PREFETCH_TTL seconds, and then
+## forgotten.  Responses nobody asked for are counted as wasted, the hit rate
+## is what was used of what was fetched.
+##
+## Prefetching is off unless JNPR_PATHFINDER_PREFETCH is set.
+
+PREFETCH = os.environ.get("JNPR_PATHFINDER_PREFETCH", "0").lower() not in ("0", "false", "no")
+# prefetches started per minute, at most.
+PREFETCH_BUDGET = int(os.environ.get("JNPR_PATHFINDER_PREFETCH_BUDGET", "30"))
+# requests prefetched after each completed step, at most.
+PREFETCH_FANOUT = int(os.environ.get("JNPR_PATHFINDER_PREFETCH_FANOUT", "3"))
+# seconds a prefetched response is held waiting for someone to ask for it.
+PREFETCH_TTL = float(os.environ.get("JNPR_PATHFINDER_PREFETCH_TTL", "120"))
+PREFETCH_ENTRIES = int(os.environ.get("JNPR_PATHFINDER_PREFETCH_ENTRIES", "64"))
+PREFETCH_WORKERS = 2
+BUDGET_WINDOW = 60.0
+WAIT_SLICE = 0.25
+
+
+class Prefetcher:
+    """Background fetches of likely next requests, within a budget."""
+
+    def __init__(self, settings: dict[str, Any]):
+        self.settings = settings
+        self.enabled = bool(settings["enabled"])
+        self.fanout = settings["fanout"]
+        self._held: OrderedDict[tuple[str, ...], tuple[upstream.Response, float]] = OrderedDict()
+        self._pending: dict[tuple[str, ...], Future] = {}
+        self._started: deque[float] = deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(
+            ("started", "fetched", "failed", "hits", "wasted", "over_budget", "busy"), 0
+        )
+
+    def _expire(self, now: float) -> None:
+        """Drop held responses past their TTL, and budget spent outside the window."""
+        while self._started and now - self._started[0] >= BUDGET_WINDOW:
+            self._started.popleft()
+        for request_key, (_, stored) in list(self._held.items()):
+            if now - stored < self.settings["ttl"]:
+                break
+            del self._held[request_key]
+            self.counts["wasted"] += 1
+
+    def ahead(self, method: str, key: str, url: str, **kwargs: Any) -> None:
+        """Start fetching a request in the background, if it's worth it."""
+        if not self.enabled:
+            return
+        request_key = upstream.request_key(method, url, **kwargs)
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if request_key in self._held or request_key in self._pending:
+                return
+            if len(self._started) >= self.settings["budget"]:
+                self.counts["over_budget"] += 1
+                return
+            if not upstream.headroom():
+                self.counts["busy"] += 1
+                return
+            self._started.append(now)
+            self.counts["started"] += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch"
+                )
+            future = self._executor.submit(upstream.request, method, key, url, **kwargs)
+            self._pending[request_key] = future
+        future.add_done_callback(lambda f: self._fetched(request_key, f))
+
+    def _fetched(self, request_key: tuple[str, ...], future: Future) -> None:
+        with self._lock:
+            if self._pending.pop(request_key, None) is None:
+                # already handed to a caller that waited for it.
+                return
+            try:
+                response = future.result()
+            except Exception as e:
+                log.info("_fetched - prefetch of %s failed: %s", request_key[1], e)
+                self.counts["failed"] += 1
+                return
+            if not (response.ok and response.size) or response.stale:
+                self.counts["failed"] += 1
+                return
+            self.counts["fetched"] += 1
+            self._held[request_key] = (response, time.monotonic())
+            while len(self._held) > self.settings["entries"]:
+                self._held.popitem(last=False)
+                self.counts["wasted"] += 1
+
+    @tracing.traced("cache lookup prefetch")
+    def take(self, request_key: tuple[str, ...]) -> Optional[upstream.Response]:
+        """Hand over a prefetched response for a request, waiting for one that's
+        on its way, or None if there isn't one.
+
+        Only fresh OK responses are handed over: a prefetch that failed, was
+        answered with a stale response or has expired is None, so the caller
+        makes the request itself.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            # held responses past their TTL are dropped here.
+            self._expire(time.monotonic())
+            entry = self._held.pop(request_key, None)
+            if entry is not None:
+                self.counts["hits"] += 1
+                tracing.annotate({"pathfinder.cache.hit": True})
+                return entry[0]
+            future = self._pending.pop(request_key, None)
+        tracing.annotate({"pathfinder.cache.hit": future is not None})
+        if future is None:
+            return None
+        while True:
+            # in slices, so a cancelled tool call stops waiting.
+            deadlines.check()
+            try:
+                response = future.result(timeout=WAIT_SLICE)
+                break
+            except FutureTimeout:
+                continue
+            except Exception:
+                return None
+        with self._lock:
+            if not (response.ok and response.size) or response.stale:
+                self.counts["failed"] += 1
+                return None
+            self.counts["fetched"] += 1
+            self.counts["hits"] += 1
+        return response
+
+    def drain(self, timeout: Optional[float] = None) -> None:
+        """Wait for the prefetches in flight to finish."""
+        with self._lock:
+            pending = list(self._pending.values())
+        wait(pending, timeout=timeout)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            used = self.counts["hits"] + self.counts["wasted"]
+            return {
+                "enabled": self.enabled,
+                "budget_per_minute": self.settings["budget"],
+                "budget_left": max(0, self.settings["budget"] - len(self._started)),
+                "held": len(self._held),
+                "in_flight": len(self._pending),
+                **self.counts,
+                "hit_rate": round(self.counts["hits"] / used, 3) if used else None,
+            }
+
+
+DEFAULT_SETTINGS: dict[str, Any] = {
+    "enabled": PREFETCH,
+    "budget": PREFETCH_BUDGET,
+    "fanout": PREFETCH_FANOUT,
+    "ttl": PREFETCH_TTL,
+    "entries": PREFETCH_ENTRIES,
+}
+
+_prefetcher = Prefetcher(dict(DEFAULT_SETTINGS))
+
+
+def configure(**settings: Any) -> None:
+    """Replace the shared prefetcher, resetting its state and statistics.
+
+    Any of the DEFAULT_SETTINGS keys can be overridden, the rest keep their
+    defaults.
+    """
+    global _prefetcher
+    unknown = set(settings) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown prefetch settings: {sorted(unknown)}")
+    _prefetcher = Prefetcher({**DEFAULT_SETTINGS, **settings})
+
+
+def fanout() -> int:
+    """How many requests to prefetch after a step, 0 when prefetching is off."""
+    return _prefetcher.fanout if _prefetcher.enabled else 0
+
+
+def ahead(method: str, key: str, url: str, **kwargs: Any) -> None:
+    """Prefetch a request the next step of a workflow is likely to make."""
+    _prefetcher.ahead(method, key, url, **kwargs)
+
+
+def request(method: str, key: str, url: str, **kwargs: Any) -> upstream.Response:
+    """Make an upstream request, answered by a prefetched response if one is held."""
+    response = _prefetcher.take(upstream.request_key(method, url, **kwargs))
+    if response is not None:
+        return response
+    return upstream.request(method, key, url, **kwargs)
+
+
+def get(key: str, url: str, **kwargs: Any) -> upstream.Response:
+    return request("get", key, url, **kwargs)
+
+
+def post(key: str, url: str, **kwargs: Any) -> upstream.Response:
+    return request("post", key, url, **kwargs)
+
+
+def drain(timeout: Optional[float] = None) -> None:
+    _prefetcher.drain(timeout)
+
+
+def stats() -> dict[str, Any]:
+    return _prefetcher.stats()
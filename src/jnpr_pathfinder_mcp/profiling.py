@@ -0,0 +1,257 @@
+import contextlib
+import cProfile
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+log = logging.getLogger(__name__)
+
+## Profiles of tool calls, to see where a slow tool spends its time (the
+## network, JSON decoding, pydantic, BeautifulSoup, logging...).
+##
+## Tools run in a worker thread under their deadline (see
+## jnpr_pathfinder_mcp.deadlines), which profiles the thread for the
+## selected calls.  In "cprofile" mode every function call is traced and a
+## .pstats file is written; in "sample" mode the thread's stack is sampled
+## every SAMPLE_INTERVAL seconds, at much lower overhead, and a speedscope
+## profile is written.  Each profile is listed, with the tool's name and
+## arguments, in index.jsonl in the profile directory.  While profiling is
+## off, it adds a fraction of a microsecond to a tool call.
+##
+## Work the tool hands to other threads (concurrent fetches) isn't profiled.
+
+PROFILE_DIR_ENV = "JNPR_PATHFINDER_PROFILE_DIR"
+# tools to profile by name, comma separated, "*" for all of them.
+PROFILE_TOOLS = os.environ.get("JNPR_PATHFINDER_PROFILE_TOOLS", "*")
+# "cprofile" or "sample".
+PROFILE_MODE = os.environ.get("JNPR_PATHFINDER_PROFILE_MODE", "cprofile")
+# fraction of the selected tool calls to profile.
+PROFILE_RATE = float(os.environ.get("JNPR_PATHFINDER_PROFILE_RATE", "1"))
+SAMPLE_INTERVAL = float(os.environ.get("JNPR_PATHFINDER_PROFILE_INTERVAL", "0.001"))
+MODES = ("cprofile", "sample")
+INDEX_FILE = "index.jsonl"
+# characters of each argument's repr kept in the index.
+ARGUMENT_CHARS = 200
+
+
+class Sampler:
+    """Samples one thread's stack on a background thread, for speedscope."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames: list[dict[str, Any]] = []
+        self._frame_ids: dict[tuple[str, str, int], int] = {}
+        self.samples: list[list[int]] = []
+        self.weights: list[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _frame_id(self, code: Any) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        frame_id = self._frame_ids.get(key)
+        if frame_id is None:
+            frame_id = self._frame_ids[key] = len(self.frames)
+            self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+        return frame_id
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def speedscope(self, name: str) -> dict[str, Any]:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "jnpr_pathfinder_mcp",
+            "name": name,
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(self.weights),
+                    "samples": self.samples,
+                    "weights": self.weights,
+                }
+            ],
+        }
+
+
+class Profiler:
+    """Profiles the selected tool calls into a directory."""
+
+    def __init__(self, settings: dict[str, Any]):
+        if settings["mode"] not in MODES:
+            raise ValueError(f"profile mode must be one of {list(MODES)}, not {settings['mode']!r}")
+        self.settings = settings
+        self.enabled = bool(settings["enabled"] and settings["directory"])
+        tools = settings["tools"]
+        if isinstance(tools, str):
+            tools = [tool.strip() for tool in tools.split(",") if tool.strip()]
+        self.tools = frozenset(tools)
+        # cProfile can't trace two threads at once everywhere, one at a time.
+        self._active = threading.Lock()
+        self._index_lock = threading.Lock()
+        self.counts = dict.fromkeys(("profiled", "skipped", "busy"), 0)
+
+    def selected(self, tool: str) -> bool:
+        if "*" not in self.tools and tool not in self.tools:
+            return False
+        return random.random() < self.settings["rate"]
+
+    def _path(self, tool: str, arguments: dict[str, Any]) -> Path:
+        digest = hashlib.sha1(repr(sorted(arguments.items())).encode("utf-8")).hexdigest()[:8]
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        name = f"{stamp}-{os.getpid()}-{re.sub(r'[^A-Za-z0-9_]+', '_', tool)}-{digest}"
+        suffix = ".pstats" if self.settings["mode"] == "cprofile" else ".speedscope.json"
+        path = Path(self.settings["directory"]) / (name + suffix)
+        n = 1
+        while path.exists():
+            path = path.with_name(f"{name}-{n}{suffix}")
+            n += 1
+        return path
+
+    @contextlib.contextmanager
+    def profile(self, tool: str, arguments: dict[str, Any]) -> Iterator[None]:
+        if not self.selected(tool):
+            self.counts["skipped"] += 1
+            yield
+            return
+        tracing = self.settings["mode"] == "cprofile"
+        if tracing and not self._active.acquire(blocking=False):
+            self.counts["busy"] += 1
+            yield
+            return
+        # a call that fails or runs out of time is written too, it's often
+        # the one worth looking at.
+        started = time.perf_counter()
+        if tracing:
+            result: Any = cProfile.Profile()
+            result.enable()
+        else:
+            result = Sampler(threading.get_ident(), self.settings["interval"])
+            result.start()
+        try:
+            yield
+        finally:
+            if tracing:
+                result.disable()
+                self._active.release()
+            else:
+                result.stop()
+            self._write(tool, arguments, time.perf_counter() - started, result)
+
+    def _write(self, tool: str, arguments: dict[str, Any], elapsed: float, result: Any) -> None:
+        try:
+            Path(self.settings["directory"]).mkdir(parents=True, exist_ok=True)
+            path = self._path(tool, arguments)
+            if isinstance(result, cProfile.Profile):
+                result.dump_stats(path)
+            else:
+                path.write_text(json.dumps(result.speedscope(tool)), encoding="utf-8")
+            entry = {
+                "file": path.name,
+                "tool": tool,
+                "arguments": {k: repr(v)[:ARGUMENT_CHARS] for k, v in arguments.items()},
+                "mode": self.settings["mode"],
+                "seconds": round(elapsed, 6),
+                "pid": os.getpid(),
+                "time": time.time(),
+            }
+            with self._index_lock:
+                with open(path.parent / INDEX_FILE, "a", encoding="utf-8") as index:
+                    index.write(json.dumps(entry) + "\n")
+            self.counts["profiled"] += 1
+        except OSError as e:
+            log.warning("_write - couldn't write the profile of %s: %s", tool, e)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "directory": self.settings["directory"],
+            "tools": sorted(self.tools),
+            "mode": self.settings["mode"],
+            "rate": self.settings["rate"],
+            **self.counts,
+        }
+
+
+DEFAULT_SETTINGS: dict[str, Any] = {
+    "enabled": bool(os.environ.get(PROFILE_DIR_ENV)),
+    "directory": os.environ.get(PROFILE_DIR_ENV),
+    "tools": PROFILE_TOOLS,
+    "mode": PROFILE_MODE,
+    "rate": PROFILE_RATE,
+    "interval": SAMPLE_INTERVAL,
+}
+
+_profiler = Profiler(dict(DEFAULT_SETTINGS))
+
+
+def configure(**settings: Any) -> None:
+    """Replace the profiler, any DEFAULT_SETTINGS not given keep their defaults.
+
+    Raises: ValueError for unknown settings or an unknown mode.
+    """
+    global _profiler
+    unknown = set(settings) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown profiling settings: {sorted(unknown)}")
+    _profiler = Profiler({**DEFAULT_SETTINGS, **settings})
+
+
+def enable(directory: str) -> None:
+    """Profile tool calls into `directory`, in this process and in worker
+    processes started after this."""
+    os.environ[PROFILE_DIR_ENV] = str(directory)
+    DEFAULT_SETTINGS.update(enabled=True, directory=str(directory))
+    configure()
+
+
+_DISABLED = contextlib.nullcontext()
+
+
+def profile(tool: str, arguments: dict[str, Any]) -> contextlib.AbstractContextManager[None]:
+    """Profile the code run in this block, if the tool call is selected."""
+    profiler = _profiler
+    if not profiler.enabled:
+        return _DISABLED
+    return profiler.profile(tool, arguments)
+
+
+def settings() -> dict[str, Any]:
+    return dict(_profiler.settings)
+
+
+def stats() -> dict[str, Any]:
+    return _profiler.stats()
@@ -0,0 +1,98 @@
+import sys
+from collections.abc import Mapping
+from typing import Any, Iterator, Optional
+
+## Compact records for the catalogs the servers hold in memory.
+##
+## Catalog entries used to be dicts, each carrying its own hash table and
+## its own copies of strings like family and category names that are shared
+## by hundreds of entries.  Records keep their fields in __slots__ and
+## intern the repeated strings, so an entry is one small object pointing at
+## shared strings.  They're read-only mappings, so code (and snapshots)
+## written for the dicts keep working.
+
+
+def intern(value: Any) -> Any:
+    """Intern strings, pass anything else through."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Record(Mapping):
+    """A read-only mapping over the fields in __slots__.
+
+    Fields missing from the constructor's arguments are None, and those
+    named in INTERNED are interned.
+    """
+
+    __slots__ = ()
+    INTERNED: frozenset[str] = frozenset()
+
+    def __init__(self, **fields: Any) -> None:
+        for field in self.__slots__:
+            value = fields.get(field)
+            object.__setattr__(self, field, intern(value) if field in self.INTERNED else value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} records are read-only")
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def as_dict(self) -> dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class CatalogEntry(Record):
+    """A Feature Explorer platform: its family and product key."""
+
+    __slots__ = ("family", "product_key")
+    INTERNED = frozenset({"family"})
+
+
+class Component(Record):
+    """An HCT component and the category it was listed in."""
+
+    __slots__ = ("name", "category", "category_key", "description")
+    INTERNED = frozenset({"name", "category", "category_key"})
+
+
+class Platform(Record):
+    """An HCT platform and where it sits in the family/series hierarchy."""
+
+    __slots__ = ("platform", "family", "series")
+    INTERNED = frozenset({"platform", "family", "series"})
+
+
+def deep_size(value: Any, seen: Optional[set[int]] = None) -> int:
+    """The bytes held by an object and everything it references, counting
+    shared objects (like interned strings) once."""
+    if seen is None:
+        seen = set()
+    stack = [value]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, Record):
+            stack.extend(getattr(obj, field) for field in obj.__slots__)
+    return size
@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from fastmcp import FastMCP  # type: ignore
+from pydantic import AnyUrl
+
+from jnpr_pathfinder_mcp import deadlines, resources, upstream
+
+log = logging.getLogger(__name__)
+
+## Incremental refresh of the documents behind the pathfinder:// resources.
+##
+## Each resource a client reads is tracked with a fingerprint of its
+## document and a digest of its top level entries.  A refresh refetches the
+## entries older than REFRESH_INTERVAL (conditionally, so unchanged documents
+## cost a 304), works out which entries were added, removed or changed, and
+## notifies clients subscribed to the resource.
+
+# seconds between background refreshes while clients are subscribed, 0 disables them.
+REFRESH_INTERVAL = float(os.environ.get("JNPR_PATHFINDER_REFRESH_INTERVAL", "900"))
+
+
+def fingerprint(document: Any) -> str:
+    return hashlib.sha256(json.dumps(document, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def digest(document: Any) -> dict[str, str]:
+    """Map the name of each top level entry of a document to a fingerprint of it."""
+    named = resources.children(document)
+    if named is None:
+        return {}
+    return {name: fingerprint(child)[:16] for name, child in named}
+
+
+def diff(old: dict[str, str], new: dict[str, str]) -> dict[str, list[str]]:
+    """The names of entries added, removed and changed between two digests."""
+    return {
+        "added": sorted(set(new) - set(old)),
+        "removed": sorted(set(old) - set(new)),
+        "changed": sorted(name for name in set(old) & set(new) if old[name] != new[name]),
+    }
+
+
+class Entry:
+    """A tracked document and what we knew about it when it was last fetched."""
+
+    __slots__ = ("uri", "fetch", "fingerprint", "digest", "refreshed_at", "changed_at", "changes")
+
+    def __init__(self, uri: str, fetch: Callable[[], upstream.Response]):
+        self.uri = uri
+        self.fetch = fetch
+        self.fingerprint: Optional[str] = None
+        self.digest: dict[str, str] = {}
+        self.refreshed_at = 0.0
+        self.changed_at: Optional[float] = None
+        self.changes: Optional[dict[str, list[str]]] = None
+
+    def update(self, response: upstream.Response) -> Optional[dict[str, Any]]:
+        """Take in a fetched response, returning what changed (None if nothing did)."""
+        self.refreshed_at = time.monotonic()
+        if not (response.ok and response.size) or response.stale:
+            # keep what we had, we'll try again next time.
+            return None
+        new_fingerprint = response.derived("fingerprint", fingerprint)
+        new_digest = response.derived("digest", digest)
+        if new_fingerprint == self.fingerprint:
+            return None
+        first = self.fingerprint is None
+        changes = diff(self.digest, new_digest)
+        self.fingerprint, self.digest = new_fingerprint, new_digest
+        if first:
+            return None
+        self.changed_at = time.time()
+        self.changes = changes
+        return {"uri": self.uri, "fingerprint": new_fingerprint, **changes}
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "uri": self.uri,
+            "fingerprint": self.fingerprint,
+            "entries": len(self.digest),
+            "age_seconds": round(time.monotonic() - self.refreshed_at, 1),
+            "changed_at": self.changed_at,
+            "last_changes": self.changes,
+        }
+
+
+class Refresher:
+    """The tracked documents, refreshed when they're older than `interval`."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.entries: dict[str, Entry] = {}
+        self._lock = threading.Lock()
+
+    def track(
+        self, uri: str, fetch: Callable[[], upstream.Response], response: upstream.Response
+    ) -> None:
+        """Start (or keep) tracking `uri`, given the response just served for it."""
+        with self._lock:
+            entry = self.entries.get(uri)
+            if entry is None:
+                entry = self.entries[uri] = Entry(uri, fetch)
+        entry.update(response)
+
+    def refresh(self, force: bool = False) -> list[dict[str, Any]]:
+        """Refetch the stale entries (all of them if `force`).
+
+        Returns: the changes, one dict per changed document with its uri and
+            the names of the entries added, removed and changed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                e for e in self.entries.values() if force or now - e.refreshed_at >= self.interval
+            ]
+        changes = []
+        for entry in due:
+            try:
+                change = entry.update(entry.fetch())
+            except deadlines.Interrupted:
+                raise
+            except Exception as e:
+                log.warning("refresh - failed to refresh %s: %s", entry.uri, e)
+                continue
+            if change is not None:
+                log.info("refresh - %s changed", entry.uri)
+                changes.append(change)
+        return changes
+
+    def status(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [entry.as_dict() for entry in self.entries.values()]
+
+
+engine = Refresher(REFRESH_INTERVAL)
+
+
+def track(uri: str, fetch: Callable[[], upstream.Response]) -> upstream.Response:
+    """Fetch a document for a resource and track it for refreshes."""
+    response = fetch()
+    engine.track(uri, fetch, response)
+    return response
+
+
+## Subscriptions.
+##
+## Sessions subscribe to resource URIs, which on the full server carry the
+## mounted server's prefix (pathfinder://<prefix>/hct/...) while tracked
+## documents don't, so subscriptions are matched with or without a prefix.
+
+_subscriptions: dict[str, set[Any]] = {}
+_subscriptions_lock = threading.Lock()
+_background: Optional[asyncio.Task] = None
+
+
+def _matches(subscribed: str, uri: str) -> bool:
+    """Whether a subscription covers a tracked document: the document's own
+    resource, or one read from it (a chunk, or a node of a tree)."""
+    scheme, _, path = uri.partition("://")
+    subscribed_scheme, _, subscribed_path = subscribed.partition("://")
+    if subscribed_scheme != scheme:
+        return False
+    for candidate in (subscribed_path, subscribed_path.partition("/")[2]):
+        if candidate == path or candidate.startswith(f"{path}/"):
+            return True
+    return False
+
+
+def subscribe(uri: str, session: Any) -> None:
+    with _subscriptions_lock:
+        _subscriptions.setdefault(uri, set()).add(session)
+
+
+def unsubscribe(uri: str, session: Any) -> None:
+    with _subscriptions_lock:
+        sessions = _subscriptions.get(uri, set())
+        sessions.discard(session)
+        if not sessions:
+            _subscriptions.pop(uri, None)
+
+
+async def notify(changes: list[dict[str, Any]]) -> int:
+    """Send resource updated notifications for changed documents.
+
+    Returns: the number of notifications sent.
+    """
+    with _subscriptions_lock:
+        subscriptions = [(uri, set(sessions)) for uri, sessions in _subscriptions.items()]
+    sent = 0
+    for change in changes:
+        for subscribed, sessions in subscriptions:
+            if not _matches(subscribed, change["uri"]):
+                continue
+            for session in sessions:
+                try:
+                    await session.send_resource_updated(AnyUrl(subscribed))
+                    sent += 1
+                except Exception as e:
+                    log.info("notify - dropping subscription to %s: %s", subscribed, e)
+                    unsubscribe(subscribed, session)
+    return sent
+
+
+async def refresh_and_notify(force: bool = False) -> list[dict[str, Any]]:
+    changes = await asyncio.to_thread(engine.refresh, force)
+    await notify(changes)
+    return changes
+
+
+async def _refresh_periodically() -> None:
+    while _subscriptions:
+        await asyncio.sleep(engine.interval)
+        try:
+            await refresh_and_notify()
+        except Exception as e:
+            log.exception("_refresh_periodically - refresh failed: %s", e)
+
+
+def enable_subscriptions(server: FastMCP) -> None:
+    """Accept resource subscriptions on `server`, refreshing in the background
+    every REFRESH_INTERVAL seconds while anyone is subscribed."""
+    lowlevel = server._mcp_server
+
+    @lowlevel.subscribe_resource()
+    async def _subscribe(uri: AnyUrl) -> None:
+        global _background
+        subscribe(str(uri), lowlevel.request_context.session)
+        if engine.interval > 0 and (_background is None or _background.done()):
+            _background = asyncio.create_task(_refresh_periodically())
+
+    @lowlevel.unsubscribe_resource()
+    async def _unsubscribe(uri: AnyUrl) -> None:
+        unsubscribe(str(uri), lowlevel.request_context.session)
+
+    # the low level server always advertises subscribe=False.
+    get_capabilities = lowlevel.get_capabilities
+
+    def _get_capabilities(*args: Any, **kwargs: Any) -> Any:
+        capabilities = get_capabilities(*args, **kwargs)
+        if capabilities.resources is not None:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+    lowlevel.get_capabilities = _get_capabilities  # type: ignore[method-assign]
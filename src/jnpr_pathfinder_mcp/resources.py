@@ -0,0 +1,166 @@
+import json
+import os
+from collections import deque
+from typing import Any, Optional
+
+from fastmcp.exceptions import ResourceError  # type: ignore
+
+from jnpr_pathfinder_mcp import upstream
+
+## Helpers for publishing upstream documents as MCP resources.
+##
+## Large documents are served in chunks of their serialized JSON, and trees
+## are served one node at a time as an outline of the node's children, so
+## clients only read the slices they need.  Serializations, and the index of
+## a tree's nodes by path, are derived from the held upstream response, so
+## they're built once per document version.
+
+MIME_TYPE = "application/json"
+# characters of serialized JSON per chunk.
+CHUNK_CHARS = int(os.environ.get("JNPR_PATHFINDER_RESOURCE_CHUNK_CHARS", str(256 * 1024)))
+
+# fields holding a tree node's children and name, in order of preference.
+CHILD_FIELDS = ("children", "childNodes", "subTopics", "topics", "items", "nodes")
+NAME_FIELDS = (
+    "name",
+    "title",
+    "label",
+    "topic",
+    "modelName",
+    "componentName",
+    "platformName",
+    "key",
+    "id",
+)
+
+
+def document(response: upstream.Response) -> Any:
+    """The decoded body of a response, or a ResourceError if there isn't one."""
+    if not (response.ok and response.size):
+        raise ResourceError(response.text or "Empty response from API.")
+    return response.json()
+
+
+def serialized(response: upstream.Response) -> str:
+    """The response's body as compact JSON text."""
+    document(response)
+    return response.derived("serialized", lambda doc: json.dumps(doc, separators=(",", ":")))
+
+
+def manifest(response: upstream.Response, chunk_uri: str) -> str:
+    """Describe how a document is split into chunks.
+
+    Arguments:
+      chunk_uri: str - the template for reading a chunk, with an {index}.
+    """
+    text = serialized(response)
+    count = max(1, -(-len(text) // CHUNK_CHARS))
+    return json.dumps(
+        {
+            "size": len(text),
+            "chunk_size": CHUNK_CHARS,
+            "chunks": count,
+            "chunk_uri": chunk_uri,
+            "stale": response.stale,
+        }
+    )
+
+
+def chunk(response: upstream.Response, index: int) -> str:
+    """Return chunk `index` of the response's JSON text.
+
+    Chunks are slices of the text, join them in order and decode the result.
+    """
+    text = serialized(response)
+    count = max(1, -(-len(text) // CHUNK_CHARS))
+    if not 0 <= index < count:
+        raise ResourceError(f"Chunk {index} is out of range, there are {count} chunks.")
+    return text[index * CHUNK_CHARS : (index + 1) * CHUNK_CHARS]
+
+
+def _name(node: Any, position: int) -> str:
+    if isinstance(node, dict):
+        for field in NAME_FIELDS:
+            if isinstance(node.get(field), (str, int)):
+                return str(node[field])
+    elif isinstance(node, (str, int)):
+        return str(node)
+    return str(position)
+
+
+def children(node: Any) -> Optional[list[tuple[str, Any]]]:
+    """Return a tree node's children as (name, child) pairs, or None for a leaf.
+
+    A node's children are either the items of a list, a list under one of
+    CHILD_FIELDS, or, for a mapping without scalar fields, its values keyed
+    by name.
+    """
+    if isinstance(node, list):
+        return [(_name(child, i), child) for i, child in enumerate(node)]
+    if not isinstance(node, dict):
+        return None
+    for field in CHILD_FIELDS:
+        if isinstance(node.get(field), (list, dict)):
+            return children(node[field])
+    if node and all(isinstance(value, (list, dict)) for value in node.values()):
+        return [(str(key), value) for key, value in node.items()]
+    return None
+
+
+def node_at(tree: Any, path: str) -> Any:
+    """Follow a slash separated path of child names from the root of a tree."""
+    node = tree
+    for segment in [s for s in path.split("/") if s]:
+        named = children(node) or []
+        matches = [child for name, child in named if name == segment]
+        if not matches:
+            matches = [child for name, child in named if name.lower() == segment.lower()]
+        if not matches:
+            raise ResourceError(f"Nothing named {segment!r} in {path!r}.")
+        node = matches[0]
+    return node
+
+
+def index(tree: Any) -> dict[str, Any]:
+    """Map the path of every node of a tree to the node, for lookups without
+    walking the tree.  Paths are the ones node_at follows: where siblings
+    share a name, the first one wins."""
+    nodes = {"": tree}
+    queue = deque([("", tree)])
+    while queue:
+        path, node = queue.popleft()
+        for name, child in children(node) or []:
+            child_path = f"{path}/{name}" if path else name
+            if child_path not in nodes:
+                nodes[child_path] = child
+                queue.append((child_path, child))
+    return nodes
+
+
+def lookup(response: upstream.Response, path: str) -> Any:
+    """The node at `path` in a response's tree, from an index built once per
+    document, falling back to node_at for names in another case."""
+    tree = document(response)
+    nodes = response.derived("index", index)
+    key = "/".join(s for s in path.split("/") if s)
+    if key in nodes:
+        return nodes[key]
+    return node_at(tree, path)
+
+
+def outline(node: Any, path: str) -> str:
+    """A node's own fields and the names of its children, or the whole node
+    if it's a leaf."""
+    named = children(node)
+    if named is None:
+        return json.dumps({"path": path, "node": node})
+    fields = {}
+    if isinstance(node, dict):
+        fields = {key: value for key, value in node.items() if not isinstance(value, (list, dict))}
+    return json.dumps(
+        {
+            "path": path,
+            "fields": fields,
+            "children": [name for name, _ in named],
+        }
+    )
@@ -0,0 +1,297 @@
+import heapq
+import math
+import re
+import sys
+import threading
+from bisect import bisect_left
+from collections import Counter
+from operator import itemgetter
+from typing import Any, Iterable, Optional
+
+## A small in-memory index for looking up names that agents usually get
+## almost right: exact and prefix matches on the normalized name, all-words
+## matches over the name and description, and fuzzy matches on character
+## trigrams of the name for typos.
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+NGRAM = 3
+# fuzzy matches scoring below this (Dice coefficient of trigrams) are dropped.
+FUZZY_THRESHOLD = 0.4
+
+# how a match was made, best first.
+EXACT = "exact"
+PREFIX = "prefix"
+WORDS = "words"
+FUZZY = "fuzzy"
+_RANK = {EXACT: 3.0, PREFIX: 2.0, WORDS: 1.0, FUZZY: 0.0}
+
+
+def _rank(match: tuple[str, float]) -> float:
+    kind, score = match
+    return _RANK[kind] + score
+
+
+def normalize(text: str) -> str:
+    """Lowercase and drop punctuation, so "QSFP-100G-LR4" == "qsfp100g lr4"."""
+    return "".join(TOKEN_RE.findall(text.lower()))
+
+
+def tokens(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def ngrams(text: str) -> set[str]:
+    padded = f" {text} "
+    return {padded[i : i + NGRAM] for i in range(max(1, len(padded) - NGRAM + 1))}
+
+
+class TextIndex:
+    """Exact, prefix, word and fuzzy lookups over named documents.
+
+    Documents are added once with `add()`; the index is read-only after
+    that and safe to share between threads.
+    """
+
+    def __init__(self) -> None:
+        self.documents: list[dict[str, Any]] = []
+        self._names: list[str] = []
+        self._by_name: dict[str, list[int]] = {}
+        self._sorted: list[tuple[str, int]] = []
+        self._words: dict[str, set[int]] = {}
+        self._grams: dict[str, set[int]] = {}
+
+    def add(self, name: str, description: str = "", **fields: Any) -> None:
+        """Index a document by name and description, `fields` are returned with its matches."""
+        doc_id = len(self.documents)
+        self.documents.append({"name": name, **fields})
+        key = sys.intern(normalize(name))
+        self._names.append(key)
+        self._by_name.setdefault(key, []).append(doc_id)
+        self._sorted.append((key, doc_id))
+        for word in set(tokens(name)) | set(tokens(description)):
+            self._words.setdefault(sys.intern(word), set()).add(doc_id)
+        for gram in ngrams(key):
+            self._grams.setdefault(gram, set()).add(doc_id)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def freeze(self) -> "TextIndex":
+        """Finish building, call once all documents are added."""
+        self._sorted.sort()
+        return self
+
+    def _prefixed(self, key: str) -> Iterable[int]:
+        start = bisect_left(self._sorted, (key, -1))
+        for name, doc_id in self._sorted[start:]:
+            if not name.startswith(key):
+                break
+            yield doc_id
+
+    def _fuzzy(self, key: str) -> dict[int, float]:
+        grams = ngrams(key)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        scores = {}
+        for doc_id, count in shared.items():
+            score = 2 * count / (len(grams) + len(ngrams(self._names[doc_id])))
+            if score >= FUZZY_THRESHOLD:
+                scores[doc_id] = score
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = 10) -> list[dict[str, Any]]:
+        """Return the best matching documents, each with how it matched and a score.
+
+        Within each kind of match, shorter names (closer to the query) and
+        higher fuzzy scores rank first.
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        found: dict[int, tuple[str, float]] = {}
+
+        def consider(doc_id: int, kind: str, score: float) -> None:
+            if doc_id not in found or _rank((kind, score)) > _rank(found[doc_id]):
+                found[doc_id] = (kind, score)
+
+        for doc_id in self._by_name.get(key, ()):
+            consider(doc_id, EXACT, 1.0)
+        for doc_id in self._prefixed(key):
+            consider(doc_id, PREFIX, len(key) / len(self._names[doc_id]))
+        words = tokens(query)
+        if words:
+            matching = set.intersection(*(self._words.get(word, set()) for word in words))
+            for doc_id in matching:
+                consider(doc_id, WORDS, len(key) / max(len(key), len(self._names[doc_id])))
+        for doc_id, score in self._fuzzy(key).items():
+            consider(doc_id, FUZZY, score)
+
+        ranked = sorted(found.items(), key=lambda item: (-_rank(item[1]), self._names[item[0]]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [
+            {**self.documents[doc_id], "match": kind, "score": round(score, 3)}
+            for doc_id, (kind, score) in ranked
+        ]
+
+
+## Ranked full text search (BM25) for bigger corpora, like the CLI reference
+## and hierarchy, where each document is a node of a tree with a few text
+## fields.  The words of a document's path count PATH_WEIGHT times, and
+## documents whose path holds every word of the query are boosted, so
+## "protocols bgp" ranks the protocols/bgp node above pages that only
+## mention both words.
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+PATH_WEIGHT = 3
+PATH_BOOST = 1.5
+
+
+class BM25Index:
+    """BM25 ranked search over documents keyed by a unique key.
+
+    `update()` takes the whole corpus each time and only indexes the
+    documents that were added or changed, and drops those that are gone, so
+    the index can be rebuilt incrementally whenever its source changes.
+    Each word's scores are computed on the first search for it after an
+    update, later searches only add them up.  Safe to search from several
+    threads while it's updated.
+    """
+
+    def __init__(self) -> None:
+        self._fingerprints: dict[str, int] = {}
+        self._documents: dict[str, dict[str, Any]] = {}
+        self._terms: dict[str, Counter[str]] = {}
+        self._path_terms: dict[str, frozenset[str]] = {}
+        self._lengths: dict[str, int] = {}
+        self._depths: dict[str, int] = {}
+        self._path_postings: dict[str, set[str]] = {}
+        self._impact_cache: dict[str, dict[str, float]] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _remove(self, key: str) -> None:
+        for term in self._terms.pop(key):
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(key)
+        del self._documents[key]
+        del self._depths[key]
+        del self._fingerprints[key]
+        for term in self._path_terms.pop(key):
+            keys = self._path_postings[term]
+            keys.discard(key)
+            if not keys:
+                del self._path_postings[term]
+
+    def _add(self, key: str, path: str, text: str, fields: dict[str, Any], fp: int) -> None:
+        path_terms = tokens(path)
+        terms = Counter(tokens(text))
+        for term in path_terms:
+            terms[sys.intern(term)] += PATH_WEIGHT
+        length = sum(terms.values())
+        for term, count in terms.items():
+            self._postings.setdefault(sys.intern(term), {})[key] = count
+        self._terms[key] = terms
+        self._path_terms[key] = frozenset(path_terms)
+        for term in self._path_terms[key]:
+            self._path_postings.setdefault(sys.intern(term), set()).add(key)
+        self._documents[key] = {"path": path, "fields": fields}
+        self._lengths[key] = length
+        self._depths[key] = path.count("/")
+        self._fingerprints[key] = fp
+        self._total_length += length
+
+    def _impacts(self, word: str) -> dict[str, float]:
+        """Each document's BM25 score for one word, computed once per version
+        of the index."""
+        impacts = self._impact_cache.get(word)
+        if impacts is None:
+            postings = self._postings.get(word, {})
+            count = len(self._documents)
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            weight = idf * (BM25_K1 + 1)
+            # the length normalization, k1 * (1 - b + b * length / average length).
+            k_base = BM25_K1 * (1 - BM25_B)
+            k_length = BM25_K1 * BM25_B * count / self._total_length
+            lengths = self._lengths
+            impacts = self._impact_cache[word] = {
+                key: weight * tf / (tf + k_base + k_length * lengths[key])
+                for key, tf in postings.items()
+            }
+        return impacts
+
+    def update(self, documents: Iterable[tuple[str, str, str, dict[str, Any]]]) -> dict[str, int]:
+        """Bring the index up to date with the corpus.
+
+        Arguments:
+          documents: (key, path, text, fields) for every document, `fields`
+            are returned with its matches (under its path and score).
+
+        Returns: the number of documents added, changed, removed and unchanged.
+        """
+        counts = dict.fromkeys(("added", "changed", "removed", "unchanged"), 0)
+        with self._lock:
+            seen = set()
+            for key, path, text, fields in documents:
+                seen.add(key)
+                fp = hash((path, text))
+                held = self._fingerprints.get(key)
+                if held == fp:
+                    counts["unchanged"] += 1
+                    continue
+                if held is not None:
+                    self._remove(key)
+                    counts["changed"] += 1
+                else:
+                    counts["added"] += 1
+                self._add(key, path, text, fields, fp)
+            for key in set(self._documents) - seen:
+                self._remove(key)
+                counts["removed"] += 1
+            if counts["added"] or counts["changed"] or counts["removed"]:
+                self._impact_cache.clear()
+        return counts
+
+    def search(self, query: str, limit: int = 10, offset: int = 0) -> tuple[int, list[dict]]:
+        """Rank the documents matching any word of the query.
+
+        Returns: (the number of matching documents, the matches from `offset`
+            to `offset + limit`, best first, each with its score)
+        """
+        words = list(dict.fromkeys(tokens(query)))
+        with self._lock:
+            if not words or not self._documents:
+                return 0, []
+            scores: dict[str, float] = {}
+            for impacts in sorted((self._impacts(word) for word in words), key=len, reverse=True):
+                if not scores:
+                    scores = dict(impacts)
+                    continue
+                for key, impact in impacts.items():
+                    scores[key] = scores.get(key, 0.0) + impact
+            boosted = set.intersection(*(self._path_postings.get(word, set()) for word in words))
+            for key in boosted:
+                scores[key] *= PATH_BOOST
+            # ties go to the shallower (more general) path.
+            depths = self._depths
+            ranked = sorted(
+                heapq.nlargest(offset + limit, scores.items(), key=itemgetter(1)),
+                key=lambda item: (-item[1], depths[item[0]], item[0]),
+            )
+            return len(scores), [
+                {
+                    **self._documents[key]["fields"],
+                    "path": self._documents[key]["path"],
+                    "score": round(score, 3),
+                }
+                for key, score in ranked[offset:]
+            ]
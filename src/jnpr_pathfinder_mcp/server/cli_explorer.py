@@ -1,10 +1,24 @@
+import json
 import logging
-from typing import Any, Optional
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Annotated, Any, Iterator, Literal, Optional
 
-import requests
 from fastmcp import FastMCP  # type: ignore
 from pydantic import BaseModel
 
+from jnpr_pathfinder_mcp import (
+    dataset,
+    deadlines,
+    refresh,
+    resources,
+    search,
+    tracing,
+    upstream,
+)
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
@@ -38,36 +52,419 @@ class CliExplorerResponse(BaseModel):
     success: bool
     error: Optional[str] = None
     response: Optional[dict[str, Any] | list[dict[str, Any]]] = None
+    # set when the upstream is failing and the last known good response is returned.
+    stale: bool = False
+    age_seconds: Optional[float] = None
 
 
-@mcp.tool
-def search(query: str, page_number: int = 1, page_size: int = 100) -> CliExplorerResponse:
-    """Search for JUNOS CLI commands by keywords."""
+def _cli_explorer_response(response: upstream.Response) -> CliExplorerResponse:
+    if response.ok and response.size:
+        return CliExplorerResponse(
+            success=True,
+            response=response.json(),
+            stale=response.stale,
+            age_seconds=response.age,
+        )
+    return CliExplorerResponse(success=False, error=response.text or "Empty response from API.")
+
+
+## Caching search results.
+##
+## Agents repeat searches, and vary them in ways the upstream doesn't care
+## about: case, spacing and the page size.  Queries are normalized, and the
+## results of a normalized query are fetched in windows of SEARCH_WINDOW
+## and held, so pages that fall inside a window are sliced locally.  A page
+## that runs past a window into results that weren't held goes upstream as
+## it was asked.
+
+# results fetched (and held) per window of a normalized query.
+SEARCH_WINDOW = int(os.environ.get("JNPR_PATHFINDER_SEARCH_WINDOW", "200"))
+# how long held results are used, 0 disables the cache.
+SEARCH_CACHE_TTL = float(os.environ.get("JNPR_PATHFINDER_SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_ENTRIES = int(os.environ.get("JNPR_PATHFINDER_SEARCH_CACHE_ENTRIES", "256"))
+# paging fields a search document may carry, rewritten on pages sliced from it.
+PAGE_NUMBER_FIELDS = ("pageNumber", "page_number")
+PAGE_SIZE_FIELDS = ("pageSize", "page_size")
+TOTAL_FIELDS = ("total", "totalCount", "totalElements")
+
+
+def normalize_query(query: str) -> str:
+    """Case fold and collapse whitespace, so "Show  BGP neighbor" and "show bgp
+    neighbor" are the same query.  Quotes and repeated words may change what
+    the upstream finds, so they're kept."""
+    return " ".join(query.casefold().split())
+
+
+def _results(document: Any) -> Optional[tuple[Any, Optional[str], list[Any]]]:
+    """Where the results are in a search document: (document, None, document)
+    for a list, (document, field, list) for the longest list in a mapping, or
+    None if there's no list to page through."""
+    if isinstance(document, list):
+        return document, None, document
+    if isinstance(document, dict):
+        lists = [(len(v), k) for k, v in document.items() if isinstance(v, list)]
+        if lists:
+            field = max(lists)[1]
+            return document, field, document[field]
+    return None
+
+
+def _total(document: Any) -> Optional[int]:
+    """The number of results a search document says there are, if it does."""
+    if not isinstance(document, dict):
+        return None
+    total = next((document[name] for name in TOTAL_FIELDS if name in document), None)
+    return total if isinstance(total, int) else None
+
+
+class SearchCache:
+    """Windows of SEARCH_WINDOW results of normalized queries, by (query,
+    window number), for `ttl` seconds."""
+
+    def __init__(self, ttl: float, entries: int):
+        self.ttl = ttl
+        self.entries = entries
+        self._held: OrderedDict[tuple[str, int], tuple[float, upstream.Response]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @tracing.traced("cache lookup search")
+    def get(self, query: tuple[str, int]) -> Optional[upstream.Response]:
+        with self._lock:
+            held = self._held.get(query)
+            hit = held is not None and time.monotonic() < held[0]
+            tracing.annotate({"pathfinder.cache.hit": hit})
+            if hit:
+                self._held.move_to_end(query)
+                self.hits += 1
+                return held[1]
+            self._held.pop(query, None)
+            self.misses += 1
+            return None
+
+    def put(self, query: tuple[str, int], response: upstream.Response) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._held[query] = (time.monotonic() + self.ttl, response)
+            self._held.move_to_end(query)
+            while len(self._held) > self.entries:
+                self._held.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._held.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._held),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+_search_cache = SearchCache(SEARCH_CACHE_TTL, SEARCH_CACHE_ENTRIES)
+
+
+def _search_upstream(query: str, page_number: int, page_size: int) -> upstream.Response:
     # POST {pageNumber: 1, pageSize: 20, searchQuery: "bgp show peers"}
     payload = {"searchQuery": query, "pageNumber": page_number, "pageSize": page_size}
-    response = requests.post(URLS["search"], json=payload, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return CliExplorerResponse(success=True, response=response.json())
-    return CliExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    return upstream.post("search", URLS["search"], json=payload, verify=VERIFY_SSL)
+
+
+def _page(
+    response: upstream.Response, page_number: int, page_size: int, first: int = 0
+) -> Optional[Any]:
+    """Slice a page out of a held window of results starting with result
+    `first`, or None if the page isn't all in it."""
+    found = response.derived("results", _results)
+    if found is None:
+        return None
+    document, field, results = found
+    total = _total(document)
+    # without a total, only a full window suggests there are more results.
+    more = len(results) >= SEARCH_WINDOW if total is None else total > first + len(results)
+    if first and more and len(results) < SEARCH_WINDOW:
+        # the upstream capped the page size, so where this window starts isn't known.
+        return None
+    start = (max(page_number, 1) - 1) * page_size - first
+    if start + page_size > len(results) and more:
+        return None
+    page = results[start : start + page_size]
+    if field is None:
+        return page
+    sliced = {**document, field: page}
+    for name in PAGE_NUMBER_FIELDS:
+        if name in document:
+            sliced[name] = max(page_number, 1)
+    for name in PAGE_SIZE_FIELDS:
+        if name in document:
+            sliced[name] = page_size
+    if "totalPages" in document and total is not None:
+        sliced["totalPages"] = -(-total // page_size)
+    return sliced
+
+
+## Searching locally.
+##
+## A BM25 index (see jnpr_pathfinder_mcp.search.BM25Index) over every node
+## of the topic reference and hierarchy, or of the hierarchy in the offline
+## dataset when there is one, so searches don't depend on the remote search
+## endpoint.  The sources are refetched (conditionally) at most every
+## LOCAL_SEARCH_TTL seconds, and only the nodes that changed are re-indexed.
+
+# "remote" searches with the upstream's search endpoint, "local" with the local index.
+SEARCH_BACKEND = os.environ.get("JNPR_PATHFINDER_SEARCH_BACKEND", "remote")
+LOCAL_SEARCH_TTL = float(os.environ.get("JNPR_PATHFINDER_LOCAL_SEARCH_TTL", "3600"))
+# characters of a node's text fields kept in local search results.
+RESULT_FIELD_CHARS = 200
+
+_local_index = search.BM25Index()
+_local_state: dict[str, Any] = {"sources": [], "expires": 0.0}
+_local_lock = threading.Lock()
+
+
+def _search_document(source: str, path: str, fields: dict[str, Any]) -> tuple:
+    text = " ".join(str(value) for value in fields.values() if isinstance(value, (str, int)))
+    shown = {
+        key: value[:RESULT_FIELD_CHARS] if isinstance(value, str) else value
+        for key, value in fields.items()
+    }
+    return f"{source}:{path}", path, text, {"source": source, **shown}
+
+
+def _scalars(node: Any) -> dict[str, Any]:
+    if isinstance(node, dict):
+        return {key: value for key, value in node.items() if not isinstance(value, (list, dict))}
+    return {} if isinstance(node, list) else {"value": node}
+
+
+def _tree_documents(source: str, tree: Any) -> Iterator[tuple]:
+    """A search document for every node of a tree, by its path."""
+    stack: list[tuple[str, Any]] = [("", tree)]
+    while stack:
+        path, node = stack.pop()
+        if path:
+            yield _search_document(source, path, _scalars(node))
+        for name, child in resources.children(node) or []:
+            stack.append((f"{path}/{name}" if path else name, child))
+
+
+def _dataset_documents(offline: dataset.Dataset) -> Iterator[tuple]:
+    """A search document for every hierarchy node in the offline dataset."""
+    paths = offline.keys(dataset.CLI_PATHS)
+    for path, outline in zip(paths, offline.values(dataset.CLI_PATHS)):
+        if path:
+            fields = outline["fields"] if "fields" in outline else _scalars(outline["node"])
+            yield _search_document("hierarchy", path, fields)
+
+
+def _local_search_index() -> search.BM25Index:
+    """The local index, brought up to date if its sources may have changed.
+
+    If the sources can't be fetched, an index built earlier is used as it is.
+    """
+    with _local_lock:
+        if time.monotonic() < _local_state["expires"]:
+            return _local_index
+        offline = dataset.section(dataset.CLI_PATHS)
+        try:
+            if offline is not None:
+                sources: list[Any] = [offline]
+                documents: Iterator[tuple] = _dataset_documents(offline)
+            else:
+                reference = upstream.get(
+                    "topic_reference", URLS["topic_reference"], verify=VERIFY_SSL
+                )
+                hierarchy = _fetch_hierarchy()
+                sources = [reference, hierarchy]
+                documents = chain(
+                    _tree_documents("reference", resources.document(reference)),
+                    _tree_documents("hierarchy", resources.document(hierarchy)),
+                )
+        except Exception as e:
+            if not len(_local_index):
+                raise
+            log.warning("_local_search_index - keeping the index, sources unavailable: %s", e)
+            return _local_index
+        # unchanged (304) responses are the same objects, nothing to re-index.
+        if len(sources) != len(_local_state["sources"]) or any(
+            a is not b for a, b in zip(sources, _local_state["sources"])
+        ):
+            counts = _local_index.update(documents)
+            log.info("_local_search_index - %d documents, %s", len(_local_index), counts)
+        _local_state.update(sources=sources, expires=time.monotonic() + LOCAL_SEARCH_TTL)
+        return _local_index
+
+
+def _search_locally(query: str, page_number: int, page_size: int) -> CliExplorerResponse:
+    try:
+        index = _local_search_index()
+    except deadlines.Interrupted:
+        raise
+    except Exception as e:
+        return CliExplorerResponse(success=False, error=f"The local index can't be built: {e}")
+    total, results = index.search(query, page_size, (max(page_number, 1) - 1) * page_size)
+    return CliExplorerResponse(
+        success=True,
+        response={
+            "backend": "local",
+            "total": total,
+            "page_number": max(page_number, 1),
+            "page_size": page_size,
+            "results": results,
+        },
+    )
+
+
+@mcp.tool
+@deadlines.with_deadline(30)
+def search(
+    query: str,
+    page_number: int = 1,
+    page_size: int = 100,
+    backend: Annotated[
+        Literal["remote", "local"],
+        "remote: the CLI Explorer's search, local: a ranked search of the topic "
+        "reference and hierarchy, which works when the remote search is slow or down.",
+    ] = SEARCH_BACKEND,  # type: ignore[assignment]
+) -> CliExplorerResponse:
+    """Search for JUNOS CLI commands by keywords.
+
+    Pages are numbered from 1.  Repeated searches, in any case or spacing
+    and with any page size, are answered from results held for a while.
+    Local results carry the path of each matching node, read it with the
+    pathfinder://cli/hierarchy/{path} resource.
+    """
+    if backend == "local":
+        return _search_locally(query, page_number, page_size)
+    # the normalized query only identifies held results, the upstream gets the query as asked.
+    key = normalize_query(query)
+    window = (max(page_number, 1) - 1) * page_size // SEARCH_WINDOW
+    response = _search_cache.get((key, window))
+    if response is None:
+        response = _search_upstream(query, window + 1, SEARCH_WINDOW)
+        if not (response.ok and response.size):
+            return _cli_explorer_response(response)
+        if not response.stale:
+            _search_cache.put((key, window), response)
+    page = _page(response, page_number, page_size, window * SEARCH_WINDOW)
+    if page is None:
+        return _cli_explorer_response(_search_upstream(query, page_number, page_size))
+    return CliExplorerResponse(
+        success=True, response=page, stale=response.stale, age_seconds=response.age
+    )
 
 
 @mcp.tool
+@deadlines.with_deadline(120)
 def topic_reference() -> CliExplorerResponse:
     """Get the full list of topics (top level cli commands)."""
-    response = requests.get(URLS["topic_reference"], verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return CliExplorerResponse(success=True, response=response.json())
-    return CliExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    response = upstream.get("topic_reference", URLS["topic_reference"], verify=VERIFY_SSL)
+    return _cli_explorer_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(120)
 def topic_hierarchy() -> CliExplorerResponse:
     """Get the full topic (top level cli commands) hierarchy."""
-    response = requests.post(URLS["topic_hierarchy"], json={}, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return CliExplorerResponse(success=True, response=response.json())
-    return CliExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    return _cli_explorer_response(_fetch_hierarchy())
+
+
+## Resources, for clients that would rather read slices of the reference and
+## hierarchy than call a tool for all of it.
+
+
+@mcp.resource("pathfinder://cli/reference", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(120)
+def reference_resource() -> str:
+    """How the topic reference is split into chunks."""
+    response = upstream.get("topic_reference", URLS["topic_reference"], verify=VERIFY_SSL)
+    return resources.manifest(response, "pathfinder://cli/reference/chunk/{index}")
+
+
+@mcp.resource("pathfinder://cli/reference/chunk/{index}", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(120)
+def reference_chunk_resource(index: int) -> str:
+    """One chunk of the topic reference's JSON text."""
+    response = upstream.get("topic_reference", URLS["topic_reference"], verify=VERIFY_SSL)
+    return resources.chunk(response, index)
+
+
+## The topic hierarchy is only served by a POST.  It's sent as an idempotent
+## (conditional) request, but as the upstream may not answer a conditional
+## POST with a 304 the response is also held for HIERARCHY_TTL seconds, and
+## the tool, the resources and the local index all read that copy.
+
+HIERARCHY_TTL = float(os.environ.get("JNPR_PATHFINDER_HIERARCHY_TTL", "600"))
+
+_hierarchy_state: dict[str, Any] = {"response": None, "expires": 0.0}
+_hierarchy_lock = threading.Lock()
+
+
+def _fetch_hierarchy() -> upstream.Response:
+    """The topic hierarchy, held for HIERARCHY_TTL seconds once fetched."""
+    with _hierarchy_lock:
+        held = _hierarchy_state["response"]
+        if held is not None and time.monotonic() < _hierarchy_state["expires"]:
+            return held
+        response = upstream.post(
+            "topic_hierarchy",
+            URLS["topic_hierarchy"],
+            json={},
+            verify=VERIFY_SSL,
+            idempotent=True,
+        )
+        if response.ok and response.size and not response.stale:
+            _hierarchy_state.update(response=response, expires=time.monotonic() + HIERARCHY_TTL)
+        return response
+
+
+def _hierarchy_outline(path: str) -> str:
+    offline = dataset.section(dataset.CLI_PATHS)
+    if offline is not None:
+        outline = offline.get(dataset.CLI_PATHS, "/".join(s for s in path.split("/") if s))
+        if outline is not None:
+            return json.dumps(outline)
+    response = refresh.track("pathfinder://cli/hierarchy", _fetch_hierarchy)
+    return resources.outline(resources.lookup(response, path), path)
+
+
+def _hierarchy_outlines() -> Iterator[tuple[str, Any]]:
+    """Yield (path, outline) for every node of the topic hierarchy, for the
+    offline dataset."""
+    stack: list[tuple[str, Any]] = [("", resources.document(_fetch_hierarchy()))]
+    while stack:
+        path, node = stack.pop()
+        yield path, json.loads(resources.outline(node, path))
+        for name, child in resources.children(node) or []:
+            stack.append((f"{path}/{name}" if path else name, child))
+
+
+@mcp.resource("pathfinder://cli/hierarchy", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(120)
+def hierarchy_resource() -> str:
+    """The top level of the topic hierarchy."""
+    return _hierarchy_outline("")
+
+
+@mcp.resource("pathfinder://cli/hierarchy/{path*}", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(120)
+def hierarchy_node_resource(path: str) -> str:
+    """A node of the topic hierarchy, by the slash separated names leading to it."""
+    return _hierarchy_outline(path)
+
+
+refresh.enable_subscriptions(mcp)
 
 if __name__ == '__main__':  # pragma: nocover
     from jnpr_pathfinder_mcp.helpers import run_cli
-    run_cli(prog="Juniper CLI Explorer MCP Server", server=mcp)
+    run_cli(
+        prog="Juniper CLI Explorer MCP Server",
+        server=mcp,
+        import_path="jnpr_pathfinder_mcp.server.cli_explorer:mcp",
+    )
@@ -1,13 +1,32 @@
+import contextvars
 import functools
+import json
 import logging
 import re
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Annotated, Any, Optional
 
-import requests
 from bs4 import BeautifulSoup
 from fastmcp import FastMCP  # type: ignore
+from fastmcp.exceptions import ResourceError  # type: ignore
 from pydantic import BaseModel
 
+from jnpr_pathfinder_mcp import (
+    cache,
+    dataset,
+    deadlines,
+    matrix,
+    prefetch,
+    records,
+    refresh,
+    resources,
+    tracing,
+    upstream,
+)
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 file_handler = logging.FileHandler("/tmp/workspace.log")
@@ -26,6 +45,7 @@ Typical usage would include:
     - Fetching the models
     - Fetching the features for a given model and release.
     - Identifying whether a particular feature is supported on a given model/release combination.
+    - Comparing the features of several candidate models on a release with compare_models.
 """
 
 mcp = FastMCP(name="Juniper JUNOS Command Line Interface Explorer", instructions=INSTRUCTIONS)
@@ -53,6 +73,20 @@ class FeatureExplorerResponse(BaseModel):
     success: bool
     error: Optional[str] = None
     response: Optional[dict[str, Any] | list[dict[str, Any]]] = None
+    # set when the upstream is failing and the last known good response is returned.
+    stale: bool = False
+    age_seconds: Optional[float] = None
+
+
+def _feature_explorer_response(response: upstream.Response) -> FeatureExplorerResponse:
+    if response.ok and response.size:
+        return FeatureExplorerResponse(
+            success=True,
+            response=response.json(),
+            stale=response.stale,
+            age_seconds=response.age,
+        )
+    return FeatureExplorerResponse(success=False, error=response.text or "Empty response from API.")
 
 
 ## Helpers for building the model catalog, which I can't find as JSON, so
@@ -88,6 +122,7 @@ def _snake(to_convert: str) -> str:
     return key or to_convert.lower()
 
 
+@tracing.traced("catalog parse feature_explorer_page")
 def _parse_page_html(html: str):
     """Extract the platform ids from the feature explorer landing page.
 
@@ -113,20 +148,36 @@ def _parse_page_html(html: str):
 
         platforms.append((family, platform, pid))
         log.info("_parse_age_html - extracted %s:%s:%s", family, platform, pid)
+    tracing.annotate(
+        {"pathfinder.catalog.bytes": len(html), "pathfinder.catalog.entries": len(platforms)}
+    )
     return platforms
 
 
 @functools.lru_cache(maxsize=1)
+@tracing.traced("catalog build platforms")
 def _build_platform_catalog():
     """Get the feature explorer landing page for each category and parse it.
 
-    Returns: dict[model:str, dict[str, str | int]]
+    If a shared cache directory is configured, a catalog built by another
+    worker process is reused instead of scraping the pages again.
+
+    Returns: dict[model:str, CatalogEntry] - the family and product_key of each model
     """
+    snapshot = cache.load_snapshot("platform_catalog")
+    if snapshot:
+        log.info("_build_platform_catalogue - loaded %d entries from snapshot.", len(snapshot))
+        tracing.annotate({"pathfinder.catalog.source": "snapshot"})
+        return {
+            sys.intern(model): records.CatalogEntry(**entry) for model, entry in snapshot.items()
+        }
+
     catalog = {}
     log.info("_build_platform_catalogue - building...")
     for cat_key, cat_param in CATEGORIES.items():
         try:
-            r = requests.get(
+            r = upstream.get(
+                "product_keys",
                 _url_for("product_keys"),
                 params={"typ": "1", "category": cat_param},
                 headers=HEADERS,
@@ -135,6 +186,9 @@ def _build_platform_catalog():
             )
             r.raise_for_status()
             html = r.text
+        except deadlines.Interrupted:
+            # don't cache a partial catalog because the caller gave up.
+            raise
         except Exception as e:
             log.exception(f"_build_platform_catalog - ERROR fetching {cat_param}: {e}")
             continue
@@ -148,14 +202,26 @@ def _build_platform_catalog():
             cat_param,
         )
         for family, label, pid in products:
-            catalog[_snake(label)] = {"family": _snake(family), "product_key": pid}
+            catalog[sys.intern(_snake(label))] = records.CatalogEntry(
+                family=_snake(family), product_key=pid
+            )
             log.info(
                 "_build_platform_catalogue - adding %s:%s:%s", _snake(family), _snake(label), pid
             )
 
+    tracing.annotate(
+        {"pathfinder.catalog.source": "upstream", "pathfinder.catalog.entries": len(catalog)}
+    )
+    if catalog:
+        cache.save_snapshot(
+            "platform_catalog", {model: entry.as_dict() for model, entry in catalog.items()}
+        )
     return catalog
 
 
+cache.register_warmer("platform_catalog", _build_platform_catalog)
+
+
 def _get_pid_for_model(model: str) -> int:
     catalog = _build_platform_catalog()
     log.info("_get_pid_for_model - searching for %s in %s", _snake(model), catalog.keys())
@@ -177,6 +243,7 @@ def _get_pid_for_model(model: str) -> int:
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def software_releases(
     junos_os_type: Annotated[str, "One of ['Junos OS', 'Junos OS Evolved']"] = "Junos OS",
 ) -> FeatureExplorerResponse:
@@ -186,13 +253,15 @@ def software_releases(
       junos_os_type: str - one of "Junos OS" or "Junos OS Evolved"
     """
     payload = {"software": junos_os_type}
-    response = requests.post(_url_for("software_releases"), json=payload, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return FeatureExplorerResponse(success=True, response=response.json())
-    return FeatureExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    response = upstream.post(
+        "software_releases", _url_for("software_releases"), json=payload, verify=VERIFY_SSL
+    )
+    _prefetch_releases(junos_os_type, response)
+    return _feature_explorer_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def models_compatible_with_release(
     junos_version: Annotated[str, "A JUNOS software version like 25.1R2"],
     junos_os_type: Annotated[str, "One of ['Junos OS', 'Junos OS Evolved']"] = "Junos OS",
@@ -205,27 +274,35 @@ def models_compatible_with_release(
     """
     if junos_os_type not in ["Junos OS", "Junos OS Evolved"]:
         raise ValueError("junos_os_type must be one of ['Junos OS', 'Junos OS Evolved']")
-    url = _url_for("models_for_release").format(junos_os_type=junos_os_type, version=junos_version)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return FeatureExplorerResponse(success=True, response=response.json())
-    return FeatureExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    response = _fetch_models_for_release(junos_os_type, junos_version)
+    _prefetch_features(junos_os_type, junos_version, response)
+    return _feature_explorer_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def releases_compatible_with_model(
     model: Annotated[str, "A Juniper device model, like the ACX710."],
 ) -> FeatureExplorerResponse:
     """Fetch the releases compatible with the given model."""
     product_key = _get_pid_for_model(model)
     url = _url_for("releases_for_model").format(product_key=product_key)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return FeatureExplorerResponse(success=True, response=response.json())
-    return FeatureExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    response = upstream.get("releases_for_model", url, verify=VERIFY_SSL)
+    if response.ok and response.size and not response.stale:
+        releases = response.derived("releases", _releases_in)
+        # the answer covers both OS types, Evolved releases end in -EVO.
+        evolved = [release for release in releases if "EVO" in release.upper()]
+        _compatibility_matrix("Junos OS").add_model(
+            _snake(model), [release for release in releases if release not in evolved]
+        )
+        if evolved:
+            _compatibility_matrix("Junos OS Evolved").add_model(_snake(model), evolved)
+        _save_compatibility()
+    return _feature_explorer_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(60)
 def features_for_model_on_junos_version(
     model: Annotated[str, "A Juniper device model, like the ACX710."],
     junos_version: Annotated[str, "A JUNOS software version like 25.1R2"],
@@ -233,22 +310,25 @@ def features_for_model_on_junos_version(
 ) -> FeatureExplorerResponse:
     """Fetch the features for a given model on a specific release."""
     payload = {"software": junos_os_type, "release": junos_version, "platform": model}
-    response = requests.post(_url_for("features_for_model"), json=payload, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return FeatureExplorerResponse(success=True, response=response.json())
-    return FeatureExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    response = prefetch.post(
+        "features_for_model", _url_for("features_for_model"), json=payload, verify=VERIFY_SSL
+    )
+    if response.ok and response.size and not response.stale:
+        _record_support(junos_os_type, model, junos_version, response)
+        _recent_models.append(model)
+    return _feature_explorer_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(120)
 def feature_tree() -> FeatureExplorerResponse:
     """Fetch the feature tree, including all features and their keys."""
-    response = requests.get(_url_for("feature_tree"), verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return FeatureExplorerResponse(success=True, response=response.json())
-    return FeatureExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    response = upstream.get("feature_tree", _url_for("feature_tree"), verify=VERIFY_SSL)
+    return _feature_explorer_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def feature_details(
     feature_key: Annotated[
         str, "The unique alphanumeric key for the feature, can be found in feature tree."
@@ -256,22 +336,513 @@ def feature_details(
 ) -> FeatureExplorerResponse:
     """Fetch the details of a specific feature."""
     url = _url_for("feature_details").format(feature_key=feature_key)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return FeatureExplorerResponse(success=True, response=response.json())
-    return FeatureExplorerResponse(success=False, error=response.text or "Empty response from API.")
+    response = upstream.get("feature_details", url, verify=VERIFY_SSL)
+    return _feature_explorer_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(90)
 def product_keys() -> FeatureExplorerResponse:
     """Fetch the product IDs for all categories."""
     catalog = None
     error = None
     catalog = _build_platform_catalog()
     if catalog and len(catalog.keys()):
-        return FeatureExplorerResponse(success=True, response=catalog)
+        return FeatureExplorerResponse(
+            success=True, response={model: dict(entry) for model, entry in catalog.items()}
+        )
     return FeatureExplorerResponse(success=False, error=error or "Empty response from API.")
 
+
+## The feature support matrix.
+##
+## Every features_for_model_on_junos_version answer is recorded in a compact
+## feature x model x release matrix (see jnpr_pathfinder_mcp.matrix), one per
+## OS type, kept in a snapshot when a cache directory is configured.  The
+## support questions below are answered from the matrix without asking the
+## upstream.
+
+FEATURE_KEY_FIELDS = ("featureKey", "feature_key", "featureId", "key")
+FEATURE_NAME_FIELDS = ("featureName", "name", "title")
+
+_matrices: dict[str, matrix.FeatureMatrix] = {}
+_matrices_lock = threading.Lock()
+
+
+def _feature_keys(document: Any) -> set[str]:
+    """Collect every feature key in a features document, wherever it's nested."""
+    keys = set()
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for field in FEATURE_KEY_FIELDS:
+                if isinstance(node.get(field), (str, int)):
+                    keys.add(str(node[field]))
+                    break
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(node)
+    return keys
+
+
+def _nodes_by_key(document: Any) -> dict[str, dict[str, Any]]:
+    """Map each feature key in a feature tree to the node's own (scalar) fields."""
+    nodes = {}
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for field in FEATURE_KEY_FIELDS:
+                if isinstance(node.get(field), (str, int)):
+                    nodes[str(node[field])] = {
+                        k: v for k, v in node.items() if not isinstance(v, (dict, list))
+                    }
+                    break
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(node)
+    return nodes
+
+
+def _find_features(document: Any, feature: str) -> list[dict[str, Any]]:
+    """The features in a document with `feature` as their key or (ignoring
+    case) their name."""
+    nodes = _nodes_by_key(document)
+    if feature in nodes:
+        return [nodes[feature]]
+    wanted = feature.strip().lower()
+    return [
+        node
+        for node in nodes.values()
+        if any(str(node.get(field, "")).strip().lower() == wanted for field in FEATURE_NAME_FIELDS)
+    ]
+
+
+def _feature_nodes() -> dict[str, dict[str, Any]]:
+    """Every feature in the feature tree by key, for the offline dataset."""
+    response = upstream.get("feature_tree", _url_for("feature_tree"), verify=VERIFY_SSL)
+    return response.derived("nodes_by_key", _nodes_by_key) if response.ok and response.size else {}
+
+
+def _support_matrix(junos_os_type: str) -> matrix.FeatureMatrix:
+    with _matrices_lock:
+        if not _matrices:
+            snapshot = cache.load_snapshot("feature_matrix") or {}
+            for os_type, stored in snapshot.items():
+                _matrices[os_type] = matrix.FeatureMatrix.from_snapshot(stored)
+        return _matrices.setdefault(junos_os_type, matrix.FeatureMatrix())
+
+
+def _record_support(
+    junos_os_type: str, model: str, junos_version: str, response: upstream.Response
+) -> None:
+    keys = response.derived("feature_keys", _feature_keys)
+    if not keys:
+        return
+    _support_matrix(junos_os_type).record(_snake(model), junos_version, keys)
+    cache.save_snapshot_soon("feature_matrix", _support_snapshot)
+
+
+def _support_snapshot() -> dict[str, Any]:
+    with _matrices_lock:
+        return {os_type: m.to_snapshot() for os_type, m in _matrices.items()}
+
+
+@mcp.tool
+@deadlines.with_deadline(30)
+def models_supporting_feature(
+    feature_key: Annotated[str, "The feature's key, from the feature tree."],
+    junos_version: Annotated[str, "A JUNOS software version like 25.1R2"],
+    junos_os_type: Annotated[str, "One of ['Junos OS', 'Junos OS Evolved']"] = "Junos OS",
+) -> FeatureExplorerResponse:
+    """List the models that support a feature on a release.
+
+    Answered from the features already fetched with
+    features_for_model_on_junos_version, models that haven't been fetched for
+    the release are listed under no_data.
+    """
+    support = _support_matrix(junos_os_type).models_supporting(feature_key, junos_version)
+    return FeatureExplorerResponse(
+        success=True,
+        response={"feature_key": feature_key, "junos_version": junos_version, **support},
+    )
+
+
+@mcp.tool
+@deadlines.with_deadline(30)
+def feature_support_history(
+    feature_key: Annotated[str, "The feature's key, from the feature tree."],
+    model: Annotated[str, "A Juniper device model, like the ACX710."],
+    junos_os_type: Annotated[str, "One of ['Junos OS', 'Junos OS Evolved']"] = "Junos OS",
+) -> FeatureExplorerResponse:
+    """Show the releases on which support for a feature on a model changed.
+
+    Only releases already fetched with features_for_model_on_junos_version
+    are considered.
+    """
+    history = _support_matrix(junos_os_type).history(feature_key, _snake(model))
+    if history is None:
+        return FeatureExplorerResponse(
+            success=False, error=f"No features have been fetched for {model} yet."
+        )
+    return FeatureExplorerResponse(
+        success=True, response={"feature_key": feature_key, "model": model, "changes": history}
+    )
+
+
+def _features_of(junos_os_type: str, model: str, junos_version: str) -> Optional[set[str]]:
+    """The feature keys a model supports on a release: from the support matrix
+    if they've been fetched before, otherwise fetched (and recorded).  None if
+    the upstream has no features for them."""
+    held = _support_matrix(junos_os_type).features_of(_snake(model), junos_version)
+    if held is not None:
+        return held
+    payload = {"software": junos_os_type, "release": junos_version, "platform": model}
+    response = prefetch.post(
+        "features_for_model", _url_for("features_for_model"), json=payload, verify=VERIFY_SSL
+    )
+    if not (response.ok and response.size):
+        return None
+    if not response.stale:
+        _record_support(junos_os_type, model, junos_version, response)
+    return response.derived("feature_keys", _feature_keys)
+
+
+@mcp.tool
+@deadlines.with_deadline(90)
+def compare_models(
+    models: Annotated[list[str], "Two or more models, like ['ACX7100-48L', 'ACX7509']."],
+    junos_version: Annotated[str, "A JUNOS software version like 25.1R2"],
+    junos_os_type: Annotated[str, "One of ['Junos OS', 'Junos OS Evolved']"] = "Junos OS",
+    max_differences: Annotated[int, "The most differing features to list."] = 200,
+) -> FeatureExplorerResponse:
+    """Compare the features several models support on the same release.
+
+    The models' feature lists are fetched concurrently (or taken from those
+    already fetched) and only the features that differ between the models
+    are listed, each with the models that support it, along with the number
+    of features every model shares and the number unique to each model.
+    Look differing feature keys up with feature_details.
+    """
+    if junos_os_type not in ["Junos OS", "Junos OS Evolved"]:
+        raise ValueError("junos_os_type must be one of ['Junos OS', 'Junos OS Evolved']")
+    models = list(dict.fromkeys(models))
+    if len(models) < 2:
+        raise ValueError("At least two models are required.")
+
+    # each fetch runs in the caller's context so it keeps the tool's deadline.
+    with ThreadPoolExecutor(max_workers=min(len(models), MAX_PARALLEL_FETCHES)) as executor:
+        futures = {
+            model: executor.submit(
+                contextvars.copy_context().run, _features_of, junos_os_type, model, junos_version
+            )
+            for model in models
+        }
+        features = {model: future.result() for model, future in futures.items()}
+
+    missing = [model for model, keys in features.items() if keys is None]
+    if missing:
+        return FeatureExplorerResponse(
+            success=False,
+            error=f"No features found for {', '.join(missing)} on {junos_version}. "
+            "Check the model names and that the release is compatible with them.",
+        )
+
+    supported_by: dict[str, list[str]] = {}
+    for model in models:
+        for feature_key in features[model]:  # type: ignore[union-attr]
+            supported_by.setdefault(feature_key, []).append(model)
+    differing = sorted(key for key, found in supported_by.items() if len(found) < len(models))
+    return FeatureExplorerResponse(
+        success=True,
+        response={
+            "junos_version": junos_version,
+            "junos_os_type": junos_os_type,
+            "models": models,
+            "features": {model: len(features[model]) for model in models},  # type: ignore
+            "shared": len(supported_by) - len(differing),
+            "unique": {
+                model: sum(1 for found in supported_by.values() if found == [model])
+                for model in models
+            },
+            "differing": len(differing),
+            "differences": {key: supported_by[key] for key in differing[:max_differences]},
+            "truncated": len(differing) > max_differences,
+        },
+    )
+
+
+## The release <-> model compatibility matrix.
+##
+## models_compatible_with_release and releases_compatible_with_model answers
+## are recorded in one matrix per OS type (see
+## jnpr_pathfinder_mcp.matrix.CompatibilityMatrix), kept in a snapshot when
+## a cache directory is configured, so either direction and ranges of
+## releases can be answered locally.  Missing releases in a range are
+## crawled concurrently.
+
+RELEASE_RE = re.compile(r"^\d+\.\d+[A-Z]\d*(?:[-.][A-Z0-9.-]+)?$")
+MODEL_FIELDS = ("platform", "platformName", "productName", "model", "modelName", "name")
+MAX_PARALLEL_FETCHES = 8
+
+_compatibility: dict[str, matrix.CompatibilityMatrix] = {}
+_compatibility_lock = threading.Lock()
+
+
+def _releases_in(document: Any) -> list[str]:
+    """Every string in a document that looks like a JUNOS release."""
+    releases = set()
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, str) and RELEASE_RE.match(node.strip()):
+            releases.add(node.strip())
+    return sorted(releases, key=matrix.release_key)
+
+
+def _models_in(document: Any) -> list[str]:
+    """The model names in a models_for_release document."""
+    models = set()
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for field in MODEL_FIELDS:
+                if isinstance(node.get(field), str) and node[field]:
+                    models.add(_snake(node[field]))
+                    break
+            stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            stack.extend(node)
+    return sorted(models)
+
+
+def _compatibility_matrix(junos_os_type: str) -> matrix.CompatibilityMatrix:
+    with _compatibility_lock:
+        if not _compatibility:
+            snapshot = cache.load_snapshot("compatibility_matrix") or {}
+            for os_type, stored in snapshot.items():
+                _compatibility[os_type] = matrix.CompatibilityMatrix.from_snapshot(stored)
+        return _compatibility.setdefault(junos_os_type, matrix.CompatibilityMatrix())
+
+
+def _save_compatibility() -> None:
+    cache.save_snapshot_soon("compatibility_matrix", _compatibility_snapshot)
+
+
+def _compatibility_snapshot() -> dict[str, Any]:
+    with _compatibility_lock:
+        return {os_type: m.to_snapshot() for os_type, m in _compatibility.items()}
+
+
+def _fetch_models_for_release(junos_os_type: str, junos_version: str) -> upstream.Response:
+    url = _url_for("models_for_release").format(junos_os_type=junos_os_type, version=junos_version)
+    response = prefetch.get("models_for_release", url, verify=VERIFY_SSL)
+    if response.ok and response.size and not response.stale:
+        models = response.derived("models", _models_in)
+        _compatibility_matrix(junos_os_type).add_release(junos_version, models)
+        _save_compatibility()
+    return response
+
+
+def _crawl_releases(junos_os_type: str, start: str, end: str) -> list[str]:
+    """Fetch the models of every release from start to end not already in
+    the matrix, returning the releases that couldn't be fetched."""
+    payload = {"software": junos_os_type}
+    response = upstream.post(
+        "software_releases", _url_for("software_releases"), json=payload, verify=VERIFY_SSL
+    )
+    response.raise_for_status()
+    lo, hi = matrix.release_key(start), matrix.release_key(end) + ((2, ""),)
+    compatibility = _compatibility_matrix(junos_os_type)
+    missing = [
+        release
+        for release in response.derived("releases", _releases_in)
+        if lo <= matrix.release_key(release) < hi and not compatibility.is_complete(release)
+    ]
+    failed = []
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_FETCHES) as executor:
+        futures = {
+            release: executor.submit(
+                contextvars.copy_context().run,
+                _fetch_models_for_release,
+                junos_os_type,
+                release,
+            )
+            for release in missing
+        }
+        for release, future in futures.items():
+            try:
+                if not future.result().ok:
+                    failed.append(release)
+            except deadlines.Interrupted:
+                raise
+            except Exception as e:
+                log.warning("_crawl_releases - couldn't fetch the models of %s: %s", release, e)
+                failed.append(release)
+    return failed
+
+
+@mcp.tool
+@deadlines.with_deadline(120)
+def models_across_releases(
+    start_release: Annotated[str, "The first JUNOS release, like 23.4R1"],
+    end_release: Annotated[str, "The last JUNOS release, like 25.1R2"],
+    require_all: Annotated[
+        bool, "True for models compatible with every release, False for any release."
+    ] = True,
+    junos_os_type: Annotated[str, "One of ['Junos OS', 'Junos OS Evolved']"] = "Junos OS",
+) -> FeatureExplorerResponse:
+    """List the models compatible with every (or any) release in a range.
+
+    Releases in the range whose models haven't been fetched yet are fetched
+    first, after that the answer comes from the local compatibility matrix.
+    """
+    failed = _crawl_releases(junos_os_type, start_release, end_release)
+    compatibility = _compatibility_matrix(junos_os_type)
+    return FeatureExplorerResponse(
+        success=True,
+        response={
+            "releases": compatibility.releases_between(start_release, end_release),
+            "unavailable_releases": failed,
+            "models": compatibility.models_across(start_release, end_release, require_all),
+        },
+    )
+
+
+@mcp.tool
+@deadlines.with_deadline(30)
+def known_compatibility(
+    model: Annotated[Optional[str], "A Juniper device model, like the ACX710."] = None,
+    junos_version: Annotated[Optional[str], "A JUNOS software version like 25.1R2"] = None,
+    junos_os_type: Annotated[str, "One of ['Junos OS', 'Junos OS Evolved']"] = "Junos OS",
+) -> FeatureExplorerResponse:
+    """Answer release <-> model compatibility from what's already been fetched.
+
+    Give a model for its releases, a release for its models, or both to
+    check one pair.  Nothing is fetched from the upstream.
+    """
+    compatibility = _compatibility_matrix(junos_os_type)
+    if model is None and junos_version is None:
+        raise ValueError("Give a model, a junos_version or both.")
+    if junos_version is None:
+        releases = compatibility.releases_for(_snake(model))
+        if releases is None:
+            return FeatureExplorerResponse(success=False, error=f"Nothing is known about {model}.")
+        return FeatureExplorerResponse(
+            success=True, response={"model": model, "releases": releases}
+        )
+    models = compatibility.models_for(junos_version)
+    if models is None:
+        return FeatureExplorerResponse(
+            success=False, error=f"Nothing is known about {junos_version}."
+        )
+    if model is None:
+        return FeatureExplorerResponse(
+            success=True, response={"junos_version": junos_version, "models": models}
+        )
+    return FeatureExplorerResponse(
+        success=True,
+        response={
+            "model": model,
+            "junos_version": junos_version,
+            "compatible": _snake(model) in models,
+        },
+    )
+
+
+## Resources, for clients that would rather read the feature tree in slices
+## than call a tool for all of it.
+
+
+@mcp.resource("pathfinder://feature/tree", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(120)
+def feature_tree_resource() -> str:
+    """How the feature tree is split into chunks."""
+    response = refresh.track(
+        "pathfinder://feature/tree",
+        lambda: upstream.get("feature_tree", _url_for("feature_tree"), verify=VERIFY_SSL),
+    )
+    return resources.manifest(response, "pathfinder://feature/tree/chunk/{index}")
+
+
+@mcp.resource("pathfinder://feature/tree/chunk/{index}", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(120)
+def feature_tree_chunk_resource(index: int) -> str:
+    """One chunk of the feature tree's JSON text."""
+    response = upstream.get("feature_tree", _url_for("feature_tree"), verify=VERIFY_SSL)
+    return resources.chunk(response, index)
+
+
+@mcp.resource("pathfinder://feature/key/{feature_key}", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(120)
+def feature_resource(feature_key: str) -> str:
+    """A feature's node in the feature tree, without its children."""
+    offline = dataset.section(dataset.FEATURES)
+    if offline is not None:
+        node = offline.get(dataset.FEATURES, feature_key)
+    else:
+        response = upstream.get("feature_tree", _url_for("feature_tree"), verify=VERIFY_SSL)
+        resources.document(response)
+        node = response.derived("nodes_by_key", _nodes_by_key).get(feature_key)
+    if node is None:
+        raise ResourceError(f"No feature with key {feature_key!r}.")
+    return json.dumps(node)
+
+
+@mcp.resource("pathfinder://feature/releases/{junos_os_type}", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(30)
+def releases_resource(junos_os_type: str) -> str:
+    """The software releases for "Junos OS" or "Junos OS Evolved"."""
+    payload = {"software": junos_os_type}
+    response = refresh.track(
+        f"pathfinder://feature/releases/{junos_os_type}",
+        lambda: upstream.post(
+            "software_releases", _url_for("software_releases"), json=payload, verify=VERIFY_SSL
+        ),
+    )
+    return resources.serialized(response)
+
+
+## Prefetching the next step of the INSTRUCTIONS workflow (see
+## jnpr_pathfinder_mcp.prefetch): the models of the newest releases once the
+## releases are listed, and once a release's models are listed, the features
+## on that release of the models features were recently asked for, which is
+## how releases get compared.  Nothing happens unless prefetching is enabled.
+
+_recent_models: deque[str] = deque(maxlen=prefetch.PREFETCH_FANOUT)
+
+
+def _prefetch_releases(junos_os_type: str, response: upstream.Response) -> None:
+    if not (prefetch.fanout() and response.ok and response.size):
+        return
+    for release in response.derived("releases", _releases_in)[-prefetch.fanout() :]:
+        url = _url_for("models_for_release").format(junos_os_type=junos_os_type, version=release)
+        prefetch.ahead("get", "models_for_release", url, verify=VERIFY_SSL)
+
+
+def _prefetch_features(junos_os_type: str, junos_version: str, response: upstream.Response) -> None:
+    if not (prefetch.fanout() and response.ok and response.size):
+        return
+    models = set(response.derived("models", _models_in))
+    for model in [m for m in dict.fromkeys(reversed(_recent_models)) if _snake(m) in models]:
+        payload = {"software": junos_os_type, "release": junos_version, "platform": model}
+        url = _url_for("features_for_model")
+        prefetch.ahead("post", "features_for_model", url, json=payload, verify=VERIFY_SSL)
+
+
+refresh.enable_subscriptions(mcp)
+
 if __name__ == '__main__':  # pragma: nocover
     from jnpr_pathfinder_mcp.helpers import run_cli
-    run_cli(prog="Juniper Feature Explorer MCP Server", server=mcp)
+    run_cli(
+        prog="Juniper Feature Explorer MCP Server",
+        server=mcp,
+        import_path="jnpr_pathfinder_mcp.server.feature_explorer:mcp",
+    )
+
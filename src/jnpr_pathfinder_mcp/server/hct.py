@@ -1,10 +1,31 @@
+import contextvars
+import functools
+import json
 import logging
-from typing import Any, Optional
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Any, Callable, Iterable, Iterator, Literal, Mapping, Optional
 
-import requests
 from fastmcp import FastMCP  # type: ignore
+from fastmcp.exceptions import ResourceError  # type: ignore
 from pydantic import BaseModel
 
+from jnpr_pathfinder_mcp import (
+    cache,
+    dataset,
+    deadlines,
+    prefetch,
+    records,
+    refresh,
+    resources,
+    search,
+    tracing,
+    upstream,
+)
+
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 file_handler = logging.FileHandler("/tmp/workspace.log")
@@ -21,10 +42,14 @@ These tools allow you to access the Hardware Compatibility Tool (HCT) API. A typ
 
 - Get the list of all categories
 - Get the list of components in the categories your interested in.
-- Confirm that the component name exists.
+- Confirm that the component name exists (search_components is the quickest way).
 - Get the component details.
 - Get the supported models and platforms.
 
+To find the components that work on several platforms at once (or on any of
+them, or on one but not the others), use common_components instead of
+comparing components_for_platform lists.
+
 Juniper groups things in the following way:
 
 - Family (Routing, Switching, Security, etc.)
@@ -52,19 +77,59 @@ URLS = {
 
 VERIFY_SSL = False
 
+# How long the component sets of a platform are reused before asking the
+# upstream again.
+PLATFORM_COMPONENTS_TTL = float(os.environ.get("JNPR_PATHFINDER_PLATFORM_COMPONENTS_TTL", "300"))
+# Platforms fetched at once by common_components, the upstream limiter still applies.
+MAX_PARALLEL_FETCHES = 8
+
+# Component listings don't have a documented schema, these are the fields
+# we look for, in order of preference.
+COMPONENT_NAME_FIELDS = ("modelName", "componentName", "name", "model", "partNumber")
+COMPONENT_CATEGORY_FIELDS = ("categoryName", "category", "categoryKey", "categoryId")
+COMPONENT_DESCRIPTION_FIELDS = ("description", "modelDescription", "shortDescription")
+CATEGORY_KEY_FIELDS = ("categoryKey", "key", "categoryId", "id")
+CATEGORY_NAME_FIELDS = ("categoryName", "name", "category")
+HIERARCHY_NAME_FIELDS = (
+    "platformName",
+    "productName",
+    "seriesName",
+    "familyName",
+    "name",
+    "platform",
+    "series",
+    "family",
+)
+
+# How long a platform or component name an endpoint said doesn't exist is
+# answered locally as unknown.
+NEGATIVE_TTL = float(os.environ.get("JNPR_PATHFINDER_NEGATIVE_TTL", "60"))
+# How long the platform hierarchy names are checked against is reused, so a
+# new platform isn't unknown for longer than this.
+PLATFORM_HIERARCHY_TTL = float(os.environ.get("JNPR_PATHFINDER_PLATFORM_HIERARCHY_TTL", "600"))
+# How long the component catalog is searched before it's rebuilt (from the
+# snapshot while there's a recent one), so new components are found.
+COMPONENT_CATALOG_TTL = float(os.environ.get("JNPR_PATHFINDER_COMPONENT_CATALOG_TTL", "3600"))
+NOT_FOUND = 404
+
 
 class HctResponse(BaseModel):
     success: bool
     error: Optional[str] = None
     response: Optional[dict[str, Any] | list[dict[str, Any]]] = None
-
-
-@mcp.tool
-def categories() -> HctResponse:
-    """Get the list of all component categories."""
-    response = requests.get(URLS["categories"], verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
+    # set when the upstream is failing and the last known good response is returned.
+    stale: bool = False
+    age_seconds: Optional[float] = None
+
+
+def _hct_response(response: upstream.Response) -> HctResponse:
+    if response.ok and response.size:
+        return HctResponse(
+            success=True,
+            response=response.json(),
+            stale=response.stale,
+            age_seconds=response.age,
+        )
     return HctResponse(
         success=False,
         error=response.text
@@ -73,117 +138,716 @@ def categories() -> HctResponse:
 
 
 @mcp.tool
+@deadlines.with_deadline(60)
+def categories() -> HctResponse:
+    """Get the list of all component categories."""
+    response = upstream.get("categories", URLS["categories"], verify=VERIFY_SSL)
+    _prefetch_categories(response)
+    return _hct_response(response)
+
+
+@mcp.tool
+@deadlines.with_deadline(60)
 def category_components(category_key: int) -> HctResponse:
     """Get the list of all components in a category."""
     url = URLS["category_components"].format(category_key=category_key)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
-    return HctResponse(
-        success=False,
-        error=response.text
-        or "Empty response from API. Check that component names and category ids are correct.",
-    )
+    response = prefetch.get("category_components", url, verify=VERIFY_SSL)
+    _prefetch_components(response)
+    return _hct_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def component_details(component_name: str) -> HctResponse:
     """Get the details of a specific component."""
+    error = _negative.get("component_details", component_name)
+    if error:
+        return HctResponse(success=False, error=error)
     url = URLS["component_details"].format(component_name=component_name)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
-    return HctResponse(
-        success=False,
-        error=response.text
-        or "Empty response from API. Check that component names and category ids are correct.",
-    )
+    response = prefetch.get("component_details", url, verify=VERIFY_SSL)
+    if response.ok and response.size:
+        _prefetch_component(component_name)
+    # every component has details, an empty answer means there's no such component.
+    return _remember_miss("component_details", "component", component_name, response, empty=True)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def component_supported_platforms(component_name: str) -> HctResponse:
     """Get list of platforms on which a component is supported."""
+    error = _negative.get("component_supported_platforms", component_name)
+    if error:
+        return HctResponse(success=False, error=error)
     url = URLS["component_supported_platforms"].format(component_name=component_name)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
-    return HctResponse(
-        success=False,
-        error=response.text
-        or "Empty response from API. Check that component names and category ids are correct.",
-    )
+    response = prefetch.get("component_supported_platforms", url, verify=VERIFY_SSL)
+    return _remember_miss("component_supported_platforms", "component", component_name, response)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def component_supported_models(component_name: str) -> HctResponse:
     """Get the list of models that support the component."""
+    error = _negative.get("component_supported_models", component_name)
+    if error:
+        return HctResponse(success=False, error=error)
     url = URLS["component_supported_models"].format(component_name=component_name)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
-    return HctResponse(
-        success=False,
-        error=response.text
-        or "Empty response from API. Check that component names and category ids are correct.",
-    )
+    response = prefetch.get("component_supported_models", url, verify=VERIFY_SSL)
+    return _remember_miss("component_supported_models", "component", component_name, response)
 
 
 @mcp.tool
+@deadlines.with_deadline(60)
 def platforms_by_family() -> HctResponse:
     """Get the list of all platforms grouped by family."""
     url = URLS["platforms_grouped_by_family"].format()
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
-    return HctResponse(
-        success=False,
-        error=response.text
-        or "Empty response from API. Check that component names and category ids are correct.",
-    )
+    response = upstream.get("platforms_grouped_by_family", url, verify=VERIFY_SSL)
+    return _hct_response(response)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def components_for_platform(platform: str) -> HctResponse:
     """Get the list of models that support the component."""
+    platform, error = _check_platform(platform)
+    error = error or _negative.get("platform_components", platform)
+    if error:
+        return HctResponse(success=False, error=error)
     url = URLS["platform_components"].format(platform=platform)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
-    return HctResponse(
-        success=False,
-        error=response.text
-        or "Empty response from API. Check that component names and category ids are correct.",
-    )
+    response = upstream.get("platform_components", url, verify=VERIFY_SSL)
+    return _remember_miss("platform_components", "platform", platform, response)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def platform_hardware_details(platform: str) -> HctResponse:
     """Get the list of platforms that support the component."""
+    platform, error = _check_platform(platform)
+    error = error or _negative.get("platform_hardware_specification_detail", platform)
+    if error:
+        return HctResponse(success=False, error=error)
     url = URLS["platform_hardware_specification_detail"]
     payload = {"productName": platform}
-    response = requests.post(url, json=payload, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
-    return HctResponse(
-        success=False,
-        error=response.text
-        or "Empty response from API. Check that component names and category ids are correct.",
+    response = upstream.post(
+        "platform_hardware_specification_detail", url, json=payload, verify=VERIFY_SSL
     )
+    return _remember_miss("platform_hardware_specification_detail", "platform", platform, response)
 
 
 @mcp.tool
+@deadlines.with_deadline(30)
 def platform_information(platform: str) -> HctResponse:
     """Get the list of platforms that support the component."""
+    platform, error = _check_platform(platform)
+    error = error or _negative.get("platform_information", platform)
+    if error:
+        return HctResponse(success=False, error=error)
     url = URLS["platform_information"].format(platform=platform)
-    response = requests.get(url, verify=VERIFY_SSL)
-    if response.ok and len(response.content):
-        return HctResponse(success=True, response=response.json())
+    response = upstream.get("platform_information", url, verify=VERIFY_SSL)
+    return _remember_miss("platform_information", "platform", platform, response)
+
+
+## Prefetching the next step of the INSTRUCTIONS workflow (see
+## jnpr_pathfinder_mcp.prefetch): the first few categories' components, the
+## first few components' details and a component's supported platforms and
+## models.  Nothing happens unless prefetching is enabled.
+
+
+def _prefetch_categories(response: upstream.Response) -> None:
+    if not (prefetch.fanout() and response.ok and response.size):
+        return
+    keys = [_first_field(c, CATEGORY_KEY_FIELDS) for _, c in _records(response.json())]
+    for key in [key for key in keys if key][: prefetch.fanout()]:
+        url = URLS["category_components"].format(category_key=key)
+        prefetch.ahead("get", "category_components", url, verify=VERIFY_SSL)
+
+
+def _prefetch_components(response: upstream.Response) -> None:
+    if not (prefetch.fanout() and response.ok and response.size):
+        return
+    names = [_first_field(r, COMPONENT_NAME_FIELDS) for _, r in _records(response.json())]
+    for name in [name for name in names if name][: prefetch.fanout()]:
+        url = URLS["component_details"].format(component_name=name)
+        prefetch.ahead("get", "component_details", url, verify=VERIFY_SSL)
+
+
+def _prefetch_component(component_name: str) -> None:
+    for key in ("component_supported_platforms", "component_supported_models"):
+        url = URLS[key].format(component_name=component_name)
+        prefetch.ahead("get", key, url, verify=VERIFY_SSL)
+
+
+## Set operations over the components of several platforms.
+##
+## Each platform's listing is reduced to a mapping of interned component
+## name -> categories, built once per document and held for
+## PLATFORM_COMPONENTS_TTL, so comparing platforms is set arithmetic over
+## shared strings rather than a merge of long lists.
+
+_platform_components: dict[str, tuple[float, dict[str, frozenset[str]]]] = {}
+_platform_components_lock = threading.Lock()
+
+
+def _first_field(record: dict[str, Any], fields: tuple[str, ...]) -> Optional[str]:
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, ""):
+            return str(value)
+    return None
+
+
+def _records(document: Any) -> Iterator[tuple[Optional[str], dict[str, Any]]]:
+    """Yield (group, record) for each record in a listing.
+
+    A listing is either a list of records, or a mapping of group (category)
+    to a list of records.
+    """
+    if isinstance(document, dict):
+        groups = list(document.items())
+    else:
+        groups = [(None, document)]
+    for group, listing in groups:
+        if not isinstance(listing, list):
+            continue
+        for record in listing:
+            if isinstance(record, dict):
+                yield group, record
+
+
+def _index_components(document: Any) -> dict[str, frozenset[str]]:
+    """Map each component name in a listing to the (lowercased) categories it's in."""
+    index: dict[str, set[str]] = {}
+    for group, record in _records(document):
+        name = _first_field(record, COMPONENT_NAME_FIELDS)
+        if name is None:
+            continue
+        categories = index.setdefault(sys.intern(name), set())
+        for field in COMPONENT_CATEGORY_FIELDS:
+            if record.get(field) not in (None, ""):
+                categories.add(str(record[field]).lower())
+        if group is not None:
+            categories.add(str(group).lower())
+    return {name: frozenset(categories) for name, categories in index.items()}
+
+
+def _components_of(platform: str) -> dict[str, frozenset[str]]:
+    """Return the component index for a platform, fetching it if it isn't held.
+
+    Raises: ValueError if the upstream has no components for the platform,
+        or said recently that there's no such platform.
+    """
+    now = time.monotonic()
+    with _platform_components_lock:
+        held = _platform_components.get(platform)
+    if held is not None and now - held[0] < PLATFORM_COMPONENTS_TTL:
+        return held[1]
+    error = _negative.get("platform_components", platform)
+    if error:
+        raise ValueError(error)
+
+    url = URLS["platform_components"].format(platform=platform)
+    response = upstream.get("platform_components", url, verify=VERIFY_SSL)
+    if not (response.ok and response.size):
+        _remember_miss("platform_components", "platform", platform, response)
+        raise ValueError(f"No components found for platform {platform}.")
+    index = response.derived("component_index", _index_components)
+    with _platform_components_lock:
+        _platform_components[platform] = (now, index)
+    return index
+
+
+def _in_category(categories: frozenset[str], category: Optional[str]) -> bool:
+    return category is None or category.lower() in categories
+
+
+@deadlines.with_deadline(30)
+def _component_on_platform(platform: str, component_name: str) -> HctResponse:
+    """Check whether a component (an optic, say) is supported on a platform,
+    from the platform's component listing."""
+    platform, error = _check_platform(platform)
+    if error:
+        return HctResponse(success=False, error=error)
+    try:
+        index = _components_of(platform)
+    except ValueError as e:
+        return HctResponse(success=False, error=str(e))
+    wanted = component_name.strip().lower()
+    match = next((name for name in index if name.lower() == wanted), None)
     return HctResponse(
-        success=False,
-        error=response.text
-        or "Empty response from API. Check that component names and category ids are correct.",
+        success=True,
+        response={
+            "platform": platform,
+            "component": match or component_name,
+            "supported": match is not None,
+            "categories": sorted(index[match]) if match else [],
+        },
+    )
+
+
+@mcp.tool
+@deadlines.with_deadline(60)
+def common_components(
+    platforms: Annotated[list[str], "Two or more platforms, like ['MX204', 'MX304']."],
+    category: Annotated[
+        Optional[str], "Only consider components in this category (name or key)."
+    ] = None,
+    operation: Annotated[
+        Literal["intersection", "union", "difference"],
+        "intersection: on every platform, union: on any platform, "
+        "difference: on the first platform but none of the others.",
+    ] = "intersection",
+) -> HctResponse:
+    """Get the components supported on all (or any) of several platforms.
+
+    The component lists of the platforms are fetched concurrently and only
+    the names of the components in the result are returned.
+    """
+    if not platforms:
+        return HctResponse(success=False, error="At least one platform is required.")
+    checked = [_check_platform(platform) for platform in platforms]
+    errors = [error for _, error in checked if error]
+    if errors:
+        return HctResponse(success=False, error=" ".join(errors))
+    platforms = list(dict.fromkeys(platform for platform, _ in checked))
+
+    # each fetch runs in the caller's context so it keeps the tool's deadline.
+    with ThreadPoolExecutor(max_workers=min(len(platforms), MAX_PARALLEL_FETCHES)) as executor:
+        futures = {
+            platform: executor.submit(contextvars.copy_context().run, _components_of, platform)
+            for platform in platforms
+        }
+        sets: list[set[str]] = []
+        missing: list[str] = []
+        for platform, future in futures.items():
+            try:
+                index = future.result()
+            except ValueError:
+                missing.append(platform)
+                continue
+            sets.append({name for name, cats in index.items() if _in_category(cats, category)})
+
+    if missing:
+        return HctResponse(
+            success=False,
+            error=f"No components found for {', '.join(missing)}. Check the platform names.",
+        )
+
+    if operation == "intersection":
+        result = set.intersection(*sets)
+    elif operation == "union":
+        result = set.union(*sets)
+    else:
+        result = sets[0].difference(*sets[1:])
+
+    return HctResponse(
+        success=True,
+        response={
+            "operation": operation,
+            "platforms": platforms,
+            "category": category,
+            "count": len(result),
+            "components": sorted(result),
+        },
+    )
+
+
+def _cached_for(ttl: float) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+    """Like functools.lru_cache(maxsize=1) for a function without arguments,
+    but the result is only reused for `ttl` seconds.
+
+    Only one caller runs the function at a time: callers that arrive while
+    it runs wait for its result, or if there's an expired result, are given
+    that instead of waiting.
+    """
+
+    def decorator(fn: Callable[[], Any]) -> Callable[[], Any]:
+        held: list[tuple[float, Any]] = []
+        lock = threading.Lock()
+        building = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper() -> Any:
+            with lock:
+                expired = held[0] if held else None
+            if expired is not None and time.monotonic() < expired[0]:
+                return expired[1]
+            if expired is None:
+                building.acquire()
+            elif not building.acquire(blocking=False):
+                # another caller is rebuilding, the expired result will do meanwhile.
+                return expired[1]
+            try:
+                with lock:
+                    if held and time.monotonic() < held[0][0]:
+                        # built while we waited.
+                        return held[0][1]
+                value = fn()
+                with lock:
+                    held[:] = [(time.monotonic() + ttl, value)]
+                return value
+            finally:
+                building.release()
+
+        wrapper.cache_clear = held.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+## Searching the component catalog.
+##
+## The catalog is every component of every category, fetched once (or loaded
+## from a snapshot written by another worker) and indexed locally, so
+## confirming a component name doesn't mean downloading category listings.
+
+
+@tracing.traced("catalog parse hct_category")
+def _fetch_category(category: dict[str, Any]) -> list[records.Component]:
+    key = _first_field(category, CATEGORY_KEY_FIELDS)
+    label = _first_field(category, CATEGORY_NAME_FIELDS) or key
+    url = URLS["category_components"].format(category_key=key)
+    response = upstream.get("category_components", url, verify=VERIFY_SSL)
+    if not response.ok:
+        # a catalog missing a category would be cached and snapshotted as if
+        # it were complete, fail the build so it's retried.
+        log.warning("_fetch_category - couldn't fetch category %s: %s", label, response.text)
+        response.raise_for_status()
+    if not response.size:
+        log.warning("_fetch_category - no components for category %s", label)
+        return []
+    components: dict[str, records.Component] = {}
+    for _, record in _records(response.json()):
+        name = _first_field(record, COMPONENT_NAME_FIELDS)
+        if name is not None and name not in components:
+            components[name] = records.Component(
+                name=name,
+                category=label,
+                category_key=key,
+                description=_first_field(record, COMPONENT_DESCRIPTION_FIELDS) or "",
+            )
+    return list(components.values())
+
+
+@tracing.traced("catalog build hct_components")
+def _build_component_catalog() -> list[records.Component]:
+    """Fetch the components of every category.
+
+    Returns: list[Component] with the name, category, category_key and
+        description of each component (once per category it appears in).
+    Raises: requests.HTTPError if the categories, or any one category's
+        components, can't be fetched.
+    """
+    offline = dataset.section(dataset.HCT_COMPONENTS)
+    if offline is not None:
+        tracing.annotate({"pathfinder.catalog.source": "dataset"})
+        return [
+            records.Component(**component)
+            for components in offline.values(dataset.HCT_COMPONENTS)
+            for component in components
+        ]
+    snapshot = cache.load_snapshot("hct_component_catalog")
+    if snapshot:
+        log.info("_build_component_catalog - loaded %d entries from snapshot.", len(snapshot))
+        tracing.annotate({"pathfinder.catalog.source": "snapshot"})
+        return [records.Component(**component) for component in snapshot]
+
+    response = upstream.get("categories", URLS["categories"], verify=VERIFY_SSL)
+    response.raise_for_status()
+    categories = [c for _, c in _records(response.json()) if _first_field(c, CATEGORY_KEY_FIELDS)]
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_FETCHES) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, _fetch_category, category)
+            for category in categories
+        ]
+        catalog = [component for future in futures for component in future.result()]
+
+    log.info(
+        "_build_component_catalog - %d components in %d categories.", len(catalog), len(categories)
+    )
+    tracing.annotate(
+        {
+            "pathfinder.catalog.source": "upstream",
+            "pathfinder.catalog.entries": len(catalog),
+            "pathfinder.catalog.categories": len(categories),
+        }
     )
+    if catalog:
+        cache.save_snapshot("hct_component_catalog", [c.as_dict() for c in catalog])
+    return catalog
+
+
+@_cached_for(COMPONENT_CATALOG_TTL)
+def _component_index() -> search.TextIndex:
+    index = search.TextIndex()
+    for component in _build_component_catalog():
+        index.add(
+            component["name"],
+            component.get("description", ""),
+            category=component["category"],
+            category_key=component["category_key"],
+        )
+    return index.freeze()
+
+
+cache.register_warmer("hct_component_catalog", _component_index)
+
+
+@mcp.tool
+@deadlines.with_deadline(120)
+def search_components(
+    query: Annotated[str, "A component name, part of one, or words from its description."],
+    limit: Annotated[int, "The maximum number of matches to return."] = 10,
+) -> HctResponse:
+    """Search all component names and descriptions, tolerating typos.
+
+    Matches are ranked exact, then prefix, then all-words, then fuzzy.  The
+    first call builds a local index of every category, which takes a while;
+    after that searches don't touch the network.
+    """
+    index = _component_index()
+    if not len(index):
+        return HctResponse(success=False, error="The component catalog is empty.")
+    return HctResponse(success=True, response=index.search(query, limit=max(1, limit)))
+
+
+## Validating names before asking the upstream.
+##
+## Platform names are checked against the family -> series -> platform
+## hierarchy from platforms_by_family, and corrected when they only differ in
+## case or punctuation.  Names an endpoint said don't exist are remembered,
+## for that endpoint, for NEGATIVE_TTL seconds so asking again doesn't cost a
+## round trip.
+
+
+class NegativeCache:
+    """Names known not to exist and why, each forgotten after `ttl` seconds.
+
+    Names are kept per `kind`, the endpoint (or listing) that had nothing for
+    them: a component without supported models may still have details.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[tuple[str, str], tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, name: str, error: Optional[str] = None) -> None:
+        error = error or f"No {kind} named {name} was found."
+        with self._lock:
+            key = (kind, search.normalize(name))
+            self._entries[key] = (time.monotonic() + self.ttl, error)
+
+    def get(self, kind: str, name: str) -> Optional[str]:
+        """Return the error for a known bad name, or None."""
+        key = (kind, search.normalize(name))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[0]:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_negative = NegativeCache(NEGATIVE_TTL)
+
+
+class PlatformHierarchy:
+    """Platforms by family and series, with lookups by (normalized) name."""
+
+    def __init__(self) -> None:
+        self.families: dict[str, dict[str, list[str]]] = {}
+        self.platforms: dict[str, records.Platform] = {}
+        self._index = search.TextIndex()
+
+    @classmethod
+    def build(cls, document: Any) -> "PlatformHierarchy":
+        hierarchy = cls()
+        for path, platform in _walk_hierarchy(document, ()):
+            family = path[0] if path else None
+            series = path[1] if len(path) > 1 else None
+            hierarchy.add(platform, family, series)
+        hierarchy._index.freeze()
+        return hierarchy
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Mapping[str, Any]]) -> "PlatformHierarchy":
+        hierarchy = cls()
+        for entry in entries:
+            hierarchy.add(entry["platform"], entry["family"], entry["series"])
+        hierarchy._index.freeze()
+        return hierarchy
+
+    def add(self, platform: str, family: Optional[str], series: Optional[str]) -> None:
+        key = search.normalize(platform)
+        if key in self.platforms:
+            return
+        entry = self.platforms[key] = records.Platform(
+            platform=platform, family=family, series=series
+        )
+        self.families.setdefault(entry.family or "", {}).setdefault(entry.series or "", []).append(
+            entry.platform
+        )
+        self._index.add(entry.platform, family=entry.family, series=entry.series)
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Return the platform's name as the upstream spells it, or None."""
+        entry = self.platforms.get(search.normalize(name))
+        return entry.platform if entry else None
+
+    def suggest(self, name: str, limit: int = 3) -> list[str]:
+        return [match["name"] for match in self._index.search(name, limit=limit)]
+
+
+def _walk_hierarchy(node: Any, path: tuple[str, ...]) -> Iterator[tuple[tuple[str, ...], str]]:
+    """Yield (path, platform) for each platform in a grouped listing.
+
+    Groups are either records with a name and a list of children, or
+    mappings of group name to children.  Platforms are the leaves: strings,
+    or records without children.
+    """
+    if isinstance(node, str):
+        yield path, node
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk_hierarchy(item, path)
+    elif isinstance(node, dict):
+        children = [value for value in node.values() if isinstance(value, (list, dict))]
+        label = _first_field(node, HIERARCHY_NAME_FIELDS)
+        if not children:
+            if label is not None:
+                yield path, label
+        elif label is None:
+            for key, value in node.items():
+                if isinstance(value, (list, dict)):
+                    yield from _walk_hierarchy(value, path + (str(key),))
+        else:
+            for child in children:
+                yield from _walk_hierarchy(child, path + (label,))
+
+
+@_cached_for(PLATFORM_HIERARCHY_TTL)
+def _platform_hierarchy() -> PlatformHierarchy:
+    offline = dataset.section(dataset.HCT_PLATFORMS)
+    if offline is not None:
+        return PlatformHierarchy.from_entries(offline.values(dataset.HCT_PLATFORMS))
+    url = URLS["platforms_grouped_by_family"]
+    response = upstream.get("platforms_grouped_by_family", url, verify=VERIFY_SSL)
+    response.raise_for_status()
+    hierarchy = response.derived("platform_hierarchy", PlatformHierarchy.build)
+    if not hierarchy.platforms:
+        raise ValueError("No platforms found in platforms_by_family.")
+    log.info("_platform_hierarchy - %d platforms.", len(hierarchy.platforms))
+    return hierarchy
+
+
+def _check_platform(platform: str) -> tuple[str, Optional[str]]:
+    """Validate a platform name locally.
+
+    Returns: (platform, error) - the platform spelled as the upstream knows
+        it, or an error with suggestions if it doesn't exist.  If the
+        hierarchy can't be fetched, the name is passed through unchecked.
+        The hierarchy is refetched after PLATFORM_HIERARCHY_TTL seconds, so
+        new platforms aren't unknown for long.
+    """
+    error = _negative.get("platforms_grouped_by_family", platform)
+    if error:
+        return platform, error
+    try:
+        hierarchy = _platform_hierarchy()
+    except deadlines.Interrupted:
+        raise
+    except Exception as e:
+        log.warning("_check_platform - can't validate %s, no platform hierarchy: %s", platform, e)
+        return platform, None
+    known = hierarchy.lookup(platform)
+    if known is not None:
+        return known, None
+    suggestions = hierarchy.suggest(platform)
+    hint = f" Did you mean {', '.join(suggestions)}?" if suggestions else ""
+    error = f"Unknown platform {platform}.{hint}"
+    _negative.add("platforms_grouped_by_family", platform, error)
+    return platform, error
+
+
+def _remember_miss(
+    endpoint: str, kind: str, name: str, response: upstream.Response, empty: bool = False
+) -> HctResponse:
+    """Negatively cache `name` for `endpoint` if the upstream said it doesn't
+    exist: a 404, or with `empty` an empty body.
+
+    An empty list of supported platforms, say, is an answer about a
+    component that exists, so by default only a 404 counts.
+    """
+    if response.status_code == NOT_FOUND or (empty and response.ok and not response.size):
+        _negative.add(endpoint, name, f"No {kind} named {name} was found.")
+    return _hct_response(response)
+
+
+## Resources, for clients that would rather read slices of the large
+## listings than call a tool for all of it.
+
+
+@mcp.resource("pathfinder://hct/categories", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(60)
+def categories_resource() -> str:
+    """All component categories."""
+    response = refresh.track(
+        "pathfinder://hct/categories",
+        lambda: upstream.get("categories", URLS["categories"], verify=VERIFY_SSL),
+    )
+    return resources.serialized(response)
+
+
+@mcp.resource("pathfinder://hct/category/{key}", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(60)
+def category_resource(key: int) -> str:
+    """The components in one category."""
+    url = URLS["category_components"].format(category_key=key)
+    response = refresh.track(
+        f"pathfinder://hct/category/{key}",
+        lambda: upstream.get("category_components", url, verify=VERIFY_SSL),
+    )
+    return resources.serialized(response)
+
+
+@mcp.resource("pathfinder://hct/platform/{platform}", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(30)
+def platform_resource(platform: str) -> str:
+    """Information about one platform."""
+    platform, error = _check_platform(platform)
+    if error:
+        raise ResourceError(error)
+    url = URLS["platform_information"].format(platform=platform)
+    response = refresh.track(
+        f"pathfinder://hct/platform/{platform}",
+        lambda: upstream.get("platform_information", url, verify=VERIFY_SSL),
+    )
+    return resources.serialized(response)
+
+
+@mcp.resource("pathfinder://hct/platforms", mime_type=resources.MIME_TYPE)
+@deadlines.with_deadline(60)
+def platforms_resource() -> str:
+    """Platform names by family and series."""
+    try:
+        return json.dumps(_platform_hierarchy().families)
+    except deadlines.Interrupted:
+        raise
+    except Exception as e:
+        raise ResourceError(f"The platform hierarchy is unavailable: {e}")
+
+
+refresh.enable_subscriptions(mcp)
 
 if __name__ == '__main__':  # pragma: nocover
     from jnpr_pathfinder_mcp.helpers import run_cli
-    run_cli(prog="Juniper Hardware Compatibility Tool MCP Server", server=mcp)
+    run_cli(
+        prog="Juniper Hardware Compatibility Tool MCP Server",
+        server=mcp,
+        import_path="jnpr_pathfinder_mcp.server.hct:mcp",
+    )
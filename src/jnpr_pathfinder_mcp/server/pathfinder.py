@@ -1,13 +1,231 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Any, Coroutine, Literal, Optional
 
 from fastmcp import FastMCP  # type: ignore
+from pydantic import BaseModel, Field
 
+from jnpr_pathfinder_mcp import admission, prefetch, profiling, refresh, tracing, upstream
+from jnpr_pathfinder_mcp.server import cli_explorer, feature_explorer, hct
 from jnpr_pathfinder_mcp.server.cli_explorer import mcp as cli_explorer_mcp
 from jnpr_pathfinder_mcp.server.feature_explorer import mcp as feature_explorer_mcp
 from jnpr_pathfinder_mcp.server.hct import mcp as hct_mcp
 
+# How the sub-servers are composed into the full server: "static" copies
+# their tools and resources onto it, so calls dispatch directly, and "mount"
+# delegates every listing and call to the live sub-server.
+COMPOSITION = os.environ.get("JNPR_PATHFINDER_COMPOSITION", "static")
+
+SUB_SERVERS = (
+    (hct_mcp, "juniper_hardware_compatibility_tool"),
+    (cli_explorer_mcp, "juniper_cli_explorer"),
+    (feature_explorer_mcp, "juniper_feature_explorer"),
+)
+
+
+def _run(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion from sync code, even inside an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def compose(server: FastMCP, mode: str = COMPOSITION) -> FastMCP:
+    """Add the sub-servers' tools and resources to `server` under their prefixes.
+
+    Both modes expose the same names, static composition is a snapshot of the
+    sub-servers, so tools added to them afterwards won't show up.
+    """
+    if mode == "mount":
+        for sub_server, prefix in SUB_SERVERS:
+            server.mount(sub_server, prefix=prefix)
+    elif mode == "static":
+        for sub_server, prefix in SUB_SERVERS:
+            _run(server.import_server(sub_server, prefix=prefix))
+    else:
+        raise ValueError(f"composition must be 'static' or 'mount', not {mode!r}")
+    return server
+
+
 # Create the MCP instance and expose tools
-mcp = FastMCP("jnpr_pathfinder_mcp")
+mcp = compose(FastMCP("jnpr_pathfinder_mcp"))
+refresh.enable_subscriptions(mcp)
+
+
+class PathfinderResponse(BaseModel):
+    success: bool
+    error: Optional[str] = None
+    response: Optional[dict[str, Any] | list[dict[str, Any]]] = None
+
+
+@mcp.tool
+def upstream_stats() -> PathfinderResponse:
+    """Get rate limiter, concurrency limit and per-endpoint statistics for upstream
+    requests, the prefetcher's budget and hit rate, the CLI search cache's
+    hit rate, and admission control's queue and rejections when serving over
+    http."""
+    return PathfinderResponse(
+        success=True,
+        response={
+            **upstream.stats(),
+            "prefetch": prefetch.stats(),
+            "search_cache": cli_explorer._search_cache.stats(),
+            "admission": admission.stats(mcp),
+        },
+    )
+
+
+@mcp.tool
+async def refresh_datasets(force: bool = False) -> PathfinderResponse:
+    """Refetch the datasets clients have read as resources, reporting what changed.
+
+    Only datasets older than the refresh interval are refetched, unless
+    `force` is set.  Subscribers to a changed resource are notified.
+    """
+    changes = await refresh.refresh_and_notify(force)
+    return PathfinderResponse(
+        success=True, response={"changes": changes, "datasets": refresh.engine.status()}
+    )
+
+
+@mcp.tool
+def profile_tools(
+    enabled: Optional[bool] = None,
+    tools: Optional[list[str]] = None,
+    mode: Optional[Literal["cprofile", "sample"]] = None,
+    rate: Annotated[Optional[float], Field(ge=0, le=1)] = None,
+) -> PathfinderResponse:
+    """Turn profiling of tool calls on or off, or change what's profiled.
+
+    Settings not given are left as they are, with no arguments this reports
+    the profiler's settings and counts.  `tools` are tool names, or ["*"]
+    for all of them, `mode` is "cprofile" (.pstats files) or "sample"
+    (speedscope files) and `rate` the fraction of calls profiled.  Only
+    this server process is changed, not other http workers.  Profiles are
+    written to the directory the server was started with (--profile or
+    JNPR_PATHFINDER_PROFILE_DIR), clients can't choose where.
+    """
+    changes = {
+        name: value
+        for name, value in (
+            ("enabled", enabled),
+            ("tools", tools),
+            ("mode", mode),
+            ("rate", rate),
+        )
+        if value is not None
+    }
+    settings = {**profiling.settings(), **changes}
+    if settings["enabled"] and not settings["directory"]:
+        return PathfinderResponse(
+            success=False,
+            error=f"Start the server with --profile DIR or set {profiling.PROFILE_DIR_ENV} "
+            "to profile.",
+        )
+    profiling.configure(**settings)
+    return PathfinderResponse(success=True, response=profiling.stats())
+
+
+## Composite questions, answered from several sub-servers in one call.  The
+## sub-server tools each run in their own thread under their own deadline,
+## so the checks run concurrently and one failing doesn't hold up the rest.
+
+
+def _check(result: Any, judge: Any) -> dict[str, Any]:
+    """Judge a sub-server tool's result: {"ok": True/False, **evidence}, or
+    {"ok": None, "error": ...} if the check couldn't be made."""
+    if isinstance(result, BaseException):
+        return {"ok": None, "error": str(result) or type(result).__name__}
+    if not result.success:
+        return {"ok": None, "error": result.error}
+    check = judge(result.response)
+    if result.stale:
+        check["stale"] = True
+    return check
+
+
+def _optic_check(response: dict[str, Any]) -> dict[str, Any]:
+    return {"ok": response["supported"], **response}
+
+
+def _release_check(junos_version: str) -> Any:
+    def judge(response: Any) -> dict[str, Any]:
+        releases = feature_explorer._releases_in(response)
+        wanted = junos_version.strip().upper()
+        listed = [release for release in releases if release.upper() == wanted]
+        return {
+            "ok": bool(listed),
+            "release": listed[0] if listed else junos_version,
+            "releases_listed": len(releases),
+            "newest": releases[-1] if releases else None,
+        }
+
+    return judge
+
+
+def _feature_check(feature: str) -> Any:
+    def judge(response: Any) -> dict[str, Any]:
+        found = feature_explorer._find_features(response, feature)
+        return {
+            "ok": bool(found),
+            "features_listed": len(feature_explorer._nodes_by_key(response)),
+            "matches": found[:5],
+        }
+
+    return judge
+
+
+@mcp.tool
+async def compatibility_report(
+    platform: Annotated[str, "A Juniper platform/model, like MX204."],
+    optic: Annotated[str, "A component name, like QSFP-100G-LR4."],
+    feature: Annotated[str, "A feature key from the feature tree, or a feature name."],
+    junos_version: Annotated[str, "A JUNOS software version like 25.1R2"],
+    junos_os_type: Annotated[str, "One of ['Junos OS', 'Junos OS Evolved']"] = "Junos OS",
+) -> PathfinderResponse:
+    """Can a platform with an optic run a feature on a release?
 
-mcp.mount(hct_mcp, prefix="juniper_hardware_compatibility_tool")
-mcp.mount(cli_explorer_mcp, prefix="juniper_cli_explorer")
-mcp.mount(feature_explorer_mcp, prefix="juniper_feature_explorer")
+    Checks, concurrently, that the Hardware Compatibility Tool lists the optic
+    for the platform, that the release is compatible with the platform, and
+    that the feature is available for the platform on the release.  The
+    verdict is "yes" when all three hold, "no" when any doesn't, and
+    "unknown" when a check couldn't be made (its error is in its evidence).
+    """
+    # one trace for the call, the sub-server tools' spans are its children.
+    with tracing.span("tool compatibility_report", {"mcp.tool.name": "compatibility_report"}):
+        optic_result, releases_result, features_result = await asyncio.gather(
+            hct._component_on_platform(platform, optic),
+            feature_explorer.releases_compatible_with_model.fn(platform),
+            feature_explorer.features_for_model_on_junos_version.fn(
+                platform, junos_version, junos_os_type
+            ),
+            return_exceptions=True,
+        )
+    checks = {
+        "optic": _check(optic_result, _optic_check),
+        "release": _check(releases_result, _release_check(junos_version)),
+        "feature": _check(features_result, _feature_check(feature)),
+    }
+    outcomes = [check["ok"] for check in checks.values()]
+    if False in outcomes:
+        verdict = "no"
+    elif None in outcomes:
+        verdict = "unknown"
+    else:
+        verdict = "yes"
+    return PathfinderResponse(
+        success=True,
+        response={
+            "verdict": verdict,
+            "platform": platform,
+            "optic": optic,
+            "feature": feature,
+            "junos_version": junos_version,
+            "junos_os_type": junos_os_type,
+            "checks": checks,
+        },
+    )
@@ -0,0 +1,151 @@
+import contextlib
+import functools
+import logging
+import os
+from typing import Any, Callable, Optional
+
+try:
+    from opentelemetry import trace
+except ImportError:  # the tracing extra isn't installed
+    trace = None  # type: ignore[assignment]
+
+log = logging.getLogger(__name__)
+
+## OpenTelemetry tracing, from the MCP tool call to the upstream requests
+## made for it.
+##
+## Each tool call is a span (see jnpr_pathfinder_mcp.deadlines), with child
+## spans for its upstream requests, cache lookups and catalog builds.  The
+## span context lives in a context variable, which the tool's worker thread
+## and the executors it fans out to already copy for the deadline, so
+## concurrent fetches are parented to the call that made them.
+##
+## OpenTelemetry is an optional dependency, `pip install
+## jnpr_pathfinder_mcp[tracing]`.  Tracing is off unless an exporter is
+## configured, and while it's off a span costs no more than a null context.
+
+# "otlp" sends spans to a collector, configured with the standard
+# OTEL_EXPORTER_OTLP_* variables (http://localhost:4318 by default), "file"
+# appends them as JSON lines to TRACE_FILE.
+TRACE_EXPORTER_ENV = "JNPR_PATHFINDER_TRACE"
+TRACE_FILE_ENV = "JNPR_PATHFINDER_TRACE_FILE"
+TRACE_FILE = "pathfinder-traces.jsonl"
+EXPORTERS = ("otlp", "file")
+SERVICE_NAME = "jnpr_pathfinder_mcp"
+
+_DISABLED = contextlib.nullcontext(None)
+_provider: Optional[Any] = None
+_tracer: Optional[Any] = None
+
+
+def use(provider: Any) -> None:
+    """Trace into `provider`, an OpenTelemetry TracerProvider."""
+    global _provider, _tracer
+    _provider = provider
+    _tracer = provider.get_tracer(__name__)
+
+
+def disable() -> None:
+    global _provider, _tracer
+    _provider = _tracer = None
+
+
+def flush() -> None:
+    """Export the spans still buffered, they're otherwise exported in batches."""
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def _exporter(exporter: str, path: str) -> Any:
+    if exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (  # type: ignore
+            OTLPSpanExporter,
+        )
+
+        return OTLPSpanExporter()
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+    return ConsoleSpanExporter(
+        out=open(path, "a", encoding="utf-8"),
+        formatter=lambda span: span.to_json(indent=None) + os.linesep,
+    )
+
+
+def install(exporter: Optional[str] = None, path: Optional[str] = None) -> bool:
+    """Start exporting spans, if an exporter is configured.
+
+    `exporter` and `path` default to JNPR_PATHFINDER_TRACE and
+    JNPR_PATHFINDER_TRACE_FILE.  The provider is also made the global one,
+    so spans from other instrumented libraries join the same traces.
+
+    Returns: True if tracing is now on.
+    Raises: ValueError for an unknown exporter, ImportError if the tracing
+        extra isn't installed.
+    """
+    exporter = exporter or os.environ.get(TRACE_EXPORTER_ENV)
+    if not exporter:
+        return False
+    if exporter not in EXPORTERS:
+        raise ValueError(f"trace exporter must be one of {list(EXPORTERS)}, not {exporter!r}")
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        span_exporter = _exporter(exporter, path or os.environ.get(TRACE_FILE_ENV) or TRACE_FILE)
+    except ImportError as e:
+        raise ImportError(
+            f"Tracing needs OpenTelemetry, install jnpr_pathfinder_mcp[tracing] ({e})"
+        ) from e
+    provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(provider)
+    use(provider)
+    log.info("install - exporting traces with %s", exporter)
+    return True
+
+
+def span(name: str, attributes: Optional[dict[str, Any]] = None) -> Any:
+    """Start a span as a child of the current one, for a `with` block.
+
+    The block gets the span, or None when tracing is off.  An exception
+    leaving the block is recorded on the span.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _DISABLED
+    return tracer.start_as_current_span(name, attributes=attributes)
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a function so each call is a span."""
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def annotate(attributes: dict[str, Any]) -> None:
+    """Set attributes on the current span, None values are left out."""
+    if _tracer is None:
+        return
+    trace.get_current_span().set_attributes(
+        {name: value for name, value in attributes.items() if value is not None}
+    )
+
+
+def event(name: str, attributes: Optional[dict[str, Any]] = None) -> None:
+    """Add an event, like a retry, to the current span."""
+    if _tracer is None:
+        return
+    trace.get_current_span().add_event(name, attributes or {})
@@ -0,0 +1,1017 @@
+import contextvars
+import email.utils
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.request import ACCEPT_ENCODING
+
+from jnpr_pathfinder_mcp import deadlines, tracing
+
+log = logging.getLogger(__name__)
+
+## All requests to apps.juniper.net go through this module so that agents
+## fanning out across the three servers share one rate limit and one
+## concurrency limit, and back off together when the upstream pushes back.
+
+# requests per second, 0 disables rate limiting.
+RATE_LIMIT = float(os.environ.get("JNPR_PATHFINDER_RATE_LIMIT", "20"))
+BURST = int(os.environ.get("JNPR_PATHFINDER_BURST", "40"))
+MIN_CONCURRENCY = int(os.environ.get("JNPR_PATHFINDER_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.environ.get("JNPR_PATHFINDER_MAX_CONCURRENCY", "32"))
+MAX_RETRIES = int(os.environ.get("JNPR_PATHFINDER_MAX_RETRIES", "3"))
+# socket timeout for requests that don't set their own, further limited by
+# the deadline of the tool call making the request.
+REQUEST_TIMEOUT = float(os.environ.get("JNPR_PATHFINDER_REQUEST_TIMEOUT", "30"))
+# bodies are read in chunks of this size, checking for cancellation in between.
+CHUNK_SIZE = 64 * 1024
+
+# Never wait longer than this for a single retry, whatever Retry-After says.
+MAX_RETRY_DELAY = 60.0
+BACKOFF_BASE = 0.5
+# A response slower than LATENCY_TOLERANCE x the endpoint's usual latency
+# counts as a congestion signal, once we've seen enough responses to know.
+LATENCY_TOLERANCE = 2.0
+LATENCY_WARMUP = 5
+LATENCY_ALPHA = 0.1
+
+RETRY_STATUSES = {429, 502, 503, 504}
+NOT_MODIFIED = 304
+
+_UNPARSED = object()
+
+# A circuit opens when at least BREAKER_ERROR_RATE of the last BREAKER_WINDOW
+# requests to an endpoint failed (and there were at least BREAKER_MIN_REQUESTS
+# of them).  After BREAKER_RESET_SECONDS a single probe is let through.
+BREAKER_WINDOW = int(os.environ.get("JNPR_PATHFINDER_BREAKER_WINDOW", "20"))
+BREAKER_MIN_REQUESTS = int(os.environ.get("JNPR_PATHFINDER_BREAKER_MIN_REQUESTS", "5"))
+BREAKER_ERROR_RATE = float(os.environ.get("JNPR_PATHFINDER_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_RESET_SECONDS = float(os.environ.get("JNPR_PATHFINDER_BREAKER_RESET_SECONDS", "30"))
+# How many last known good responses to keep for serving while a circuit is open.
+STALE_ENTRIES = int(os.environ.get("JNPR_PATHFINDER_STALE_ENTRIES", "256"))
+# Keep held response bodies zlib compressed, decompressing them when they're used.
+CACHE_COMPRESSION = os.environ.get("JNPR_PATHFINDER_CACHE_COMPRESSION", "1").lower() not in (
+    "0",
+    "false",
+    "no",
+)
+# bodies smaller than this aren't worth compressing.
+COMPRESS_MIN_BYTES = 1024
+COMPRESSION_LEVEL = 6
+
+# Hedged GETs, for the URL keys listed (comma separated, none by default):
+# when a request hasn't answered by HEDGE_PERCENTILE of the endpoint's recent
+# latency a second one is sent and the first OK response is used.  Every
+# request earns HEDGE_BUDGET of a hedge, so hedges add at most that fraction
+# to the load on the upstream, and a hedge waits for a rate token and a
+# concurrency slot like any other request.
+HEDGE_KEYS = os.environ.get("JNPR_PATHFINDER_HEDGE_KEYS", "")
+HEDGE_PERCENTILE = float(os.environ.get("JNPR_PATHFINDER_HEDGE_PERCENTILE", "95"))
+HEDGE_BUDGET = float(os.environ.get("JNPR_PATHFINDER_HEDGE_BUDGET", "0.05"))
+# hedges that can be saved up for a burst of slow responses.
+HEDGE_BURST = 10
+# the percentile is of the last LATENCY_SAMPLES latencies, once there are
+# at least HEDGE_MIN_SAMPLES of them.
+LATENCY_SAMPLES = 100
+HEDGE_MIN_SAMPLES = 20
+# how often a caller waiting on hedged requests checks its own deadline.
+HEDGE_WAIT_SLICE = 0.25
+
+
+class _Packed:
+    """A text form derived from a held response, kept zlib compressed like its body."""
+
+    __slots__ = ("data", "size", "text")
+
+    def __init__(self, value: bytes | str):
+        self.text = isinstance(value, str)
+        raw = value.encode("utf-8") if isinstance(value, str) else value
+        self.size = len(raw)
+        self.data = zlib.compress(raw, COMPRESSION_LEVEL)
+
+    def unpack(self) -> bytes | str:
+        raw = zlib.decompress(self.data)
+        return raw.decode("utf-8") if self.text else raw
+
+
+class Response:
+    """The parts of a requests.Response that the servers use.
+
+    The body is read in full when the response is created, so the response
+    is detached from its connection and can be cached and shared.  A response
+    held in the cache may keep its body compressed, see `compressed()`.
+    """
+
+    def __init__(
+        self,
+        content: bytes | str,
+        ok: bool,
+        status_code: Optional[int] = None,
+        headers: Optional[dict[str, str]] = None,
+        encoding: Optional[str] = None,
+    ):
+        self._content: bytes | str = content
+        self._compressed: Optional[bytes] = None
+        self.size = len(content)
+        # bytes read from the network, before content decoding, when known.
+        self.wire_size: Optional[int] = None
+        self.ok = ok
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.encoding = encoding or "utf-8"
+        # set when this is a last known good response served in place of a fresh one.
+        self.stale = False
+        self.age: Optional[float] = None
+        # the parsed body and anything built from it, kept with the response so
+        # they're reused for as long as the upstream says the document is unchanged.
+        self._json: Any = _UNPARSED
+        self._derived: dict[str, Any] = {}
+        # set once the response is held compressed, so that derived text (a
+        # re-serialized copy of the document, say) is compressed too.
+        self._pack_derived = False
+
+    @classmethod
+    def from_requests(cls, response: Any) -> "Response":
+        ok = bool(response.ok)
+        result = cls(
+            content=_read_content(response),
+            ok=ok,
+            status_code=getattr(response, "status_code", None),
+            headers=getattr(response, "headers", None),
+            encoding=getattr(response, "encoding", None),
+        )
+        result.wire_size = _wire_size(response)
+        return result
+
+    @property
+    def content(self) -> bytes | str:
+        if self._compressed is not None:
+            return zlib.decompress(self._compressed)
+        return self._content
+
+    def _packed(self) -> list[_Packed]:
+        return [value for value in list(self._derived.values()) if isinstance(value, _Packed)]
+
+    @property
+    def stored_size(self) -> int:
+        """The number of bytes this response's body, and its derived text,
+        take up in memory."""
+        body = self.size if self._compressed is None else len(self._compressed)
+        return body + sum(len(packed.data) for packed in self._packed())
+
+    @property
+    def raw_size(self) -> int:
+        """The number of bytes `stored_size` would be without compression."""
+        return self.size + sum(packed.size for packed in self._packed())
+
+    def compressed(self) -> "Response":
+        """Return a copy of this response for holding in the cache.
+
+        The copy keeps its body zlib compressed and decompresses it each time
+        it's used.  It doesn't keep the parsed body either, only what has been
+        derived from it, which is usually far smaller than the document;
+        derived text is compressed as well.  Small and text bodies are
+        returned as they are.
+        """
+        if self._compressed is not None or self.size < COMPRESS_MIN_BYTES:
+            return self
+        if not isinstance(self._content, bytes):
+            return self
+        held = Response(b"", self.ok, self.status_code, self.headers, self.encoding)
+        held._compressed = zlib.compress(self._content, COMPRESSION_LEVEL)
+        held.size = self.size
+        # shared, so what's derived from this response is reused by the held copy.
+        held._derived = self._derived
+        for name, value in list(self._derived.items()):
+            if isinstance(value, (bytes, str)) and len(value) >= COMPRESS_MIN_BYTES:
+                self._derived[name] = _Packed(value)
+        self._pack_derived = held._pack_derived = True
+        return held
+
+    @property
+    def text(self) -> str:
+        content = self.content
+        if isinstance(content, str):
+            return content
+        return content.decode(self.encoding, errors="replace")
+
+    def json(self) -> Any:
+        """Decode the body, once (every time for a compressed response)."""
+        if self._compressed is not None:
+            return json.loads(self.content)
+        if self._json is _UNPARSED:
+            self._json = json.loads(self.content)
+        return self._json
+
+    def derived(self, name: str, build: Callable[[Any], Any]) -> Any:
+        """Return `build(self.json())`, building it only once per document.
+
+        Use for indexes and other structures computed from a large document,
+        so a revalidated (304) response doesn't have to rebuild them.
+        """
+        if name not in self._derived:
+            value = build(self.json())
+            if (
+                self._pack_derived
+                and isinstance(value, (bytes, str))
+                and len(value) >= COMPRESS_MIN_BYTES
+            ):
+                self._derived[name] = _Packed(value)
+            else:
+                self._derived[name] = value
+            return value
+        value = self._derived[name]
+        return value.unpack() if isinstance(value, _Packed) else value
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers that ask the upstream whether this
+        response is still current."""
+        conditional = {}
+        if self.headers.get("ETag"):
+            conditional["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            conditional["If-Modified-Since"] = self.headers["Last-Modified"]
+        return conditional
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} error from upstream", response=self)
+
+    def as_stale(self, age: float) -> "Response":
+        """Return a copy of this response marked as stale, `age` seconds old."""
+        stale = Response(self._content, self.ok, self.status_code, self.headers, self.encoding)
+        stale._compressed = self._compressed
+        stale.size = self.size
+        stale.stale = True
+        stale.age = age
+        stale._json = self._json
+        stale._derived = self._derived
+        stale._pack_derived = self._pack_derived
+        return stale
+
+
+def _read_content(response: Any) -> bytes | str:
+    """Read a streamed response body, checking the current deadline between
+    chunks so a cancelled or expired tool call stops downloading."""
+    iter_content = getattr(response, "iter_content", None)
+    if iter_content is None:
+        # already read, there's nothing to interrupt.
+        return response.content
+    chunks: list[bytes] = []
+    try:
+        for chunk in iter_content(CHUNK_SIZE):
+            deadlines.check()
+            chunks.append(chunk)
+    except BaseException:
+        response.close()
+        raise
+    return b"".join(chunks)
+
+
+def _wire_size(response: Any) -> Optional[int]:
+    """The number of (possibly compressed) body bytes urllib3 read."""
+    try:
+        size = response.raw.tell()
+    except Exception:
+        return None
+    return size if isinstance(size, int) else None
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Take a token, sleeping until one is available.
+
+        Returns: the number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self.rate <= 0:
+                    return waited
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            deadlines.sleep(delay)
+            waited += delay
+
+    def available(self) -> float:
+        """The number of tokens that could be taken right now."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return 0.0
+            if self.rate <= 0:
+                return float(self.burst)
+            self._refill(now)
+            return self.tokens
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for `seconds`, e.g. when the upstream sends Retry-After."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveConcurrency:
+    """An AIMD concurrency limit.
+
+    The limit grows by one for every `limit` uncongested responses (about one
+    per round of requests) and halves on congestion, at most once per
+    `cooldown` seconds so a burst of failures from one round only counts once.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, cooldown: float = 1.0):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.cooldown = cooldown
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """Wait for a free slot, returning the number of seconds spent waiting."""
+        started = time.monotonic()
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                deadline = deadlines.current()
+                self._cond.wait(None if deadline is None else deadline.remaining())
+                deadlines.check()
+            self.in_flight += 1
+        return time.monotonic() - started
+
+    def release(self, congested: bool) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if congested:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """Fails fast for an endpoint whose recent error rate is too high.
+
+    closed: requests flow, outcomes are recorded in a rolling window.
+    open: requests are refused until `reset_seconds` have passed.
+    half_open: one probe request is let through, its outcome closes or
+        re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: int, min_requests: int, error_rate: float, reset_seconds: float):
+        self.outcomes: deque[bool] = deque(maxlen=max(1, window))
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        # the thread sending the probe, only it can abandon it.
+        self._prober: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+                self._prober = threading.get_ident()
+            return True
+
+    def abandon(self) -> None:
+        """Let the next caller probe, when this thread's probe was never answered
+        (cancelled, or its deadline passed while waiting to be sent)."""
+        with self._lock:
+            if self._probing and self._prober == threading.get_ident():
+                self._probing = False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if success:
+                    log.info("record - probe succeeded, closing circuit")
+                    self.state = self.CLOSED
+                    self.outcomes.clear()
+                    self._probing = False
+                else:
+                    self._open()
+                return
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if (
+                len(self.outcomes) >= self.min_requests
+                and failures / len(self.outcomes) >= self.error_rate
+            ):
+                log.warning(
+                    "record - %d of %d requests failed, opening circuit",
+                    failures,
+                    len(self.outcomes),
+                )
+                self._open()
+
+    def retry_in(self) -> float:
+        """Seconds until the next probe will be allowed."""
+        return max(0.0, self._opened_at + self.reset_seconds - time.monotonic())
+
+
+class EndpointStats:
+    """Counters and latency for one URL key."""
+
+    __slots__ = (
+        "requests",
+        "errors",
+        "throttled",
+        "retries",
+        "rejected",
+        "stale",
+        "not_modified",
+        "bytes_received",
+        "bytes_decoded",
+        "bytes_saved",
+        "latency",
+        "samples",
+        "hedged",
+        "hedge_wins",
+        "breaker",
+    )
+
+    def __init__(self, breaker: CircuitBreaker) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.retries = 0
+        self.rejected = 0
+        self.stale = 0
+        self.not_modified = 0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.bytes_saved = 0
+        self.latency: Optional[float] = None
+        self.samples: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.breaker = breaker
+
+    def observe(self, latency: float) -> bool:
+        """Record a latency sample, returning True if it was unusually slow."""
+        self.requests += 1
+        self.samples.append(latency)
+        if self.latency is None:
+            self.latency = latency
+            return False
+        slow = self.requests > LATENCY_WARMUP and latency > LATENCY_TOLERANCE * self.latency
+        self.latency += LATENCY_ALPHA * (latency - self.latency)
+        return slow
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """The latency `percent` of recent requests answered within, or None
+        until there are enough samples to tell."""
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "stale": self.stale,
+            "not_modified": self.not_modified,
+            "bytes_received": self.bytes_received,
+            "bytes_decoded": self.bytes_decoded,
+            "bytes_saved": self.bytes_saved,
+            "circuit": self.breaker.state,
+            "latency_ms": None if self.latency is None else round(self.latency * 1000, 1),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class HedgeBudget:
+    """Hedges earned by requests: each request adds `ratio` of a hedge, and
+    at most `burst` are saved up."""
+
+    def __init__(self, ratio: float, burst: int):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class Limiter:
+    """Rate and concurrency limits, circuit breakers and last known good
+    responses shared by every upstream request."""
+
+    def __init__(self, settings: dict[str, Any]):
+        self.settings = settings
+        self.bucket = TokenBucket(settings["rate"], settings["burst"])
+        self.concurrency = AdaptiveConcurrency(
+            settings["max_concurrency"] // 4 or 1,
+            settings["min_concurrency"],
+            settings["max_concurrency"],
+        )
+        self.max_retries = settings["max_retries"]
+        hedge_keys = settings["hedge_keys"]
+        if isinstance(hedge_keys, str):
+            hedge_keys = [key.strip() for key in hedge_keys.split(",") if key.strip()]
+        self.hedge_keys = frozenset(hedge_keys)
+        self.hedge_budget = HedgeBudget(settings["hedge_budget"], HEDGE_BURST)
+        self.endpoints: dict[str, EndpointStats] = {}
+        self.last_good: OrderedDict[tuple[str, ...], tuple[Response, float]] = OrderedDict()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def endpoint(self, key: str) -> EndpointStats:
+        with self._lock:
+            if key not in self.endpoints:
+                breaker = CircuitBreaker(
+                    self.settings["breaker_window"],
+                    self.settings["breaker_min_requests"],
+                    self.settings["breaker_error_rate"],
+                    self.settings["breaker_reset_seconds"],
+                )
+                self.endpoints[key] = EndpointStats(breaker)
+            return self.endpoints[key]
+
+    def remember(self, request_key: tuple[str, ...], response: Response) -> None:
+        if self.settings["cache_compression"]:
+            response = response.compressed()
+        with self._lock:
+            self.last_good[request_key] = (response, time.monotonic())
+            self.last_good.move_to_end(request_key)
+            while len(self.last_good) > self.settings["stale_entries"]:
+                self.last_good.popitem(last=False)
+
+    def recall(self, request_key: tuple[str, ...]) -> Optional[Response]:
+        """Return the last known good response for a request, marked stale."""
+        with self._lock:
+            entry = self.last_good.get(request_key)
+        if entry is None:
+            return None
+        response, stored = entry
+        return response.as_stale(time.monotonic() - stored)
+
+    def cached(self, request_key: tuple[str, ...]) -> Optional[Response]:
+        """Return the last known good response for a request as it was stored."""
+        with self._lock:
+            entry = self.last_good.get(request_key)
+        return None if entry is None else entry[0]
+
+    def acquire(self) -> None:
+        waited = self.bucket.acquire() + self.concurrency.acquire()
+        with self._lock:
+            self.waited += waited
+
+    def headroom(self) -> bool:
+        """Whether there's room for low priority requests: at least half the
+        burst and half the concurrency limit unused."""
+        return (
+            self.bucket.available() >= self.bucket.burst / 2
+            and self.concurrency.in_flight < int(self.concurrency.limit) / 2
+        )
+
+    def hedge_after(self, method: str, key: str) -> Optional[float]:
+        """Seconds after which a request should be hedged, or None if it
+        shouldn't be."""
+        if method != "get" or key not in self.hedge_keys:
+            return None
+        return self.endpoint(key).percentile(self.settings["hedge_percentile"])
+
+    def cache_stats(self) -> dict[str, Any]:
+        with self._lock:
+            held = [response for response, _ in self.last_good.values()]
+        raw = sum(response.raw_size for response in held)
+        stored = sum(response.stored_size for response in held)
+        return {
+            "entries": len(held),
+            "compression": self.settings["cache_compression"],
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "compression_ratio": round(raw / stored, 2) if stored else None,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rate_limit": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "tokens": round(self.bucket.tokens, 2),
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+            "waited_seconds": round(self.waited, 3),
+            "stale_entries": len(self.last_good),
+            "cache": self.cache_stats(),
+            "hedge_budget": round(self.hedge_budget.tokens, 2),
+            "endpoints": {key: stats.as_dict() for key, stats in self.endpoints.items()},
+        }
+
+
+DEFAULT_SETTINGS: dict[str, Any] = {
+    "rate": RATE_LIMIT,
+    "burst": BURST,
+    "min_concurrency": MIN_CONCURRENCY,
+    "max_concurrency": MAX_CONCURRENCY,
+    "max_retries": MAX_RETRIES,
+    "breaker_window": BREAKER_WINDOW,
+    "breaker_min_requests": BREAKER_MIN_REQUESTS,
+    "breaker_error_rate": BREAKER_ERROR_RATE,
+    "breaker_reset_seconds": BREAKER_RESET_SECONDS,
+    "stale_entries": STALE_ENTRIES,
+    "cache_compression": CACHE_COMPRESSION,
+    "hedge_keys": HEDGE_KEYS,
+    "hedge_percentile": HEDGE_PERCENTILE,
+    "hedge_budget": HEDGE_BUDGET,
+}
+
+_limiter = Limiter(dict(DEFAULT_SETTINGS))
+
+
+def configure(**settings: Any) -> None:
+    """Replace the shared limiter, resetting its state and statistics.
+
+    Any of the DEFAULT_SETTINGS keys can be overridden, the rest keep their
+    defaults.
+    """
+    global _limiter
+    unknown = set(settings) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown upstream settings: {sorted(unknown)}")
+    _limiter = Limiter({**DEFAULT_SETTINGS, **settings})
+
+
+def stats() -> dict[str, Any]:
+    """Return limiter and per-endpoint statistics."""
+    return _limiter.stats()
+
+
+def headroom() -> bool:
+    """Whether low priority requests can be sent without holding up others."""
+    return _limiter.headroom()
+
+
+def request_key(method: str, url: str, **kwargs: Any) -> tuple[str, ...]:
+    """Identify a request by everything that changes its response."""
+    return _request_key(method, url, kwargs)
+
+
+def _retry_after(response: Response) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _request_key(method: str, url: str, kwargs: dict[str, Any]) -> tuple[str, ...]:
+    """Identify a request by everything that changes its response."""
+    return (
+        method,
+        url,
+        json.dumps(kwargs.get("params"), sort_keys=True),
+        json.dumps(kwargs.get("json"), sort_keys=True),
+    )
+
+
+def _unavailable(key: str, limiter: Limiter, request_key: tuple[str, ...]) -> Response:
+    """Answer for an endpoint whose circuit is open."""
+    endpoint = limiter.endpoint(key)
+    stale = limiter.recall(request_key)
+    if stale is not None:
+        endpoint.stale += 1
+        log.info("request - %s circuit open, serving response %.0fs old", key, stale.age)
+        return stale
+    endpoint.rejected += 1
+    return Response(
+        f"The upstream for {key} is failing, not retrying for {endpoint.breaker.retry_in():.0f}s.",
+        ok=False,
+        status_code=503,
+    )
+
+
+def _backoff(attempt: int) -> float:
+    # "full jitter" so clients that were throttled together don't retry together.
+    return random.uniform(0, min(MAX_RETRY_DELAY, BACKOFF_BASE * 2**attempt))
+
+
+## Hedging.  Both copies of a hedged request run on the pool, each under a
+## deadline of its own so the one that loses can be cancelled: it stops at
+## its next chunk of the body, or as soon as its headers arrive.
+
+_hedge_pool = ThreadPoolExecutor(max_workers=2 * MAX_CONCURRENCY, thread_name_prefix="hedge")
+
+
+def _attempt(send: Callable[..., Any], url: str, timeout: Any, kwargs: dict[str, Any]) -> Any:
+    """Send a request and read its response, returning it and how long it took."""
+    started = time.monotonic()
+    raw = send(url, stream=True, timeout=deadlines.timeout(timeout), **kwargs)
+    response = Response.from_requests(raw)
+    return response, time.monotonic() - started
+
+
+def _interrupted(error: BaseException) -> bool:
+    """Whether `error` came from the caller's deadline or cancellation rather
+    than the upstream: a socket timeout cut short to fit the deadline counts."""
+    if isinstance(error, deadlines.Interrupted):
+        return True
+    deadline = deadlines.current()
+    return (
+        isinstance(error, requests.Timeout) and deadline is not None and deadline.remaining() == 0
+    )
+
+
+def _under(deadline: deadlines.Deadline, attempt: Callable[[], Any]) -> Any:
+    with deadlines.use(deadline):
+        return attempt()
+
+
+def _limited(limiter: Limiter, attempt: Callable[[], Any]) -> Any:
+    """Run a hedge `attempt` under the limiter, like the request it copies:
+    it takes its own rate token and concurrency slot."""
+    limiter.acquire()
+    congested = True
+    try:
+        response, latency = attempt()
+        status = response.status_code or 0
+        congested = status == 429 or status >= 500
+        return response, latency
+    except Exception as e:
+        if _interrupted(e):
+            # the other attempt won, or the caller ran out of time.
+            congested = False
+        raise
+    finally:
+        limiter.concurrency.release(congested)
+
+
+def _hedged(
+    limiter: Limiter, endpoint: EndpointStats, delay: float, attempt: Callable[[], Any]
+) -> Any:
+    """Run `attempt`, and a second copy of it if the first hasn't finished
+    after `delay` seconds and the hedge budget allows.  The first OK response
+    wins and the other attempt is cancelled.  If neither is OK the first
+    response is returned, or the first error raised if there's no response.
+    """
+    caller = deadlines.current()
+    running: dict[Future[Any], deadlines.Deadline] = {}
+
+    def launch(attempt: Callable[[], Any]) -> Future[Any]:
+        deadline = deadlines.Deadline(None if caller is None else caller.remaining())
+        future = _hedge_pool.submit(contextvars.copy_context().run, _under, deadline, attempt)
+        running[future] = deadline
+        return future
+
+    first = launch(attempt)
+    hedge_at: Optional[float] = time.monotonic() + delay
+    failed: Optional[Any] = None
+    errors: list[BaseException] = []
+    try:
+        while True:
+            # the caller's own deadline, the attempts only see theirs.
+            deadlines.check()
+            timeout = HEDGE_WAIT_SLICE
+            if hedge_at is not None:
+                timeout = min(timeout, max(0.0, hedge_at - time.monotonic()))
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if not result[0].ok:
+                    failed = failed or result
+                    continue
+                if future is not first:
+                    endpoint.hedge_wins += 1
+                return result
+            if not running:
+                if failed is not None:
+                    return failed
+                raise errors[0]
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                # hedge at most once, and only with budget and room to spare.
+                hedge_at = None
+                if limiter.headroom() and limiter.hedge_budget.spend():
+                    endpoint.hedged += 1
+                    tracing.event("hedge", {"pathfinder.hedge_after": delay})
+                    launch(functools.partial(_limited, limiter, attempt))
+    finally:
+        for deadline in running.values():
+            deadline.cancel()
+
+
+def request(method: str, key: str, url: str, **kwargs: Any) -> Response:
+    """Make a rate limited request to the upstream.
+
+    Throttling (429) and gateway errors are retried up to the limiter's
+    max_retries, honoring Retry-After when the upstream sends it.  Any
+    exception from requests is re-raised to the caller.
+
+    While the endpoint's circuit is open no request is sent: the last known
+    good response for the same request is returned marked as stale, or a 503
+    response if there isn't one.
+
+    GET requests, and POSTs marked idempotent, for which we hold a response
+    with an ETag or Last-Modified header are made conditional.  When the
+    upstream answers 304 Not Modified the held response is returned, along
+    with its parsed body and anything derived from it.
+
+    Every request advertises the content encodings urllib3 can decode: gzip
+    and deflate, plus brotli and zstd when their packages are installed.
+
+    Requests are bounded by the current tool call's deadline: the socket
+    timeout never exceeds the time left, waits for the limiter and retries
+    give up when it would pass, and the body is read in chunks so that
+    cancelling the tool call stops the download.
+
+    Arguments:
+      method: str - "get" or "post"
+      key: str - the URL key the request is for, used to group statistics
+      url: str - the full URL
+      idempotent: bool - whether the request only reads, so a held response
+        may be revalidated, defaults to True for GETs only
+      kwargs: passed through to requests
+
+    GETs for the URL keys in JNPR_PATHFINDER_HEDGE_KEYS are hedged: if no
+    response has arrived by a percentile of the endpoint's recent latency a
+    second request is sent, within the hedge budget and the rate and
+    concurrency limits, and the first OK response wins.
+
+    Each request is a span when tracing is on, tagged with the URL key, the
+    status and the bytes received.
+    """
+    attributes = {"pathfinder.url_key": key, "http.request.method": method.upper(), "url.full": url}
+    with tracing.span(f"{method.upper()} {key}", attributes) as span:
+        response = _request(method, key, url, **kwargs)
+        if span is not None:
+            span.set_attributes(
+                {
+                    "http.response.status_code": response.status_code or 0,
+                    "http.response.body.size": response.size,
+                    "pathfinder.wire_size": response.wire_size or response.size,
+                    "pathfinder.stale": response.stale,
+                }
+            )
+        return response
+
+
+def _request(method: str, key: str, url: str, **kwargs: Any) -> Response:
+    limiter = _limiter
+    endpoint = limiter.endpoint(key)
+    request_key = _request_key(method, url, kwargs)
+    send = getattr(requests, method)
+    requested_timeout = kwargs.pop("timeout", REQUEST_TIMEOUT)
+    idempotent = kwargs.pop("idempotent", method == "get")
+    kwargs["headers"] = {"Accept-Encoding": ACCEPT_ENCODING, **(kwargs.get("headers") or {})}
+    attempt = 0
+    while True:
+        deadlines.check()
+        if not endpoint.breaker.allow():
+            tracing.annotate({"pathfinder.circuit_open": True})
+            return _unavailable(key, limiter, request_key)
+        # 304s are only defined for GET and HEAD, so a POST is only made
+        # conditional when the caller says it reads, the upstream may still
+        # answer it with the full body.
+        cached = limiter.cached(request_key) if idempotent else None
+        if cached is not None and cached.validators:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **cached.validators}
+        tracing.annotate({"pathfinder.conditional": cached is not None and bool(cached.validators)})
+        try:
+            limiter.acquire()
+        except BaseException:
+            endpoint.breaker.abandon()
+            raise
+        limiter.hedge_budget.earn()
+        hedge_after = limiter.hedge_after(method, key)
+        congested = True
+        try:
+            if hedge_after is None:
+                response, latency = _attempt(send, url, requested_timeout, kwargs)
+            else:
+                send_once = functools.partial(_attempt, send, url, requested_timeout, dict(kwargs))
+                response, latency = _hedged(limiter, endpoint, hedge_after, send_once)
+            slow = endpoint.observe(latency)
+            status = response.status_code or 0
+            congested = slow or status == 429 or status >= 500
+        except Exception as e:
+            if _interrupted(e):
+                # the caller gave up or ran out of time, that says nothing about the upstream.
+                congested = False
+                endpoint.breaker.abandon()
+                raise
+            endpoint.errors += 1
+            endpoint.breaker.record(False)
+            raise
+        finally:
+            limiter.concurrency.release(congested)
+
+        # throttling is the rate limiter's business, only server errors trip the breaker.
+        endpoint.breaker.record(status < 500)
+        endpoint.bytes_received += (
+            response.size if response.wire_size is None else response.wire_size
+        )
+        endpoint.bytes_decoded += response.size
+        if status == NOT_MODIFIED and cached is not None:
+            tracing.annotate({"pathfinder.not_modified": True})
+            endpoint.not_modified += 1
+            endpoint.bytes_saved += cached.size
+            limiter.remember(request_key, cached)
+            return cached
+        if not response.ok:
+            endpoint.errors += 1
+        elif response.size:
+            limiter.remember(request_key, response)
+        if response.status_code == 429:
+            endpoint.throttled += 1
+        if response.status_code not in RETRY_STATUSES or attempt >= limiter.max_retries:
+            return response
+
+        delay = _retry_after(response)
+        if delay is None:
+            delay = _backoff(attempt)
+        delay = min(delay, MAX_RETRY_DELAY)
+        log.warning("request - %s returned %s, retrying in %.2fs", key, response.status_code, delay)
+        tracing.event("retry", {"http.response.status_code": status, "pathfinder.delay": delay})
+        # pause everyone, not just this caller, the upstream asked us all to slow down.
+        limiter.bucket.pause(delay)
+        endpoint.retries += 1
+        attempt += 1
+
+
+def get(key: str, url: str, **kwargs: Any) -> Response:
+    return request("get", key, url, **kwargs)
+
+
+def post(key: str, url: str, **kwargs: Any) -> Response:
+    return request("post", key, url, **kwargs)
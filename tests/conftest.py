@@ -0,0 +1,17 @@
+import pytest
+
+from jnpr_pathfinder_mcp import upstream
+from jnpr_pathfinder_mcp.server import cli_explorer
+
+
+@pytest.fixture(autouse=True)
+def reset_upstream():
+    """Start every test with fresh limiter, circuit breaker, stale response,
+    search result and held hierarchy state."""
+    upstream.configure()
+    cli_explorer._search_cache.clear()
+    cli_explorer._hierarchy_state["response"] = None
+    yield
+    upstream.configure()
+    cli_explorer._search_cache.clear()
+    cli_explorer._hierarchy_state["response"] = None
@@ -0,0 +1,133 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from fastmcp import Client, FastMCP
+
+from jnpr_pathfinder_mcp import admission
+
+
+def gated_server(control):
+    """A server whose tools run until the test opens their gate."""
+    server = FastMCP("admission")
+    gate = asyncio.Event()
+
+    @server.tool
+    async def slow() -> str:
+        await gate.wait()
+        return "done"
+
+    @server.tool
+    async def prefix_expensive() -> str:
+        await gate.wait()
+        return "done"
+
+    server.add_middleware(control)
+    return server, gate
+
+
+async def started(control, in_flight=0, waiting=0):
+    while control.in_flight < in_flight or control.waiting < waiting:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_queued_calls_are_admitted_and_a_full_queue_rejects():
+    control = admission.AdmissionControl(max_in_flight=1, tool_limits={}, max_queue=1)
+    server, gate = gated_server(control)
+    async with Client(server) as client:
+        first = asyncio.create_task(client.call_tool("slow"))
+        await started(control, in_flight=1)
+        second = asyncio.create_task(client.call_tool("slow"))
+        await started(control, in_flight=1, waiting=1)
+        result = await client.call_tool("slow", raise_on_error=False)
+        assert result.is_error
+        assert "Server busy (queue full), retry after" in result.content[0].text
+        gate.set()
+        assert (await first).data == "done"
+        assert (await second).data == "done"
+    stats = control.stats()
+    assert stats["admitted"] == 2
+    assert stats["queued"] == 1
+    assert stats["queue_full"] == 1
+    assert stats["in_flight"] == stats["waiting"] == stats["clients"] == 0
+    assert stats["average_duration_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_waiting_too_long_is_rejected():
+    control = admission.AdmissionControl(max_in_flight=1, tool_limits={}, queue_timeout=0.05)
+    server, gate = gated_server(control)
+    async with Client(server) as client:
+        first = asyncio.create_task(client.call_tool("slow"))
+        await started(control, in_flight=1)
+        result = await client.call_tool("slow", raise_on_error=False)
+        assert "timed out waiting for a slot" in result.content[0].text
+        gate.set()
+        await first
+    assert control.stats()["timeout"] == 1
+    assert control._slots._value == 1
+
+
+@pytest.mark.asyncio
+async def test_tool_limits_match_prefixed_names():
+    control = admission.AdmissionControl(
+        max_in_flight=4, tool_limits={"expensive": 1}, queue_timeout=0.05
+    )
+    server, gate = gated_server(control)
+    async with Client(server) as client:
+        first = asyncio.create_task(client.call_tool("prefix_expensive"))
+        await started(control, in_flight=1)
+        result = await client.call_tool("prefix_expensive", raise_on_error=False)
+        assert result.is_error
+        # other tools still have global slots.
+        other = asyncio.create_task(client.call_tool("slow"))
+        await started(control, in_flight=2)
+        gate.set()
+        await first
+        await other
+    assert control._slots._value == 4
+    assert control._tool_slots["slow"] is None
+
+
+@pytest.mark.asyncio
+async def test_client_quota():
+    control = admission.AdmissionControl(max_in_flight=4, tool_limits={}, client_quota=1)
+    server, gate = gated_server(control)
+    async with Client(server) as client:
+        first = asyncio.create_task(client.call_tool("slow"))
+        await started(control, in_flight=1)
+        result = await client.call_tool("slow", raise_on_error=False)
+        assert "client local has 1 calls pending" in result.content[0].text
+        with mock.patch.object(admission, "_client_id", return_value="other"):
+            second = asyncio.create_task(client.call_tool("slow"))
+            await started(control, in_flight=2)
+        gate.set()
+        await first
+        await second
+    assert control.stats()["quota"] == 1
+
+
+def test_client_id_from_header_or_address():
+    request = mock.Mock(headers={"x-client-id": "agent-7"})
+    with mock.patch.object(admission, "get_http_request", return_value=request):
+        assert admission._client_id() == "agent-7"
+        request.headers = {}
+        request.client.host = "10.0.0.1"
+        assert admission._client_id() == "10.0.0.1"
+    assert admission._client_id() == "local"
+
+
+def test_configured_limits(monkeypatch):
+    monkeypatch.setenv(admission.TOOL_LIMITS_ENV, "feature_tree=2, product_keys=1,")
+    assert admission._configured_limits() == {"feature_tree": 2, "product_keys": 1}
+
+
+def test_install_once_and_disabled(monkeypatch):
+    server = FastMCP("admission")
+    assert admission.stats(server) is None
+    control = admission.install(server)
+    assert admission.install(server) is control
+    assert admission.stats(server)["max_in_flight"] == admission.MAX_IN_FLIGHT
+    monkeypatch.setattr(admission, "MAX_IN_FLIGHT", 0)
+    assert admission.install(FastMCP("disabled")) is None
@@ -0,0 +1,104 @@
+import os
+import time
+from unittest import mock
+
+import pytest
+
+from jnpr_pathfinder_mcp import cache, records, upstream
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    # restored when the test ends, cache.configure() sets it directly.
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, "")
+    cache.configure(str(tmp_path / "snapshots"))
+    yield tmp_path / "snapshots"
+
+
+def test_snapshots_disabled_without_cache_dir(monkeypatch):
+    monkeypatch.delenv(cache.CACHE_DIR_ENV, raising=False)
+    assert cache.cache_dir() is None
+    cache.save_snapshot("thing", {"a": 1})
+    assert cache.load_snapshot("thing") is None
+
+
+def test_snapshot_round_trip(cache_dir):
+    assert cache.cache_dir() == cache_dir
+    assert cache.load_snapshot("thing") is None
+    cache.save_snapshot("thing", {"a": 1})
+    assert cache.load_snapshot("thing") == {"a": 1}
+    # no temporary files left behind
+    assert [p.name for p in cache_dir.iterdir()] == ["thing.json"]
+
+
+def test_old_snapshots_expire(cache_dir):
+    cache.save_snapshot("thing", {"a": 1})
+    old = time.time() - cache.SNAPSHOT_MAX_AGE - 1
+    os.utime(cache_dir / "thing.json", (old, old))
+    assert cache.load_snapshot("thing") is None
+    with mock.patch.object(cache, "SNAPSHOT_MAX_AGE", 0):
+        assert cache.load_snapshot("thing") == {"a": 1}
+
+
+def test_unreadable_snapshot_is_ignored(cache_dir):
+    (cache_dir / "thing.json").write_text("{not json")
+    assert cache.load_snapshot("thing") is None
+
+
+def test_failed_snapshot_write_cleans_up(cache_dir):
+    with pytest.raises(TypeError):
+        cache.save_snapshot("thing", {"a": object()})
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_snapshot_writes_are_batched(cache_dir):
+    state = {"count": 0}
+    build = mock.Mock(side_effect=lambda: dict(state))
+    with mock.patch.object(cache, "SNAPSHOT_WRITE_DELAY", 60):
+        for count in range(1, 4):
+            state["count"] = count
+            cache.save_snapshot_soon("thing", build)
+        assert cache.load_snapshot("thing") is None
+        cache.flush_snapshots()
+    assert cache.load_snapshot("thing") == {"count": 3}
+    assert build.call_count == 1
+
+    with mock.patch.object(cache, "SNAPSHOT_WRITE_DELAY", 0):
+        state["count"] = 4
+        cache.save_snapshot_soon("thing", build)
+    assert cache.load_snapshot("thing") == {"count": 4}
+
+
+def test_warm_runs_warmers_and_survives_errors():
+    good = mock.Mock()
+    bad = mock.Mock(side_effect=Exception("boom"))
+    with mock.patch.dict(cache._warmers, {"bad": bad, "good": good}, clear=True):
+        cache.warm()
+    bad.assert_called_once()
+    good.assert_called_once()
+
+
+def test_platform_catalog_uses_snapshot(cache_dir):
+    from jnpr_pathfinder_mcp.server import feature_explorer
+
+    feature_explorer._build_platform_catalog.cache_clear()
+    entry = {"family": "mx_series", "product_key": 11320008}
+    cache.save_snapshot("platform_catalog", {"mx10008": entry})
+    with mock.patch.object(upstream.requests, "get") as mock_get:
+        catalog = feature_explorer._build_platform_catalog()
+        mock_get.assert_not_called()
+    assert catalog == {"mx10008": entry}
+    assert isinstance(catalog["mx10008"], records.CatalogEntry)
+    feature_explorer._build_platform_catalog.cache_clear()
+
+
+def test_component_catalog_uses_snapshot(cache_dir):
+    from jnpr_pathfinder_mcp.server import hct
+
+    component = {"name": "QSFP", "category": "Optics", "category_key": "7", "description": ""}
+    cache.save_snapshot("hct_component_catalog", [component])
+    with mock.patch.object(upstream.requests, "get") as mock_get:
+        catalog = hct._build_component_catalog()
+        mock_get.assert_not_called()
+    assert catalog == [component]
+    assert isinstance(catalog[0], records.Component)
@@ -1,4 +1,5 @@
 import json
+import types
 from unittest import mock
 
 import pytest
@@ -7,6 +8,8 @@ from fastmcp import Client
 from fastmcp.exceptions import ToolError
 
 import jnpr_pathfinder_mcp
+from jnpr_pathfinder_mcp import dataset, search
+from jnpr_pathfinder_mcp.server import cli_explorer
 from jnpr_pathfinder_mcp.server.cli_explorer import mcp
 
 
@@ -30,7 +33,7 @@ async def test_topic_reference():
         assert result.structured_content.get("success")
         assert result.structured_content.get("response")
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -38,7 +41,7 @@ async def test_topic_reference():
                 await client.call_tool("topic_reference")
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -48,7 +51,7 @@ async def test_topic_reference():
             assert not result.structured_content.get("response")
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -65,9 +68,11 @@ async def test_topic_hierarchy():
         result = await client.call_tool("topic_hierarchy")
         assert result.structured_content.get("success")
         assert result.structured_content.get("response")
+        # otherwise the hierarchy just fetched is served again.
+        cli_explorer._hierarchy_state["response"] = None
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -75,7 +80,7 @@ async def test_topic_hierarchy():
                 await client.call_tool("topic_hierarchy")
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -84,7 +89,7 @@ async def test_topic_hierarchy():
             assert result.structured_content.get("error")
             assert not result.structured_content.get("response")
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(True, ""),
         ):
@@ -103,9 +108,11 @@ async def test_topic_search():
         )
         assert result.structured_content.get("success")
         assert result.structured_content.get("response")
+        # otherwise the search is answered from the results just fetched.
+        cli_explorer._search_cache.clear()
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -115,7 +122,7 @@ async def test_topic_search():
                 )
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -126,7 +133,7 @@ async def test_topic_search():
             assert result.structured_content.get("error")
             assert not result.structured_content.get("response")
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(True, ""),
         ):
@@ -136,3 +143,279 @@ async def test_topic_search():
             assert not result.structured_content.get("success")
             assert result.structured_content.get("error")
             assert "Empty response from API" in result.structured_content.get("error")
+
+
+@pytest.mark.asyncio
+async def test_topic_hierarchy_is_held(monkeypatch):
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests,
+            "post",
+            return_value=search_response(HIERARCHY),
+        ) as mock_post:
+            await client.call_tool("topic_hierarchy")
+            await client.read_resource("pathfinder://cli/hierarchy/protocols")
+            result = await client.call_tool("topic_hierarchy")
+            assert mock_post.call_count == 1
+            assert result.structured_content["response"] == HIERARCHY
+            # once it may be out of date, it's revalidated.
+            monkeypatch.setitem(cli_explorer._hierarchy_state, "expires", 0.0)
+            await client.call_tool("topic_hierarchy")
+            assert mock_post.call_count == 2
+
+
+def test_normalize_query():
+    assert cli_explorer.normalize_query("  Show  BGP neighbor ") == "show bgp neighbor"
+    assert cli_explorer.normalize_query("set interfaces ge-0/0/0") == "set interfaces ge-0/0/0"
+    # the upstream may treat these differently, so they're held apart.
+    assert cli_explorer.normalize_query('show "bgp neighbor"') == 'show "bgp neighbor"'
+    assert cli_explorer.normalize_query("bgp bgp") == "bgp bgp"
+    assert cli_explorer.normalize_query("  ") == ""
+
+
+def search_response(document, ok=True):
+    return types.SimpleNamespace(
+        ok=ok,
+        status_code=200 if ok else 404,
+        content=json.dumps(document).encode(),
+        headers={},
+        encoding="utf-8",
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_pages_are_sliced_from_held_results(monkeypatch):
+    monkeypatch.setattr(cli_explorer, "SEARCH_WINDOW", 10)
+    results = {"total": 25, "results": [{"command": f"show bgp {n}"} for n in range(10)]}
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests, "post", return_value=search_response(results)
+        ) as mock_post:
+            first = await client.call_tool("search", {"query": "Show  BGP", "page_size": 4})
+            second = await client.call_tool(
+                "search", {"query": "show bgp", "page_number": 2, "page_size": 4}
+            )
+            assert mock_post.call_count == 1
+            # held under the normalized query, but sent as asked.
+            assert mock_post.call_args.kwargs["json"] == {
+                "searchQuery": "Show  BGP",
+                "pageNumber": 1,
+                "pageSize": 10,
+            }
+            # the page runs past the held window, so it's fetched as asked.
+            await client.call_tool(
+                "search", {"query": "show bgp", "page_number": 3, "page_size": 4}
+            )
+            assert mock_post.call_count == 2
+            assert mock_post.call_args.kwargs["json"]["pageNumber"] == 3
+            assert mock_post.call_args.kwargs["json"]["pageSize"] == 4
+            # a page in the next window fetches and holds that window.
+            await client.call_tool(
+                "search", {"query": "show bgp", "page_number": 3, "page_size": 5}
+            )
+            await client.call_tool(
+                "search", {"query": "show bgp", "page_number": 4, "page_size": 5}
+            )
+            assert mock_post.call_count == 3
+            assert mock_post.call_args.kwargs["json"]["pageNumber"] == 2
+            assert mock_post.call_args.kwargs["json"]["pageSize"] == 10
+    assert first.structured_content["response"] == {"total": 25, "results": results["results"][:4]}
+    assert second.structured_content["response"]["results"] == results["results"][4:8]
+    assert cli_explorer._search_cache.stats()["hits"] == 3
+
+
+@pytest.mark.asyncio
+async def test_search_capped_by_the_upstream(monkeypatch):
+    monkeypatch.setattr(cli_explorer, "SEARCH_WINDOW", 10)
+    # asked for 10 results, the upstream sent 4 of 25.
+    results = {"total": 25, "results": [{"command": f"show bgp {n}"} for n in range(4)]}
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests, "post", return_value=search_response(results)
+        ) as mock_post:
+            first = await client.call_tool("search", {"query": "bgp", "page_size": 4})
+            second = await client.call_tool(
+                "search", {"query": "bgp", "page_number": 2, "page_size": 4}
+            )
+            assert mock_post.call_count == 2
+            assert mock_post.call_args.kwargs["json"]["pageNumber"] == 2
+            # a short window past the first can't be placed, so pages in it go as asked.
+            await client.call_tool("search", {"query": "bgp", "page_number": 3, "page_size": 5})
+            assert mock_post.call_count == 4
+            assert mock_post.call_args.kwargs["json"]["pageNumber"] == 3
+    assert first.structured_content["response"]["results"] == results["results"]
+    assert second.structured_content["response"]["results"] == results["results"]
+
+
+@pytest.mark.asyncio
+async def test_sliced_pages_describe_themselves():
+    results = {
+        "pageNumber": 1,
+        "pageSize": cli_explorer.SEARCH_WINDOW,
+        "totalCount": 12,
+        "totalPages": 1,
+        "results": [{"command": f"show route {n}"} for n in range(12)],
+    }
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests, "post", return_value=search_response(results)
+        ):
+            page = await client.call_tool(
+                "search", {"query": "show route", "page_number": 3, "page_size": 5}
+            )
+    assert page.structured_content["response"] == {
+        "pageNumber": 3,
+        "pageSize": 5,
+        "totalCount": 12,
+        "totalPages": 3,
+        "results": results["results"][10:],
+    }
+
+
+@pytest.mark.asyncio
+async def test_search_short_list_results():
+    results = [{"command": "show ospf neighbor"}, {"command": "show ospf interface"}]
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests, "post", return_value=search_response(results)
+        ) as mock_post:
+            result = await client.call_tool(
+                "search", {"query": "ospf", "page_number": 2, "page_size": 1}
+            )
+            empty = await client.call_tool(
+                "search", {"query": "OSPF", "page_number": 3, "page_size": 1}
+            )
+            assert mock_post.call_count == 1
+    assert result.structured_content["response"] == results[1:]
+    assert empty.structured_content["response"] == []
+
+
+@pytest.mark.asyncio
+async def test_search_cache_expiry_and_bounds(monkeypatch):
+    monkeypatch.setattr(cli_explorer, "_search_cache", cli_explorer.SearchCache(60, 1))
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests, "post", return_value=search_response({"n": 1})
+        ) as mock_post:
+            # nothing to page through, so every page is fetched.
+            await client.call_tool("search", {"query": "bgp"})
+            assert mock_post.call_count == 2
+            await client.call_tool("search", {"query": "ospf"})
+            await client.call_tool("search", {"query": "bgp"})
+            assert mock_post.call_count == 6
+    monkeypatch.setattr(cli_explorer.time, "monotonic", lambda: 1e12)
+    assert cli_explorer._search_cache.get(("bgp", 0)) is None
+    cli_explorer.SearchCache(0, 1).put(("bgp", 0), search_response({}))
+
+
+REFERENCE = {"topics": [{"name": "show bgp neighbor", "description": "Display BGP peers."}]}
+HIERARCHY = {
+    "children": [
+        {
+            "name": "protocols",
+            "children": [
+                {"name": "bgp", "description": "Configure BGP."},
+                {"name": "ospf", "description": "Configure OSPF."},
+            ],
+        }
+    ]
+}
+
+
+@pytest.fixture
+def local_index(monkeypatch):
+    monkeypatch.setattr(cli_explorer, "_local_index", search.BM25Index())
+    monkeypatch.setattr(cli_explorer, "_local_state", {"sources": [], "expires": 0.0})
+    return cli_explorer._local_state
+
+
+@pytest.mark.asyncio
+async def test_local_search_backend(local_index):
+    async with Client(mcp) as client:
+        with (
+            mock.patch.object(
+                jnpr_pathfinder_mcp.upstream.requests,
+                "get",
+                return_value=search_response(REFERENCE),
+            ) as mock_get,
+            mock.patch.object(
+                jnpr_pathfinder_mcp.upstream.requests,
+                "post",
+                return_value=search_response(HIERARCHY),
+            ) as mock_post,
+        ):
+            result = await client.call_tool(
+                "search", {"query": "Protocols BGP", "backend": "local", "page_size": 2}
+            )
+            again = await client.call_tool(
+                "search", {"query": "ospf", "backend": "local", "page_number": 1}
+            )
+            assert mock_get.call_count == mock_post.call_count == 1
+            # once the sources may be out of date, they're refetched.
+            local_index["expires"] = 0.0
+            cli_explorer._hierarchy_state["expires"] = 0.0
+            await client.call_tool("search", {"query": "ospf", "backend": "local"})
+            assert mock_get.call_count == mock_post.call_count == 2
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests,
+            "get",
+            side_effect=requests.exceptions.ConnectionError,
+        ):
+            local_index["expires"] = 0.0
+            kept = await client.call_tool("search", {"query": "ospf", "backend": "local"})
+
+    response = result.structured_content["response"]
+    assert response["backend"] == "local"
+    assert response["total"] == 4
+    assert response["results"][0]["path"] == "protocols/bgp"
+    assert response["results"][0]["source"] == "hierarchy"
+    assert response["results"][0]["description"] == "Configure BGP."
+    assert len(response["results"]) == 2
+    assert again.structured_content["response"]["results"][0]["path"] == "protocols/ospf"
+    assert kept.structured_content["response"]["results"][0]["path"] == "protocols/ospf"
+
+
+@pytest.mark.asyncio
+async def test_local_search_without_sources(local_index):
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests,
+            "get",
+            return_value=search_response("Not found.", ok=False),
+        ):
+            with mock.patch.object(
+                jnpr_pathfinder_mcp.upstream.requests,
+                "post",
+                return_value=search_response("Not found.", ok=False),
+            ):
+                result = await client.call_tool("search", {"query": "bgp", "backend": "local"})
+    assert not result.structured_content["success"]
+    assert "The local index can't be built" in result.structured_content["error"]
+
+
+@pytest.mark.asyncio
+async def test_local_search_from_the_offline_dataset(local_index, tmp_path, monkeypatch):
+    writer = dataset.DatasetWriter()
+    writer.add(dataset.CLI_PATHS, "", {"path": "", "fields": {}, "children": ["protocols"]})
+    writer.add(
+        dataset.CLI_PATHS,
+        "protocols",
+        {"path": "protocols", "fields": {"name": "protocols"}, "children": ["bgp"]},
+    )
+    writer.add(
+        dataset.CLI_PATHS,
+        "protocols/bgp",
+        {"path": "protocols/bgp", "node": {"name": "bgp", "description": "Configure BGP."}},
+    )
+    writer.write(tmp_path / "d")
+    monkeypatch.setenv(dataset.DATASET_ENV, str(tmp_path / "d"))
+    try:
+        async with Client(mcp) as client:
+            with mock.patch.object(jnpr_pathfinder_mcp.upstream.requests, "get") as mock_get:
+                result = await client.call_tool("search", {"query": "bgp", "backend": "local"})
+                mock_get.assert_not_called()
+    finally:
+        dataset._open.cache_clear()
+    response = result.structured_content["response"]
+    assert response["total"] == 1
+    assert response["results"][0]["path"] == "protocols/bgp"
@@ -0,0 +1,125 @@
+import json
+from unittest import mock
+
+import pytest
+from fastmcp import Client
+from fastmcp.exceptions import McpError
+
+from jnpr_pathfinder_mcp import dataset, upstream
+from jnpr_pathfinder_mcp.server import cli_explorer, feature_explorer, hct
+
+
+class ResponseMock:
+    def __init__(self, ok=True, content=""):
+        self.content = content.encode("utf-8") if isinstance(content, str) else content
+        self.ok = ok
+        self.status_code = 200
+        self.headers = {}
+        self.encoding = "utf-8"
+
+
+FEATURE_TREE = {
+    "children": [
+        {"name": "Routing", "featureKey": "F1", "children": [{"name": "BGP", "featureKey": "F2"}]},
+    ]
+}
+HIERARCHY = {"children": [{"name": "protocols", "children": [{"name": "bgp"}, {"name": "ospf"}]}]}
+CATEGORIES = [{"categoryKey": 7, "categoryName": "Optics"}]
+COMPONENTS = [{"modelName": "QSFP-100G-LR4", "description": "100G optic"}]
+PLATFORMS = {"MX Series": {"MX": ["MX204", "MX960"]}}
+
+
+@pytest.fixture
+def dataset_file(tmp_path, monkeypatch):
+    path = tmp_path / "pathfinder.dataset"
+    monkeypatch.setenv(dataset.DATASET_ENV, str(path))
+    hct._platform_hierarchy.cache_clear()
+    yield path
+    dataset._open.cache_clear()
+    hct._platform_hierarchy.cache_clear()
+
+
+def upstream_get(url, **kwargs):
+    if "allCategories" in url:
+        return ResponseMock(True, json.dumps(CATEGORIES))
+    if "/hct/model/" in url:
+        return ResponseMock(True, json.dumps(COMPONENTS))
+    if "allPlatformsGroupByFamily" in url:
+        return ResponseMock(True, json.dumps(PLATFORMS))
+    return ResponseMock(True, json.dumps(FEATURE_TREE))
+
+
+def test_write_and_read(tmp_path):
+    writer = dataset.DatasetWriter()
+    for n in range(100):
+        writer.add("numbers", f"n{n:03d}", {"value": n})
+    writer.add("words", "héllo", ["wörld"])
+    writer.write(tmp_path / "d")
+
+    mapped = dataset.Dataset(tmp_path / "d")
+    assert set(mapped.sections) == {"numbers", "words"}
+    assert mapped.get("numbers", "n042") == {"value": 42}
+    assert mapped.get("numbers", "n100") is None
+    assert mapped.get("numbers", "a", "default") == "default"
+    assert mapped.get("missing", "n001") is None
+    assert mapped.get("words", "héllo") == ["wörld"]
+    assert list(mapped.keys("numbers"))[:2] == ["n000", "n001"]
+    assert len(list(mapped.values("numbers"))) == 100
+    assert list(mapped.keys("missing")) == []
+    mapped.close()
+
+
+def test_unusable_files_are_ignored(tmp_path, monkeypatch):
+    (tmp_path / "bad").write_bytes(b"not a dataset")
+    with pytest.raises(ValueError, match="not a dataset file"):
+        dataset.Dataset(tmp_path / "bad")
+    monkeypatch.setenv(dataset.DATASET_ENV, str(tmp_path / "bad"))
+    assert dataset.current() is None
+    monkeypatch.delenv(dataset.DATASET_ENV)
+    assert dataset.current() is None
+    assert dataset.section(dataset.FEATURES) is None
+    dataset._open.cache_clear()
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    writer = dataset.DatasetWriter()
+    writer.add("s", "k", 1)
+    writer._sections["s"]["k".encode()] = None
+    with pytest.raises(TypeError):
+        writer.write(tmp_path / "d")
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_servers_read_from_a_built_dataset(dataset_file):
+    with mock.patch.object(upstream.requests, "get", side_effect=upstream_get):
+        with mock.patch.object(
+            upstream.requests, "post", return_value=ResponseMock(True, json.dumps(HIERARCHY))
+        ):
+            counts = dataset.build(dataset_file)
+    assert counts == {"hct_component": 1, "hct_platform": 2, "feature": 2, "cli_path": 4}
+
+    with mock.patch.object(upstream.requests, "get") as get:
+        with mock.patch.object(upstream.requests, "post") as post:
+            async with Client(cli_explorer.mcp) as client:
+                result = await client.read_resource("pathfinder://cli/hierarchy/protocols/bgp/")
+                assert json.loads(result[0].text)["path"] == "protocols/bgp"
+            async with Client(feature_explorer.mcp) as client:
+                result = await client.read_resource("pathfinder://feature/key/F2")
+                assert json.loads(result[0].text) == {"name": "BGP", "featureKey": "F2"}
+                with pytest.raises(McpError, match="No feature with key"):
+                    await client.read_resource("pathfinder://feature/key/F3")
+            assert hct._build_component_catalog()[0].name == "QSFP-100G-LR4"
+            assert hct._check_platform("mx-204") == ("MX204", None)
+    get.assert_not_called()
+    post.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_feature_resource_without_a_dataset():
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(True, json.dumps(FEATURE_TREE))
+    ):
+        async with Client(feature_explorer.mcp) as client:
+            result = await client.read_resource("pathfinder://feature/key/F1")
+    assert json.loads(result[0].text) == {"name": "Routing", "featureKey": "F1"}
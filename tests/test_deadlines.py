@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+import types
+from unittest import mock
+
+import pytest
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from jnpr_pathfinder_mcp import deadlines, upstream
+
+
+class StreamingResponseMock:
+    """A streamed response whose chunks are handed out by the test."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.ok = True
+        self.status_code = 200
+        self.headers = {}
+        self.encoding = "utf-8"
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        yield from self.chunks
+
+    def close(self):
+        self.closed = True
+
+
+def test_deadline_remaining_and_check():
+    deadline = deadlines.Deadline(None)
+    assert deadline.remaining() is None
+    deadline.check()
+
+    deadline = deadlines.Deadline(0)
+    assert deadline.remaining() == 0
+    with pytest.raises(deadlines.DeadlineExceeded):
+        deadline.check()
+
+    deadline = deadlines.Deadline(10)
+    deadline.cancel()
+    with pytest.raises(deadlines.Cancelled):
+        deadline.check()
+
+
+def test_deadline_sleep_refuses_to_overrun():
+    deadline = deadlines.Deadline(1)
+    with pytest.raises(deadlines.DeadlineExceeded):
+        deadline.sleep(5)
+
+
+def test_deadline_sleep_wakes_on_cancel():
+    deadline = deadlines.Deadline(30)
+    threading.Timer(0.05, deadline.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(deadlines.Cancelled):
+        deadline.sleep(10)
+    assert time.monotonic() - started < 5
+
+
+def test_timeout_is_bounded_by_deadline():
+    assert deadlines.timeout(15) == 15
+    assert deadlines.timeout(None) is None
+    with deadlines.use(deadlines.Deadline(5)):
+        assert deadlines.timeout(15) <= 5
+        assert deadlines.timeout(None) <= 5
+        assert deadlines.timeout(1) == 1
+    assert deadlines.current() is None
+
+
+def test_upstream_request_carries_deadline():
+    response = StreamingResponseMock([b'{"a": ', b"1}"])
+    with mock.patch.object(upstream.requests, "get", return_value=response) as mock_get:
+        with deadlines.use(deadlines.Deadline(5)):
+            result = upstream.get("thing", "https://example.com/thing", timeout=15)
+    assert result.json() == {"a": 1}
+    _, kwargs = mock_get.call_args
+    assert kwargs["stream"] is True
+    assert 0 < kwargs["timeout"] <= 5
+
+    with mock.patch.object(upstream.requests, "get", return_value=response) as mock_get:
+        upstream.get("thing", "https://example.com/thing")
+    assert mock_get.call_args[1]["timeout"] == upstream.REQUEST_TIMEOUT
+
+
+def test_upstream_request_stops_reading_when_cancelled():
+    deadline = deadlines.Deadline(30)
+
+    def chunks():
+        yield b"first"
+        deadline.cancel()
+        yield b"second"
+        yield b"third"
+
+    response = StreamingResponseMock(chunks())
+    with mock.patch.object(upstream.requests, "get", return_value=response):
+        with deadlines.use(deadline):
+            with pytest.raises(deadlines.Cancelled):
+                upstream.get("thing", "https://example.com/thing")
+    assert response.closed
+    stats = upstream.stats()
+    assert stats["in_flight"] == 0
+    # cancelling is not the upstream's fault
+    assert stats["endpoints"]["thing"]["errors"] == 0
+
+
+def test_upstream_request_not_sent_after_deadline():
+    with mock.patch.object(upstream.requests, "get") as mock_get:
+        with deadlines.use(deadlines.Deadline(0)):
+            with pytest.raises(deadlines.DeadlineExceeded):
+                upstream.get("thing", "https://example.com/thing")
+    mock_get.assert_not_called()
+
+
+def test_retry_after_longer_than_deadline_gives_up():
+    response = types.SimpleNamespace(
+        ok=False, status_code=429, headers={"Retry-After": "20"}, content=b"slow down"
+    )
+    with mock.patch.object(upstream.requests, "get", return_value=response) as mock_get:
+        with deadlines.use(deadlines.Deadline(5)):
+            with pytest.raises(deadlines.DeadlineExceeded):
+                upstream.get("thing", "https://example.com/thing")
+    assert mock_get.call_count == 1
+
+
+def _server(timeout, release=None):
+    server = FastMCP("deadline_test")
+
+    @server.tool
+    @deadlines.with_deadline(timeout)
+    def slow_tool() -> dict:
+        """Wait for the test to release us, or for the deadline."""
+        deadline = deadlines.current()
+        while not (release is not None and release.is_set()):
+            deadline.sleep(0.01)
+        return {"remaining": deadline.remaining()}
+
+    return server
+
+
+@pytest.mark.asyncio
+async def test_with_deadline_times_out():
+    async with Client(_server(0.2)) as client:
+        with pytest.raises(ToolError, match="did not finish within 0.2s"):
+            await client.call_tool("slow_tool")
+
+
+@pytest.mark.asyncio
+async def test_with_deadline_configured_per_tool(monkeypatch):
+    monkeypatch.setenv(deadlines.TOOL_TIMEOUTS_ENV, "other_tool=100, slow_tool=0.1")
+    async with Client(_server(60)) as client:
+        with pytest.raises(ToolError, match="did not finish within 0.1s"):
+            await client.call_tool("slow_tool")
+
+
+@pytest.mark.asyncio
+async def test_with_deadline_caller_can_shorten():
+    with mock.patch.object(deadlines, "_caller_timeout", return_value=0.1):
+        async with Client(_server(60)) as client:
+            with pytest.raises(ToolError, match="did not finish within 0.1s"):
+                await client.call_tool("slow_tool")
+
+
+@pytest.mark.asyncio
+async def test_with_deadline_returns_result():
+    release = threading.Event()
+    release.set()
+    async with Client(_server(60, release=release)) as client:
+        result = await client.call_tool("slow_tool")
+        assert 0 < result.structured_content["remaining"] <= 60
+
+
+@pytest.mark.asyncio
+async def test_with_deadline_cancellation_reaches_the_thread():
+    seen = []
+
+    @deadlines.with_deadline(60)
+    def tool():
+        deadline = deadlines.current()
+        seen.append(deadline)
+        while True:
+            deadline.sleep(0.01)
+
+    task = asyncio.create_task(tool())
+    while not seen:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert seen[0].cancelled
+
+
+def test_caller_timeout_from_request_meta():
+    meta = mock.Mock()
+    meta.timeout = "2.5"
+    context = mock.Mock()
+    context.request_context.meta = meta
+    with mock.patch.object(deadlines, "get_context", return_value=context):
+        assert deadlines._caller_timeout() == 2.5
+        meta.timeout = "soon"
+        assert deadlines._caller_timeout() is None
+        context.request_context.meta = None
+        assert deadlines._caller_timeout() is None
+    # outside of a request there's no context at all
+    assert deadlines._caller_timeout() is None
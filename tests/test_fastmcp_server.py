@@ -1,10 +1,15 @@
+import asyncio
+import os
 import sys
+import types
 from argparse import Namespace
 from unittest import mock
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 
 import pytest
+from fastmcp import Client, FastMCP
 
+from jnpr_pathfinder_mcp import cache, helpers
 from jnpr_pathfinder_mcp.server import pathfinder
 from jnpr_pathfinder_mcp.server.pathfinder import mcp as server
 from jnpr_pathfinder_mcp.__main__ import main
@@ -58,7 +63,11 @@ def test_run_cli_with_stdio_and_host_or_port():
     with pytest.raises(ValueError, match="host/port cannot be used with stdio transport"):
         with mock.patch(
             "jnpr_pathfinder_mcp.helpers.parse_args",
-            return_value=Namespace(transport="stdio", host="localhost", port=8080),
+            return_value=Namespace(
+                transport="stdio", host="localhost", port=8080, workers=1, cache_dir=None,
+                profile=None,
+                trace=None,
+            ),
         ):
             run_cli("prog", server)
         mock_run.assert_called_once_with(transport="http", host="localhost", port=8080)
@@ -69,7 +78,10 @@ def test_main_with_valid_stdio(mock_run):
     # Valid case for stdio
     with mock.patch(
         "jnpr_pathfinder_mcp.helpers.parse_args",
-        return_value=Namespace(transport="stdio", host=None, port=None),
+        return_value=Namespace(
+            transport="stdio", host=None, port=None, workers=1, cache_dir=None, profile=None,
+            trace=None,
+        ),
     ):
         main()
         mock_run.assert_called_once_with(transport="stdio")
@@ -80,7 +92,10 @@ def test_run_cli_with_valid_stdio(mock_run):
     # Valid case for stdio
     with mock.patch(
         "jnpr_pathfinder_mcp.helpers.parse_args",
-        return_value=Namespace(transport="stdio", host=None, port=None),
+        return_value=Namespace(
+            transport="stdio", host=None, port=None, workers=1, cache_dir=None, profile=None,
+            trace=None,
+        ),
     ):
         run_cli("prog", server)
         mock_run.assert_called_once_with(transport="stdio")
@@ -91,16 +106,26 @@ def test_run_cli_with_valid_http():
     with mock.patch("jnpr_pathfinder_mcp.server.pathfinder.mcp.run") as mock_run:
         with mock.patch(
             "jnpr_pathfinder_mcp.helpers.parse_args",
-            return_value=Namespace(transport="http", host="localhost", port=8080)
+            return_value=Namespace(
+                transport="http", host="localhost", port=8080, workers=1, cache_dir=None,
+                profile=None,
+                trace=None,
+            )
         ):
-            run_cli("prog", server)
+            with patch.object(helpers.admission, "install") as mock_install:
+                run_cli("prog", server)
             mock_run.assert_called_once_with(transport="http", host="localhost", port=8080)
+            mock_install.assert_called_once_with(server)
 
 
 def test_run_invalid_transport():
     with mock.patch(
         "jnpr_pathfinder_mcp.helpers.parse_args",
-        return_value=Namespace(transport="invalid", host="localhost", port=8080)
+        return_value=Namespace(
+            transport="invalid", host="localhost", port=8080, workers=1, cache_dir=None,
+            profile=None,
+            trace=None,
+        )
     ):
         with pytest.raises(ValueError, match="transport must be 'stdio' or 'http'"):
             run_cli("prog", server)
@@ -143,3 +168,112 @@ def test_run_http_transport_without_host_and_port(mock_run, mock_mount):
 
     # Assertions for mcp.run method
     mock_run.assert_called_once_with(transport="http")
+
+
+def test_workers_with_stdio_raises():
+    with mock.patch(
+        "jnpr_pathfinder_mcp.helpers.parse_args",
+        return_value=Namespace(
+            transport="stdio", host=None, port=None, workers=4, cache_dir=None, profile=None,
+            trace=None,
+        ),
+    ):
+        with pytest.raises(ValueError, match="workers cannot be used with stdio transport"):
+            run_cli("prog", server)
+
+
+def test_workers_must_be_positive():
+    with mock.patch(
+        "jnpr_pathfinder_mcp.helpers.parse_args",
+        return_value=Namespace(
+            transport="http", host=None, port=None, workers=0, cache_dir=None, profile=None,
+            trace=None,
+        ),
+    ):
+        with pytest.raises(ValueError, match="workers must be at least 1"):
+            run_cli("prog", server)
+
+
+def test_run_cli_with_workers(tmp_path, monkeypatch):
+    # restored when the test ends, run_cli() sets them directly.
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, "")
+    monkeypatch.setenv(helpers.SERVER_ENV, "")
+    with mock.patch("jnpr_pathfinder_mcp.helpers.uvicorn.run") as mock_uvicorn_run:
+        with mock.patch("jnpr_pathfinder_mcp.helpers.cache.warm") as mock_warm:
+            with mock.patch(
+                "jnpr_pathfinder_mcp.helpers.parse_args",
+                return_value=Namespace(
+                    transport="http",
+                    host="localhost",
+                    port=8080,
+                    workers=4,
+                    cache_dir=str(tmp_path),
+                    profile=None,
+                    trace=None,
+                ),
+            ):
+                with pytest.raises(ValueError, match="no import path"):
+                    run_cli("prog", server)
+                run_cli("prog", server, import_path="jnpr_pathfinder_mcp.server.pathfinder:mcp")
+                mock_warm.assert_called_once()
+                mock_uvicorn_run.assert_called_once()
+                _, kwargs = mock_uvicorn_run.call_args
+                assert kwargs["workers"] == 4
+                assert kwargs["factory"] is True
+                # in-flight tool calls get to finish when workers stop.
+                assert kwargs["timeout_graceful_shutdown"] == helpers.GRACEFUL_SHUTDOWN > 0
+                assert os.environ[helpers.SERVER_ENV] == (
+                    "jnpr_pathfinder_mcp.server.pathfinder:mcp"
+                )
+                assert os.environ[cache.CACHE_DIR_ENV] == str(tmp_path)
+
+
+def test_worker_app_is_stateless(monkeypatch):
+    monkeypatch.setenv(helpers.SERVER_ENV, "jnpr_pathfinder_mcp.server.pathfinder:mcp")
+    with patch.object(server, "http_app") as mock_http_app:
+        with patch.object(helpers.admission, "install") as mock_install:
+            helpers.worker_app()
+        mock_http_app.assert_called_once_with(stateless_http=True)
+        mock_install.assert_called_once_with(server)
+
+
+@pytest.mark.asyncio
+async def test_static_and_mounted_composition_expose_the_same_names():
+    listed = {}
+    for mode in ("static", "mount"):
+        async with Client(pathfinder.compose(FastMCP(mode), mode)) as client:
+            listed[mode] = (
+                sorted(tool.name for tool in await client.list_tools()),
+                sorted(str(resource.uri) for resource in await client.list_resources()),
+                sorted(t.uriTemplate for t in await client.list_resource_templates()),
+            )
+    assert listed["static"] == listed["mount"]
+    assert "juniper_hardware_compatibility_tool_categories" in listed["static"][0]
+    assert "pathfinder://juniper_cli_explorer/cli/reference" in listed["static"][1]
+
+
+@pytest.mark.asyncio
+async def test_static_composition_dispatches_to_sub_server_tools():
+    body = '{"results": []}'
+    response = types.SimpleNamespace(ok=True, text=body, content=body, json=lambda: {"results": []})
+    with patch("jnpr_pathfinder_mcp.upstream.requests.post", return_value=response) as post:
+        async with Client(pathfinder.compose(FastMCP("static"), "static")) as client:
+            result = await client.call_tool(
+                "juniper_cli_explorer_search", {"query": "static composition dispatch"}
+            )
+    assert result.structured_content["success"]
+    assert result.structured_content["response"] == {"results": []}
+    post.assert_called_once()
+
+
+def test_compose_rejects_unknown_mode():
+    with pytest.raises(ValueError, match="composition must be"):
+        pathfinder.compose(FastMCP("unknown"), "proxy")
+
+
+def test_compose_inside_running_event_loop():
+    async def compose():
+        return pathfinder.compose(FastMCP("in_loop"), "static")
+
+    server = asyncio.run(compose())
+    assert "juniper_feature_explorer_software_releases" in asyncio.run(server.get_tools())
@@ -47,7 +47,7 @@ async def test_software_releases_success():
 async def test_software_releases_requests_error_raises():
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -59,7 +59,7 @@ async def test_software_releases_requests_error_raises():
 async def test_software_releases_not_ok():
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(False, "Failed"),
         ):
@@ -73,7 +73,7 @@ async def test_software_releases_not_ok():
 async def test_software_releases_empty_response():
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(True, ""),
         ):
@@ -90,7 +90,7 @@ async def test_models_for_release_success_and_errors():
     async with Client(mcp) as client:
         payload = {"platforms": ["ACX710", "EX4300"]}
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, payload),
         ):
@@ -102,7 +102,7 @@ async def test_models_for_release_success_and_errors():
             assert result.structured_content.get("response") == payload
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -113,7 +113,7 @@ async def test_models_for_release_success_and_errors():
                 )
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed"),
         ):
@@ -124,7 +124,7 @@ async def test_models_for_release_success_and_errors():
             assert not result.structured_content.get("success")
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -142,7 +142,7 @@ async def test_models_for_release_success_and_errors():
             assert not result.structured_content.get("success")
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -165,7 +165,7 @@ async def test_releases_compatible_with_model_success_and_errors():
             assert result.structured_content.get("success")
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -178,7 +178,7 @@ async def test_releases_compatible_with_model_success_and_errors():
             return_value={"mx10008": {"product_key": 11320008}},
         ):
             with mock.patch.object(
-                jnpr_pathfinder_mcp.server.feature_explorer.requests,
+                jnpr_pathfinder_mcp.upstream.requests,
                 "get",
                 return_value=ResponseMock(False, "Failed"),
             ):
@@ -193,7 +193,7 @@ async def test_releases_compatible_with_model_success_and_errors():
             return_value={"mx10008": {"product_key": 11320008}},
         ):
             with mock.patch.object(
-                jnpr_pathfinder_mcp.server.feature_explorer.requests,
+                jnpr_pathfinder_mcp.upstream.requests,
                 "get",
                 return_value=ResponseMock(True, ""),
             ):
@@ -208,7 +208,7 @@ async def test_features_for_model_on_release_success_and_errors():
     async with Client(mcp) as client:
         payload = {"features": ["f1", "f2"]}
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(True, payload),
         ):
@@ -220,7 +220,7 @@ async def test_features_for_model_on_release_success_and_errors():
             assert result.structured_content.get("response") == payload
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -231,7 +231,7 @@ async def test_features_for_model_on_release_success_and_errors():
                 )
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(False, "Failed"),
         ):
@@ -242,7 +242,7 @@ async def test_features_for_model_on_release_success_and_errors():
             assert not result.structured_content.get("success")
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(True, ""),
         ):
@@ -259,7 +259,7 @@ async def test_feature_tree_and_details_and_product_keys():
         # feature_tree
         tree_payload = {"tree": []}
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, tree_payload),
         ):
@@ -268,7 +268,7 @@ async def test_feature_tree_and_details_and_product_keys():
             assert result.structured_content.get("response") == tree_payload
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, tree_payload),
         ):
@@ -278,7 +278,7 @@ async def test_feature_tree_and_details_and_product_keys():
         # feature_details
         details_payload = {"detail": {"k": "v"}}
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, details_payload),
         ):
@@ -287,7 +287,7 @@ async def test_feature_tree_and_details_and_product_keys():
             assert result.structured_content.get("response") == details_payload
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, details_payload),
         ):
@@ -295,7 +295,7 @@ async def test_feature_tree_and_details_and_product_keys():
             assert not result.structured_content.get("success")
 
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.feature_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=Exception("boom"),
         ):
@@ -349,3 +349,156 @@ def test__get_pid_for_model():
             jnpr_pathfinder_mcp.server.feature_explorer._get_pid_for_model("MX10008-FAKE-AFO")
             == 11320008
         )
+
+
+@pytest.mark.asyncio
+async def test_models_supporting_feature_from_fetched_features(monkeypatch):
+    monkeypatch.setattr(jnpr_pathfinder_mcp.server.feature_explorer, "_matrices", {})
+    features = {
+        "mx204": {"features": [{"featureKey": "BGP"}, {"featureKey": "EVPN"}]},
+        "mx304": {"features": [{"featureKey": "BGP"}]},
+    }
+
+    def post(url, json=None, **kwargs):
+        return ResponseMock(True, features[json["platform"]])
+
+    async with Client(mcp) as client:
+        with mock.patch.object(jnpr_pathfinder_mcp.upstream.requests, "post", side_effect=post):
+            for model in features:
+                await client.call_tool(
+                    "features_for_model_on_junos_version",
+                    {"model": model, "junos_version": "24.4R1"},
+                )
+        with mock.patch.object(jnpr_pathfinder_mcp.upstream.requests, "post") as mock_post:
+            result = await client.call_tool(
+                "models_supporting_feature", {"feature_key": "EVPN", "junos_version": "24.4R1"}
+            )
+            mock_post.assert_not_called()
+        response = result.structured_content["response"]
+        assert response["supported"] == ["mx204"]
+        assert response["not_supported"] == ["mx304"]
+
+        result = await client.call_tool(
+            "feature_support_history", {"feature_key": "EVPN", "model": "MX204"}
+        )
+        assert result.structured_content["response"]["changes"] == [
+            {"release": "24.4R1", "supported": True}
+        ]
+        result = await client.call_tool(
+            "feature_support_history", {"feature_key": "EVPN", "model": "ACX710"}
+        )
+        assert not result.structured_content["success"]
+
+
+@pytest.mark.asyncio
+async def test_compare_models(monkeypatch):
+    monkeypatch.setattr(jnpr_pathfinder_mcp.server.feature_explorer, "_matrices", {})
+    features = {
+        "MX204": {"features": [{"featureKey": "BGP"}, {"featureKey": "EVPN"}]},
+        "MX304": {"features": [{"featureKey": "BGP"}, {"featureKey": "MACSEC"}]},
+        "ACX710": {"features": [{"featureKey": "BGP"}, {"featureKey": "EVPN"}]},
+    }
+
+    def post(url, json=None, **kwargs):
+        return ResponseMock(True, features.get(json["platform"], ""))
+
+    arguments = {"models": ["MX204", "MX304", "ACX710", "MX204"], "junos_version": "24.4R1"}
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests, "post", side_effect=post
+        ) as mock_post:
+            result = await client.call_tool("compare_models", arguments)
+            assert mock_post.call_count == 3
+            # the second time, the features come from the support matrix.
+            again = await client.call_tool("compare_models", {**arguments, "max_differences": 1})
+            assert mock_post.call_count == 3
+            missing = await client.call_tool(
+                "compare_models", {"models": ["MX204", "QFX1"], "junos_version": "24.4R1"}
+            )
+        with pytest.raises(ToolError, match="At least two models"):
+            await client.call_tool("compare_models", {"models": ["MX204"], "junos_version": "1"})
+
+    response = result.structured_content["response"]
+    assert response["models"] == ["MX204", "MX304", "ACX710"]
+    assert response["features"] == {"MX204": 2, "MX304": 2, "ACX710": 2}
+    assert response["shared"] == 1
+    assert response["unique"] == {"MX204": 0, "MX304": 1, "ACX710": 0}
+    assert response["differing"] == 2
+    assert response["differences"] == {"EVPN": ["MX204", "ACX710"], "MACSEC": ["MX304"]}
+    assert not response["truncated"]
+    assert again.structured_content["response"]["differences"] == {"EVPN": ["MX204", "ACX710"]}
+    assert again.structured_content["response"]["truncated"]
+    assert not missing.structured_content["success"]
+    assert "QFX1" in missing.structured_content["error"]
+
+
+@pytest.mark.asyncio
+async def test_models_across_releases_crawls_once(monkeypatch):
+    monkeypatch.setattr(jnpr_pathfinder_mcp.server.feature_explorer, "_compatibility", {})
+    models = {
+        "23.4R1": [{"platform": "MX204"}, {"platform": "ACX710"}],
+        "24.2R1": [{"platform": "MX204"}, {"platform": "MX304"}],
+        "24.4R1": [{"platform": "MX304"}],
+    }
+
+    def get(url, **kwargs):
+        return ResponseMock(True, models[url.rsplit("version=", 1)[-1]])
+
+    releases = ResponseMock(True, {"releases": ["24.4R1", "24.2R1", "23.4R1", "22.4R1"]})
+    async with Client(mcp) as client:
+        with (
+            mock.patch.object(
+                jnpr_pathfinder_mcp.upstream.requests, "get", side_effect=get
+            ) as mock_get,
+            mock.patch.object(jnpr_pathfinder_mcp.upstream.requests, "post", return_value=releases),
+        ):
+            result = await client.call_tool(
+                "models_across_releases", {"start_release": "23.4R1", "end_release": "24.2R1"}
+            )
+            response = result.structured_content["response"]
+            assert response["releases"] == ["23.4R1", "24.2R1"]
+            assert response["models"] == ["mx204"]
+            assert mock_get.call_count == 2
+
+            result = await client.call_tool(
+                "models_across_releases",
+                {"start_release": "23.4R1", "end_release": "24.4R1", "require_all": False},
+            )
+            assert result.structured_content["response"]["models"] == ["acx710", "mx204", "mx304"]
+            # only the release not seen before was fetched
+            assert mock_get.call_count == 3
+
+        result = await client.call_tool("known_compatibility", {"junos_version": "24.4R1"})
+        assert result.structured_content["response"]["models"] == ["mx304"]
+        result = await client.call_tool("known_compatibility", {"model": "MX304"})
+        assert result.structured_content["response"]["releases"] == ["24.2R1", "24.4R1"]
+        result = await client.call_tool(
+            "known_compatibility", {"model": "ACX710", "junos_version": "24.2R1"}
+        )
+        assert result.structured_content["response"]["compatible"] is False
+        result = await client.call_tool("known_compatibility", {"model": "EX4000"})
+        assert not result.structured_content["success"]
+
+
+@pytest.mark.asyncio
+async def test_models_across_releases_reports_failed_releases(monkeypatch):
+    monkeypatch.setattr(jnpr_pathfinder_mcp.server.feature_explorer, "_compatibility", {})
+
+    def get(url, **kwargs):
+        if url.endswith("version=24.2R1"):
+            raise requests.ConnectionError("connection reset")
+        return ResponseMock(True, [{"platform": "MX204"}])
+
+    releases = ResponseMock(True, {"releases": ["24.2R1", "23.4R1"]})
+    async with Client(mcp) as client:
+        with (
+            mock.patch.object(jnpr_pathfinder_mcp.upstream.requests, "get", side_effect=get),
+            mock.patch.object(jnpr_pathfinder_mcp.upstream.requests, "post", return_value=releases),
+        ):
+            result = await client.call_tool(
+                "models_across_releases", {"start_release": "23.4R1", "end_release": "24.2R1"}
+            )
+    response = result.structured_content["response"]
+    assert response["unavailable_releases"] == ["24.2R1"]
+    assert response["releases"] == ["23.4R1"]
+    assert response["models"] == ["mx204"]
@@ -1,4 +1,6 @@
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 import pytest
@@ -7,13 +9,15 @@ from fastmcp import Client
 from fastmcp.exceptions import ToolError
 
 import jnpr_pathfinder_mcp
+from jnpr_pathfinder_mcp.server import hct
 from jnpr_pathfinder_mcp.server.hct import mcp
 
 
 class ResponseMock:
-    def __init__(self, ok=True, content=""):
+    def __init__(self, ok=True, content="", status_code=None):
         self.content = self.text = content
         self.ok = ok
+        self.status_code = status_code
 
     def ok(self):
         return self.ok
@@ -22,6 +26,15 @@ class ResponseMock:
         return json.loads(self.content)
 
 
+@pytest.fixture(autouse=True)
+def reset_hct_caches():
+    """Don't let platform hierarchies or negatively cached names leak between tests."""
+    yield
+    hct._platform_hierarchy.cache_clear()
+    hct._platform_components.clear()
+    hct._negative.clear()
+
+
 @pytest.mark.asyncio
 async def test_categories():
     """Test content and structure of workspace info command."""
@@ -36,7 +49,7 @@ async def test_categories_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -49,7 +62,7 @@ async def test_categories_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -64,7 +77,7 @@ async def test_categories_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -88,7 +101,7 @@ async def test_category_components_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -101,7 +114,7 @@ async def test_category_components_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -116,7 +129,7 @@ async def test_category_components_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -140,7 +153,7 @@ async def test_component_details_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -153,7 +166,7 @@ async def test_component_details_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -170,7 +183,7 @@ async def test_component_details_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -198,7 +211,7 @@ async def test_component_supported_platforms_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -213,7 +226,7 @@ async def test_component_supported_platforms_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -230,7 +243,7 @@ async def test_component_supported_platforms_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -258,7 +271,7 @@ async def test_component_supported_models_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -273,7 +286,7 @@ async def test_component_supported_models_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -290,7 +303,7 @@ async def test_component_supported_models_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -316,7 +329,7 @@ async def test_platforms_by_family_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -329,7 +342,7 @@ async def test_platforms_by_family_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -344,7 +357,7 @@ async def test_platforms_by_family_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -368,7 +381,7 @@ async def test_components_for_platform_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -381,7 +394,7 @@ async def test_components_for_platform_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -396,7 +409,7 @@ async def test_components_for_platform_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -420,7 +433,7 @@ async def test_platform_hardware_details_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -433,7 +446,7 @@ async def test_platform_hardware_details_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -448,7 +461,7 @@ async def test_platform_hardware_details_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "post",
             return_value=ResponseMock(True, ""),
         ):
@@ -463,7 +476,7 @@ async def test_platform_information():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, '{"platform": "ACX710"}'),
         ):
@@ -477,7 +490,7 @@ async def test_platform_information_requests_error_raises():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             side_effect=requests.exceptions.RequestException,
         ):
@@ -490,7 +503,7 @@ async def test_platform_information_request_not_ok():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(False, "Failed."),
         ):
@@ -505,7 +518,7 @@ async def test_platform_information_request_empty_response():
     """Test content and structure of workspace info command."""
     async with Client(mcp) as client:
         with mock.patch.object(
-            jnpr_pathfinder_mcp.server.cli_explorer.requests,
+            jnpr_pathfinder_mcp.upstream.requests,
             "get",
             return_value=ResponseMock(True, ""),
         ):
@@ -513,3 +526,327 @@ async def test_platform_information_request_empty_response():
             assert not result.structured_content.get("success")
             assert result.structured_content.get("error")
             assert "Empty response from API" in result.structured_content.get("error")
+
+
+PLATFORM_COMPONENTS = {
+    "MX204": [
+        {"modelName": "QSFP-100G-LR4", "categoryName": "Optics"},
+        {"modelName": "SFP-10G-LR", "categoryName": "Optics"},
+        {"modelName": "JNP-PWR-AC", "categoryName": "Power"},
+    ],
+    "MX304": [
+        {"modelName": "QSFP-100G-LR4", "categoryName": "Optics"},
+        {"modelName": "JNP-PWR-AC", "categoryName": "Power"},
+    ],
+    "PTX10001": {
+        "Optics": [{"modelName": "QSFP-100G-LR4"}, {"modelName": "QSFP-400G-DR4"}],
+        "Power": [{"modelName": "JNP-PWR-AC"}],
+    },
+}
+
+
+PLATFORMS_BY_FAMILY = [
+    {
+        "familyName": "Routing",
+        "series": [
+            {"seriesName": "MX Series", "platforms": [{"platformName": "MX204"}, "MX304"]},
+            {"seriesName": "PTX Series", "platforms": ["PTX10001"]},
+        ],
+    },
+    {"familyName": "Switching", "series": {"EX Series": ["EX4000", "EX4100"]}},
+]
+
+
+def _platform_components_get(url, **kwargs):
+    if url == hct.URLS["platforms_grouped_by_family"]:
+        return ResponseMock(True, json.dumps(PLATFORMS_BY_FAMILY))
+    platform = url.rsplit("/", 1)[-1]
+    if platform not in PLATFORM_COMPONENTS:
+        return ResponseMock(True, "")
+    return ResponseMock(True, json.dumps(PLATFORM_COMPONENTS[platform]))
+
+
+@pytest.fixture
+def platform_components():
+    with mock.patch.object(
+        jnpr_pathfinder_mcp.upstream.requests, "get", side_effect=_platform_components_get
+    ) as mock_get:
+        yield mock_get
+
+
+@pytest.mark.asyncio
+async def test_common_components(platform_components):
+    async with Client(mcp) as client:
+        result = await client.call_tool(
+            "common_components", {"platforms": ["MX204", "MX304", "PTX10001"]}
+        )
+        assert result.structured_content.get("success")
+        response = result.structured_content.get("response")
+        assert response["components"] == ["JNP-PWR-AC", "QSFP-100G-LR4"]
+        assert response["count"] == 2
+        # the platform hierarchy, then each platform
+        assert platform_components.call_count == 4
+
+        # the component sets are held, so a second question doesn't fetch them again
+        result = await client.call_tool(
+            "common_components",
+            {"platforms": ["MX204", "PTX10001"], "category": "optics"},
+        )
+        assert result.structured_content["response"]["components"] == ["QSFP-100G-LR4"]
+        assert platform_components.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_common_components_union_and_difference(platform_components):
+    async with Client(mcp) as client:
+        result = await client.call_tool(
+            "common_components",
+            {"platforms": ["MX304", "PTX10001"], "category": "Optics", "operation": "union"},
+        )
+        assert result.structured_content["response"]["components"] == [
+            "QSFP-100G-LR4",
+            "QSFP-400G-DR4",
+        ]
+        result = await client.call_tool(
+            "common_components",
+            {"platforms": ["MX204", "MX304"], "operation": "difference"},
+        )
+        assert result.structured_content["response"]["components"] == ["SFP-10G-LR"]
+
+
+@pytest.mark.asyncio
+async def test_common_components_unknown_platform(platform_components):
+    async with Client(mcp) as client:
+        result = await client.call_tool("common_components", {"platforms": ["MX204", "MX999"]})
+        assert not result.structured_content.get("success")
+        assert "Unknown platform MX999" in result.structured_content.get("error")
+        # known to the hierarchy, but without components
+        result = await client.call_tool("common_components", {"platforms": ["MX204", "EX4100"]})
+        assert not result.structured_content.get("success")
+        assert "No components found for EX4100" in result.structured_content.get("error")
+        result = await client.call_tool("common_components", {"platforms": []})
+        assert not result.structured_content.get("success")
+        assert "At least one platform" in result.structured_content.get("error")
+
+
+@pytest.mark.asyncio
+async def test_common_components_remembers_missing_platforms(platform_components, monkeypatch):
+    # known to the hierarchy, but the upstream says there's no such platform.
+    def get(url, **kwargs):
+        if url.endswith("/EX4000"):
+            return ResponseMock(False, "Not found", status_code=404)
+        return _platform_components_get(url)
+
+    platform_components.side_effect = get
+    async with Client(mcp) as client:
+        for _ in range(2):
+            result = await client.call_tool("common_components", {"platforms": ["MX204", "EX4000"]})
+            assert "No components found for EX4000" in result.structured_content.get("error")
+        result = await client.call_tool("components_for_platform", {"platform": "EX4000"})
+        assert "No platform named EX4000" in result.structured_content.get("error")
+    fetched = [call.args[0] for call in platform_components.call_args_list]
+    assert sum(url.endswith("/EX4000") for url in fetched) == 1
+
+
+CATEGORIES = [{"categoryKey": 1, "categoryName": "Optics"}, {"categoryKey": 2, "name": "Power"}]
+CATEGORY_COMPONENTS = {
+    "1": [
+        {"modelName": "QSFP-100G-LR4", "description": "100GbE QSFP28 LR4 optics"},
+        {"modelName": "QSFP-400G-DR4", "description": "400GbE QSFP-DD DR4 optics"},
+    ],
+    "2": [{"modelName": "JNP-PWR-AC", "description": "AC power supply"}],
+}
+
+
+def _catalog_get(url, **kwargs):
+    if url == jnpr_pathfinder_mcp.server.hct.URLS["categories"]:
+        return ResponseMock(True, json.dumps(CATEGORIES))
+    return ResponseMock(True, json.dumps(CATEGORY_COMPONENTS[url.rsplit("/", 1)[-1]]))
+
+
+@pytest.fixture
+def component_catalog():
+    jnpr_pathfinder_mcp.server.hct._component_index.cache_clear()
+    with mock.patch.object(
+        jnpr_pathfinder_mcp.upstream.requests, "get", side_effect=_catalog_get
+    ) as mock_get:
+        yield mock_get
+    jnpr_pathfinder_mcp.server.hct._component_index.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_search_components(component_catalog):
+    async with Client(mcp) as client:
+        result = await client.call_tool("search_components", {"query": "qsfp 400g dr4"})
+        assert result.structured_content.get("success")
+        best = result.structured_content["response"][0]
+        assert best["name"] == "QSFP-400G-DR4"
+        assert best["match"] == "exact"
+        assert best["category"] == "Optics"
+        assert component_catalog.call_count == 3
+
+        # typo, answered from the index without fetching again
+        result = await client.call_tool("search_components", {"query": "JNP-PWR-DC", "limit": 1})
+        assert [r["name"] for r in result.structured_content["response"]] == ["JNP-PWR-AC"]
+        assert result.structured_content["response"][0]["category"] == "Power"
+        assert component_catalog.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_search_components_retries_a_partial_catalog(
+    component_catalog, tmp_path, monkeypatch
+):
+    # restored when the test ends, cache.configure() sets it directly.
+    monkeypatch.setenv(jnpr_pathfinder_mcp.cache.CACHE_DIR_ENV, "")
+    jnpr_pathfinder_mcp.cache.configure(str(tmp_path))
+
+    def power_fails(url, **kwargs):
+        if url.endswith("/2"):
+            return ResponseMock(False, "Failed.")
+        return _catalog_get(url)
+
+    component_catalog.side_effect = power_fails
+    async with Client(mcp) as client:
+        with pytest.raises(ToolError):
+            await client.call_tool("search_components", {"query": "JNP-PWR-AC"})
+        assert jnpr_pathfinder_mcp.cache.load_snapshot("hct_component_catalog") is None
+
+        component_catalog.side_effect = _catalog_get
+        result = await client.call_tool("search_components", {"query": "JNP-PWR-AC"})
+        assert result.structured_content["response"][0]["name"] == "JNP-PWR-AC"
+    assert len(jnpr_pathfinder_mcp.cache.load_snapshot("hct_component_catalog")) == 3
+
+
+def test_component_index_is_built_once_and_expires(component_catalog, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(1)
+        started.set()
+        release.wait(5)
+        return [{"name": f"SFP-{len(builds)}", "category": "Optics", "category_key": "o"}]
+
+    monkeypatch.setattr(hct, "_build_component_catalog", build)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = [executor.submit(hct._component_index) for _ in range(4)]
+        started.wait(5)
+        release.set()
+        indexes = {id(future.result()) for future in first}
+    assert len(builds) == 1 and len(indexes) == 1
+    old = first[0].result()
+
+    # once it's expired, one caller rebuilds while the others get the old index.
+    started.clear()
+    release.clear()
+    later = hct.time.monotonic() + hct.COMPONENT_CATALOG_TTL
+    monkeypatch.setattr(hct.time, "monotonic", lambda: later)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        rebuilding = executor.submit(hct._component_index)
+        started.wait(5)
+        assert hct._component_index() is old
+        release.set()
+        assert rebuilding.result().search("SFP-2")[0]["name"] == "SFP-2"
+    assert len(builds) == 2
+    assert hct._component_index() is rebuilding.result()
+
+
+def test_platform_hierarchy_shapes():
+    hierarchy = hct.PlatformHierarchy.build(PLATFORMS_BY_FAMILY)
+    assert hierarchy.families == {
+        "Routing": {"MX Series": ["MX204", "MX304"], "PTX Series": ["PTX10001"]},
+        "Switching": {"EX Series": ["EX4000", "EX4100"]},
+    }
+    assert hierarchy.lookup("ptx-10001") == "PTX10001"
+    assert hierarchy.lookup("MX999") is None
+    assert hierarchy.suggest("MX2044")[0] == "MX204"
+
+
+@pytest.mark.asyncio
+async def test_platform_names_validated_locally(platform_components):
+    async with Client(mcp) as client:
+        result = await client.call_tool("components_for_platform", {"platform": "mx-204"})
+        assert result.structured_content.get("success")
+        assert platform_components.call_args[0][0].endswith("/modelsForProduct/MX204")
+        calls = platform_components.call_count
+
+        for _ in range(2):
+            result = await client.call_tool("platform_information", {"platform": "MX2044"})
+            assert not result.structured_content.get("success")
+            assert "Did you mean MX204" in result.structured_content.get("error")
+        assert platform_components.call_count == calls
+
+
+@pytest.mark.asyncio
+async def test_unknown_component_names_negatively_cached():
+    async with Client(mcp) as client:
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests, "get", return_value=ResponseMock(True, "")
+        ) as mock_get:
+            for _ in range(3):
+                result = await client.call_tool("component_details", {"component_name": "NOPE"})
+                assert not result.structured_content.get("success")
+            assert mock_get.call_count == 1
+            assert "No component named NOPE" in result.structured_content.get("error")
+
+            # misses are per endpoint, and an empty list of models isn't one
+            for _ in range(2):
+                await client.call_tool("component_supported_models", {"component_name": "nope"})
+            assert mock_get.call_count == 3
+
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests,
+            "get",
+            return_value=ResponseMock(False, "Not found.", status_code=404),
+        ) as mock_get:
+            for _ in range(2):
+                result = await client.call_tool(
+                    "component_supported_platforms", {"component_name": "GONE"}
+                )
+            assert "No component named GONE" in result.structured_content.get("error")
+            assert mock_get.call_count == 1
+
+        # an upstream failure says nothing about the name
+        with mock.patch.object(
+            jnpr_pathfinder_mcp.upstream.requests,
+            "get",
+            return_value=ResponseMock(False, "Failed."),
+        ) as mock_get:
+            await client.call_tool("component_details", {"component_name": "OTHER"})
+            await client.call_tool("component_details", {"component_name": "OTHER"})
+            assert mock_get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_platform_hierarchy_is_refetched(platform_components, monkeypatch):
+    async with Client(mcp) as client:
+        result = await client.call_tool("components_for_platform", {"platform": "MX10004"})
+        assert "Unknown platform MX10004" in result.structured_content.get("error")
+
+        monkeypatch.setitem(PLATFORM_COMPONENTS, "MX10004", PLATFORM_COMPONENTS["MX304"])
+        routing = json.loads(json.dumps(PLATFORMS_BY_FAMILY))
+        routing[0]["series"][0]["platforms"].append("MX10004")
+        monkeypatch.setattr(
+            jnpr_pathfinder_mcp.upstream.requests,
+            "get",
+            lambda url, **kwargs: (
+                ResponseMock(True, json.dumps(routing))
+                if url == hct.URLS["platforms_grouped_by_family"]
+                else _platform_components_get(url)
+            ),
+        )
+        later = hct.time.monotonic() + max(hct.PLATFORM_HIERARCHY_TTL, hct.NEGATIVE_TTL)
+        monkeypatch.setattr(hct.time, "monotonic", lambda: later)
+        result = await client.call_tool("components_for_platform", {"platform": "MX10004"})
+        assert result.structured_content.get("success")
+
+
+def test_negative_cache_expires():
+    negative = hct.NegativeCache(ttl=0)
+    negative.add("platform", "MX999")
+    assert negative.get("platform", "MX999") is None
+    negative = hct.NegativeCache(ttl=60)
+    negative.add("platform", "MX999")
+    assert negative.get("platform", "mx-999") == "No platform named MX999 was found."
+    assert negative.get("component", "MX999") is None
@@ -0,0 +1,137 @@
+import random
+
+from jnpr_pathfinder_mcp import matrix
+
+
+def test_release_key_orders_releases():
+    releases = ["24.10R1", "23.4R2-S1", "24.2R1", "23.4R2", "23.4R1"]
+    assert sorted(releases, key=matrix.release_key) == [
+        "23.4R1",
+        "23.4R2",
+        "23.4R2-S1",
+        "24.2R1",
+        "24.10R1",
+    ]
+
+
+def test_models_supporting_feature():
+    support = matrix.FeatureMatrix()
+    support.record("mx204", "24.2R1", ["BGP", "EVPN"])
+    support.record("mx304", "24.2R1", ["BGP"])
+    support.record("ptx10001", "23.4R1", ["BGP", "EVPN"])
+    assert support.models_supporting("EVPN", "24.2R1") == {
+        "supported": ["mx204"],
+        "not_supported": ["mx304"],
+        "no_data": ["ptx10001"],
+    }
+    assert support.models_supporting("UNKNOWN", "24.2R1")["not_supported"] == ["mx204", "mx304"]
+    assert support.features_of("mx204", "24.2R1") == {"BGP", "EVPN"}
+    assert support.features_of("mx204", "23.4R1") is None
+    assert support.features_of("acx710", "24.2R1") is None
+
+
+def test_delta_encoding_survives_out_of_order_records():
+    rng = random.Random(4)
+    features = [f"F{i}" for i in range(2000)]
+    releases = [f"{major}.{minor}R1" for major in (22, 23, 24) for minor in (1, 2, 3, 4)]
+    expected = {}
+    supported = set(features[:1000])
+    for release in releases:
+        supported ^= set(rng.sample(features, 5))
+        expected[release] = set(supported)
+
+    support = matrix.FeatureMatrix()
+    shuffled = list(releases)
+    rng.shuffle(shuffled)
+    for release in shuffled:
+        support.record("mx204", release, expected[release])
+    # re-recording a release replaces it
+    support.record("mx204", releases[3], expected[releases[3]])
+
+    history = support.models["mx204"]
+    assert history.releases == releases
+    for release in releases:
+        bits = history.bitset(release)
+        supported = {f for f, bit in support._feature_bits.items() if bits >> bit & 1}
+        assert supported == expected[release]
+
+    stats = support.stats()
+    assert stats["stored_bytes"] < stats["dense_bytes"] / 2
+
+    restored = matrix.FeatureMatrix.from_snapshot(support.to_snapshot())
+    assert restored.models_supporting("F7", "24.2R1") == support.models_supporting("F7", "24.2R1")
+
+
+def test_queries_dont_replay_deltas(monkeypatch):
+    support = matrix.FeatureMatrix()
+    for minor in (1, 2, 3, 4):
+        support.record("mx204", f"24.{minor}R1", [f"F{n}" for n in range(minor * 10)])
+    restored = matrix.FeatureMatrix.from_snapshot(support.to_snapshot())
+    assert restored.stats()["decoded_bytes"] == support.stats()["decoded_bytes"]
+
+    def replay(delta):
+        raise AssertionError("deltas replayed for a query")
+
+    monkeypatch.setattr(matrix, "_decode", replay)
+    for queried in (support, restored):
+        assert queried.features_of("mx204", "24.3R1") == {f"F{n}" for n in range(30)}
+        assert queried.models_supporting("F35", "24.4R1")["supported"] == ["mx204"]
+        assert queried.history("F15", "mx204")[1] == {"release": "24.2R1", "supported": True}
+
+
+def test_history():
+    support = matrix.FeatureMatrix()
+    support.record("mx204", "23.2R1", ["BGP"])
+    support.record("mx204", "23.4R1", ["BGP", "EVPN"])
+    support.record("mx204", "24.2R1", ["BGP", "EVPN"])
+    support.record("mx204", "24.4R1", ["BGP"])
+    assert support.history("EVPN", "mx204") == [
+        {"release": "23.2R1", "supported": False},
+        {"release": "23.4R1", "supported": True},
+        {"release": "24.4R1", "supported": False},
+    ]
+    assert support.history("EVPN", "mx304") is None
+
+
+def test_compatibility_both_directions_and_ranges():
+    compatibility = matrix.CompatibilityMatrix()
+    compatibility.add_release("24.2R1", ["mx204", "mx304", "acx710"])
+    compatibility.add_release("23.4R1", ["mx204", "acx710"])
+    compatibility.add_model("ptx10001", ["24.2R1", "25.1R1"])
+    # a release between known ones shifts the bitsets
+    compatibility.add_release("23.4R2", ["mx204", "mx304"])
+
+    assert compatibility.releases == ["23.4R1", "23.4R2", "24.2R1", "25.1R1"]
+    assert compatibility.models_for("24.2R1") == ["acx710", "mx204", "mx304", "ptx10001"]
+    assert compatibility.releases_for("mx304") == ["23.4R2", "24.2R1"]
+    assert compatibility.releases_for("acx710") == ["23.4R1", "24.2R1"]
+    assert compatibility.models_for("22.1R1") is None
+
+    assert compatibility.models_across("23.4R1", "24.2R1") == ["mx204"]
+    assert compatibility.models_across("23.4R2", "24.2R1") == ["mx204", "mx304"]
+    assert compatibility.models_across("24.2R1", "25.1R1") == ["ptx10001"]
+    assert compatibility.models_across("25.1R1", "25.1R1", every=False) == ["ptx10001"]
+    assert compatibility.models_across("26.1R1", "26.4R1") == []
+    assert compatibility.releases_between("23.4R2", "24.2R1") == ["23.4R2", "24.2R1"]
+    assert compatibility.complete == {"23.4R1", "23.4R2", "24.2R1"}
+
+    restored = matrix.CompatibilityMatrix.from_snapshot(compatibility.to_snapshot())
+    assert restored.models_for("24.2R1") == compatibility.models_for("24.2R1")
+    assert restored.models_across("23.4R1", "24.2R1") == ["mx204"]
+
+
+def test_compatibility_matches_release_spellings():
+    compatibility = matrix.CompatibilityMatrix()
+    compatibility.add_release("24.2R1", ["mx204"])
+    compatibility.add_model("mx304", ["24.2r1", "23.4r2"])
+    compatibility.add_release("23.4R2", ["acx710"])
+
+    assert compatibility.releases == ["23.4r2", "24.2R1"]
+    assert compatibility.models_for("24.2r1") == ["mx204", "mx304"]
+    assert compatibility.models_for("23.4R2") == ["acx710", "mx304"]
+    assert compatibility.is_complete("24.2r1") and compatibility.is_complete("23.4R2")
+    assert compatibility.complete == {"23.4r2", "24.2R1"}
+
+    restored = matrix.CompatibilityMatrix.from_snapshot(compatibility.to_snapshot())
+    assert restored.models_for("23.4r2") == ["acx710", "mx304"]
+    assert restored.is_complete("23.4R2")
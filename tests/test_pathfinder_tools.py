@@ -0,0 +1,126 @@
+import json
+import threading
+from unittest import mock
+
+import pytest
+from fastmcp import Client
+from fastmcp.exceptions import ToolError
+
+from jnpr_pathfinder_mcp import profiling, upstream
+from jnpr_pathfinder_mcp.server import feature_explorer, hct
+from jnpr_pathfinder_mcp.server.pathfinder import mcp
+
+
+class ResponseMock:
+    def __init__(self, ok=True, content=""):
+        self.content = json.dumps(content).encode("utf-8")
+        self.ok = ok
+        self.status_code = 200 if ok else 404
+        self.headers = {}
+        self.encoding = "utf-8"
+
+
+COMPONENTS = {"Optics": [{"modelName": "QSFP-100G-LR4", "categoryName": "Optics"}]}
+RELEASES = [{"release": "24.4R1"}, {"release": "25.1R2"}]
+FEATURES = {"features": [{"featureKey": "F1", "name": "BGP"}, {"featureKey": "F2", "name": "EVPN"}]}
+
+
+@pytest.fixture
+def upstream_mock():
+    """Answer the three checks, recording the threads they ran on."""
+    threads = set()
+    barrier = threading.Barrier(3, timeout=5)
+
+    def answer(url, **kwargs):
+        threads.add(threading.get_ident())
+        # all three requests are in flight at once, or this times out.
+        barrier.wait()
+        if "modelsForProduct" in url:
+            return ResponseMock(True, COMPONENTS)
+        if "getReleasesToCompare" in url:
+            return ResponseMock(True, RELEASES)
+        return ResponseMock(True, FEATURES)
+
+    hct._platform_components.clear()
+    with mock.patch.object(upstream.requests, "get", side_effect=answer):
+        with mock.patch.object(upstream.requests, "post", side_effect=answer):
+            with mock.patch.object(hct, "_check_platform", return_value=("MX204", None)):
+                with mock.patch.object(feature_explorer, "_get_pid_for_model", return_value=1):
+                    yield threads
+    hct._platform_components.clear()
+
+
+async def report(**arguments):
+    async with Client(mcp) as client:
+        result = await client.call_tool("compatibility_report", arguments)
+    return result.structured_content["response"]
+
+
+@pytest.mark.asyncio
+async def test_compatibility_report_yes(upstream_mock):
+    response = await report(
+        platform="MX204", optic="qsfp-100g-lr4", feature="bgp", junos_version="25.1R2"
+    )
+    assert response["verdict"] == "yes"
+    checks = response["checks"]
+    assert checks["optic"]["component"] == "QSFP-100G-LR4"
+    assert checks["optic"]["categories"] == ["optics"]
+    assert checks["release"] == {
+        "ok": True,
+        "release": "25.1R2",
+        "releases_listed": 2,
+        "newest": "25.1R2",
+    }
+    assert checks["feature"]["matches"] == [{"featureKey": "F1", "name": "BGP"}]
+    assert checks["feature"]["features_listed"] == 2
+    assert len(upstream_mock) == 3
+
+
+@pytest.mark.asyncio
+async def test_compatibility_report_no(upstream_mock):
+    response = await report(
+        platform="MX204", optic="SFP-10G-SR", feature="F2", junos_version="25.1R2"
+    )
+    assert response["verdict"] == "no"
+    assert response["checks"]["optic"]["ok"] is False
+    assert response["checks"]["feature"]["ok"] is True
+
+
+@pytest.mark.asyncio
+async def test_compatibility_report_unknown():
+    with mock.patch.object(hct, "_check_platform", return_value=("MX9", "Unknown platform MX9.")):
+        with mock.patch.object(
+            feature_explorer, "_get_pid_for_model", side_effect=ValueError("no model")
+        ):
+            with mock.patch.object(
+                upstream.requests, "post", return_value=ResponseMock(True, FEATURES)
+            ):
+                response = await report(
+                    platform="MX9", optic="SFP-10G-SR", feature="F1", junos_version="25.1R2"
+                )
+    assert response["verdict"] == "unknown"
+    assert response["checks"]["optic"] == {"ok": None, "error": "Unknown platform MX9."}
+    assert response["checks"]["release"]["ok"] is None
+    assert response["checks"]["feature"]["ok"] is True
+
+
+@pytest.mark.asyncio
+async def test_profile_tools_toggle(tmp_path):
+    async with Client(mcp) as client:
+        result = await client.call_tool("profile_tools", {"enabled": True})
+        assert result.structured_content["success"] is False
+        assert profiling.PROFILE_DIR_ENV in result.structured_content["error"]
+        # the directory is the server's to choose, not the client's
+        with pytest.raises(ToolError):
+            await client.call_tool("profile_tools", {"enabled": True, "directory": "/etc"})
+
+        profiling.configure(enabled=False, directory=str(tmp_path))
+        result = await client.call_tool("profile_tools", {"enabled": True, "tools": ["search"]})
+        status = result.structured_content["response"]
+        assert status["enabled"] is True
+        assert status["tools"] == ["search"]
+        result = await client.call_tool("profile_tools", {"enabled": False})
+        status = result.structured_content["response"]
+    assert status["enabled"] is False
+    assert status["directory"] == str(tmp_path)
+    profiling.configure()
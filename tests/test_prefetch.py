@@ -0,0 +1,211 @@
+import json
+import threading
+from unittest import mock
+
+import pytest
+from fastmcp import Client
+
+from jnpr_pathfinder_mcp import prefetch, upstream
+from jnpr_pathfinder_mcp.server import feature_explorer, hct
+
+
+class ResponseMock:
+    def __init__(self, ok=True, content="", status_code=200):
+        self.content = content.encode("utf-8") if isinstance(content, str) else content
+        self.ok = ok
+        self.status_code = status_code
+        self.headers = {}
+        self.encoding = "utf-8"
+
+
+def answer(url, **kwargs):
+    return ResponseMock(True, json.dumps({"url": url, "json": kwargs.get("json")}))
+
+
+@pytest.fixture(autouse=True)
+def reset_prefetch():
+    prefetch.configure(enabled=True)
+    hct._negative.clear()
+    feature_explorer._recent_models.clear()
+    yield
+    prefetch.configure()
+
+
+def test_prefetching_is_off_by_default():
+    prefetch.configure()
+    with mock.patch.object(upstream.requests, "get", side_effect=answer) as get:
+        prefetch.ahead("get", "thing", "https://example.com/thing")
+        prefetch.get("thing", "https://example.com/thing")
+    assert get.call_count == 1
+    assert prefetch.fanout() == 0
+    assert prefetch.stats()["started"] == 0
+
+
+def test_prefetched_response_is_handed_over_once():
+    with mock.patch.object(upstream.requests, "get", side_effect=answer) as get:
+        prefetch.ahead("get", "thing", "https://example.com/thing")
+        prefetch.ahead("get", "thing", "https://example.com/thing")
+        prefetch.drain()
+        assert get.call_count == 1
+        assert prefetch.get("thing", "https://example.com/thing").json()["url"].endswith("thing")
+        assert get.call_count == 1
+        prefetch.get("thing", "https://example.com/thing")
+        assert get.call_count == 2
+    stats = prefetch.stats()
+    assert (stats["started"], stats["fetched"], stats["hits"], stats["hit_rate"]) == (1, 1, 1, 1.0)
+
+
+def test_caller_waits_for_a_prefetch_in_flight():
+    release = threading.Event()
+
+    def slow(url, **kwargs):
+        release.wait(5)
+        return answer(url, **kwargs)
+
+    with mock.patch.object(upstream.requests, "get", side_effect=slow) as get:
+        prefetch.ahead("get", "thing", "https://example.com/thing")
+        threading.Timer(0.3, release.set).start()
+        response = prefetch.get("thing", "https://example.com/thing")
+    assert response.ok
+    assert get.call_count == 1
+    assert prefetch.stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("failure", ["error", "stale"])
+def test_caller_goes_upstream_when_the_prefetch_in_flight_fails(failure):
+    release = threading.Event()
+    url = "https://example.com/thing"
+    failed = {
+        "error": upstream.Response.from_requests(ResponseMock(False, "busy", status_code=500)),
+        # a response held from before, served while the circuit is open.
+        "stale": upstream.Response.from_requests(ResponseMock(True, "{}")).as_stale(30),
+    }[failure]
+
+    def slow(*args, **kwargs):
+        release.wait(5)
+        return failed
+
+    with mock.patch.object(upstream, "request", side_effect=slow):
+        prefetch.ahead("get", "thing", url)
+    threading.Timer(0.3, release.set).start()
+    with mock.patch.object(upstream, "request", return_value="fetched") as request:
+        assert prefetch.get("thing", url) == "fetched"
+    request.assert_called_once()
+    assert prefetch.stats()["hits"] == 0
+    assert prefetch.stats()["failed"] == 1
+
+
+def test_expired_prefetches_are_not_handed_over(monkeypatch):
+    with mock.patch.object(upstream.requests, "get", side_effect=answer):
+        prefetch.ahead("get", "thing", "https://example.com/thing")
+        prefetch.drain()
+    assert prefetch.stats()["held"] == 1
+    later = prefetch.time.monotonic() + prefetch.PREFETCH_TTL
+    monkeypatch.setattr(prefetch.time, "monotonic", lambda: later)
+    assert (
+        prefetch._prefetcher.take(upstream.request_key("get", "https://example.com/thing")) is None
+    )
+    assert prefetch.stats()["wasted"] == 1
+
+
+def test_budget_and_headroom_bound_prefetches():
+    prefetch.configure(enabled=True, budget=1)
+    with mock.patch.object(upstream.requests, "get", side_effect=answer) as get:
+        prefetch.ahead("get", "thing", "https://example.com/one")
+        prefetch.ahead("get", "thing", "https://example.com/two")
+        prefetch.drain()
+    assert get.call_count == 1
+    assert prefetch.stats()["over_budget"] == 1
+    assert prefetch.stats()["budget_left"] == 0
+
+    prefetch.configure(enabled=True)
+    with mock.patch.object(upstream, "headroom", return_value=False):
+        prefetch.ahead("get", "thing", "https://example.com/one")
+    assert prefetch.stats()["busy"] == 1
+    assert prefetch.stats()["started"] == 0
+
+
+def test_unused_prefetches_are_wasted():
+    prefetch.configure(enabled=True, ttl=0)
+    with mock.patch.object(upstream.requests, "get", side_effect=answer):
+        prefetch.ahead("get", "thing", "https://example.com/thing")
+        prefetch.drain()
+    stats = prefetch.stats()
+    assert (stats["wasted"], stats["held"], stats["hit_rate"]) == (1, 0, 0.0)
+
+    prefetch.configure(enabled=True, entries=1)
+    with mock.patch.object(upstream.requests, "get", side_effect=answer):
+        prefetch.ahead("get", "thing", "https://example.com/one")
+        prefetch.drain()
+        prefetch.ahead("get", "thing", "https://example.com/two")
+        prefetch.drain()
+    assert prefetch.stats()["wasted"] == 1
+
+
+def test_failed_prefetches_are_not_held():
+    with mock.patch.object(upstream.requests, "get", return_value=ResponseMock(False, "no")):
+        prefetch.ahead("get", "thing", "https://example.com/thing")
+        prefetch.drain()
+    with mock.patch.object(upstream.requests, "get", side_effect=OSError("down")):
+        prefetch.ahead("get", "thing", "https://example.com/other")
+        prefetch.drain()
+    assert prefetch.stats()["failed"] == 2
+    assert prefetch.stats()["held"] == 0
+
+
+def test_unknown_settings_are_rejected():
+    with pytest.raises(ValueError, match="Unknown prefetch settings"):
+        prefetch.configure(bogus=1)
+
+
+@pytest.mark.asyncio
+async def test_component_details_prefetches_supported_platforms_and_models():
+    with mock.patch.object(upstream.requests, "get", side_effect=answer) as get:
+        async with Client(hct.mcp) as client:
+            await client.call_tool("component_details", {"component_name": "QSFP-100G-LR4"})
+            prefetch.drain()
+            assert get.call_count == 3
+            platforms = await client.call_tool(
+                "component_supported_platforms", {"component_name": "QSFP-100G-LR4"}
+            )
+            await client.call_tool(
+                "component_supported_models", {"component_name": "QSFP-100G-LR4"}
+            )
+    assert get.call_count == 3
+    assert "supportedPlatforms" in platforms.structured_content["response"]["url"]
+    assert prefetch.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_categories_prefetch_the_first_categories_components():
+    categories = [{"categoryKey": key} for key in range(10)]
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(True, json.dumps(categories))
+    ) as get:
+        async with Client(hct.mcp) as client:
+            await client.call_tool("categories")
+            prefetch.drain()
+    assert get.call_count == 1 + prefetch.PREFETCH_FANOUT
+    assert get.call_args_list[1].args[0].endswith("/model/0")
+
+
+@pytest.mark.asyncio
+async def test_release_models_prefetch_features_of_recent_models():
+    def answer_models(url, **kwargs):
+        return ResponseMock(True, json.dumps([{"platform": "ACX710"}, {"platform": "MX204"}]))
+
+    with mock.patch.object(upstream.requests, "post", side_effect=answer) as post:
+        with mock.patch.object(upstream.requests, "get", side_effect=answer_models):
+            async with Client(feature_explorer.mcp) as client:
+                arguments = {"model": "ACX710", "junos_version": "24.2R1"}
+                await client.call_tool("features_for_model_on_junos_version", arguments)
+                await client.call_tool(
+                    "models_compatible_with_release", {"junos_version": "24.4R1"}
+                )
+                prefetch.drain()
+                assert post.call_count == 2
+                arguments["junos_version"] = "24.4R1"
+                result = await client.call_tool("features_for_model_on_junos_version", arguments)
+    assert post.call_count == 2
+    assert result.structured_content["response"]["json"]["release"] == "24.4R1"
+    assert prefetch.stats()["hits"] == 1
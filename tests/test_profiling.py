@@ -0,0 +1,101 @@
+import json
+import pstats
+import time
+
+import pytest
+from fastmcp import Client, FastMCP
+
+from jnpr_pathfinder_mcp import deadlines, profiling
+
+
+@pytest.fixture(autouse=True)
+def reset_profiling():
+    profiling.configure()
+    yield
+    profiling.configure()
+
+
+def profiled_server():
+    server = FastMCP("profiled")
+
+    @server.tool
+    @deadlines.with_deadline(10)
+    def busy(word: str) -> str:
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            word.upper()
+        return word
+
+    @server.tool
+    @deadlines.with_deadline(10)
+    def quick() -> str:
+        return "done"
+
+    return server
+
+
+def index(directory):
+    return [
+        json.loads(line) for line in (directory / profiling.INDEX_FILE).read_text().splitlines()
+    ]
+
+
+@pytest.mark.asyncio
+async def test_disabled_writes_nothing(tmp_path):
+    async with Client(profiled_server()) as client:
+        await client.call_tool("busy", {"word": "bgp"})
+    assert list(tmp_path.iterdir()) == []
+    assert profiling.stats()["enabled"] is False
+
+
+@pytest.mark.asyncio
+async def test_cprofile_of_selected_tools(tmp_path):
+    profiling.configure(enabled=True, directory=str(tmp_path), tools="busy")
+    async with Client(profiled_server()) as client:
+        await client.call_tool("busy", {"word": "bgp"})
+        await client.call_tool("quick", {})
+    [entry] = index(tmp_path)
+    assert entry["tool"] == "busy"
+    assert entry["arguments"] == {"word": "'bgp'"}
+    assert entry["file"].endswith(".pstats")
+    functions = {name for _, _, name in pstats.Stats(str(tmp_path / entry["file"])).stats}
+    assert "busy" in functions
+    assert profiling.stats()["profiled"] == 1
+    assert profiling.stats()["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sampled_speedscope_profile(tmp_path):
+    profiling.configure(enabled=True, directory=str(tmp_path), mode="sample")
+    async with Client(profiled_server()) as client:
+        await client.call_tool("busy", {"word": "ospf"})
+    [entry] = index(tmp_path)
+    assert entry["file"].endswith(".speedscope.json")
+    document = json.loads((tmp_path / entry["file"]).read_text())
+    [profile] = document["profiles"]
+    assert profile["type"] == "sampled"
+    assert profile["samples"] and len(profile["samples"]) == len(profile["weights"])
+    names = {frame["name"] for frame in document["shared"]["frames"]}
+    assert "busy" in names
+
+
+@pytest.mark.asyncio
+async def test_rate_and_failures(tmp_path):
+    profiling.configure(enabled=True, directory=str(tmp_path), rate=0)
+    async with Client(profiled_server()) as client:
+        await client.call_tool("quick", {})
+    assert not (tmp_path / profiling.INDEX_FILE).exists()
+
+    profiling.configure(enabled=True, directory=str(tmp_path))
+    with pytest.raises(ZeroDivisionError):
+        with profiling.profile("failing", {}):
+            1 / 0
+    [entry] = index(tmp_path)
+    assert entry["tool"] == "failing"
+
+
+def test_configure_rejects_unknown_settings():
+    with pytest.raises(ValueError, match="Unknown profiling settings"):
+        profiling.configure(format="flamegraph")
+    with pytest.raises(ValueError, match="profile mode"):
+        profiling.configure(mode="flamegraph")
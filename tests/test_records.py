@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+from jnpr_pathfinder_mcp import records
+
+
+def test_records_are_read_only_mappings():
+    entry = records.CatalogEntry(family="mx_series", product_key=11320008)
+    assert entry["product_key"] == entry.product_key == 11320008
+    assert entry == {"family": "mx_series", "product_key": 11320008}
+    assert dict(entry) == entry.as_dict()
+    assert entry.get("missing") is None
+    assert records.CatalogEntry(product_key=1).family is None
+    assert "CatalogEntry(family='mx_series'" in repr(entry)
+    with pytest.raises(KeyError):
+        entry["missing"]
+    with pytest.raises(AttributeError):
+        entry.family = "ptx_series"
+    assert not hasattr(entry, "__dict__")
+
+
+def test_repeated_strings_are_shared():
+    first, second = json.loads('[{"category": "Optics"}, {"category": "Optics"}]')
+    assert first["category"] is not second["category"]
+    a = records.Component(name="A", **first)
+    b = records.Component(name="B", **second)
+    assert a.category is b.category
+
+
+def test_records_hold_less_than_dicts():
+    text = json.dumps(
+        [
+            {"platform": f"PLATFORM{n}", "family": f"Family {n % 4}", "series": f"Series {n % 8}"}
+            for n in range(500)
+        ]
+    )
+    as_dicts = records.deep_size(json.loads(text))
+    as_records = records.deep_size([records.Platform(**p) for p in json.loads(text)])
+    assert as_records < as_dicts / 2
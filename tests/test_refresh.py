@@ -0,0 +1,103 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+from fastmcp import Client
+from fastmcp.client.messages import MessageHandler
+
+from jnpr_pathfinder_mcp import refresh, upstream
+from jnpr_pathfinder_mcp.server.pathfinder import mcp as pathfinder_mcp
+
+
+class ResponseMock:
+    def __init__(self, content):
+        self.content = json.dumps(content).encode("utf-8")
+        self.ok = True
+        self.status_code = 200
+        self.headers = {}
+        self.encoding = "utf-8"
+
+
+class Updates(MessageHandler):
+    def __init__(self):
+        self.uris = []
+        self.received = asyncio.Event()
+
+    async def on_resource_updated(self, message):
+        self.uris.append(str(message.params.uri))
+        self.received.set()
+
+
+@pytest.fixture(autouse=True)
+def reset_refresh():
+    yield
+    refresh.engine.entries.clear()
+    refresh._subscriptions.clear()
+
+
+def test_digest_and_diff():
+    old = refresh.digest([{"name": "a", "v": 1}, {"name": "b", "v": 1}, {"name": "c"}])
+    new = refresh.digest([{"name": "a", "v": 1}, {"name": "b", "v": 2}, {"name": "d"}])
+    assert refresh.diff(old, new) == {"added": ["d"], "removed": ["c"], "changed": ["b"]}
+    assert refresh.digest("leaf") == {}
+
+
+def test_refresh_only_stale_entries():
+    engine = refresh.Refresher(interval=3600)
+    documents = [[{"name": "R1"}], [{"name": "R1"}, {"name": "R2"}]]
+    fetch = mock.Mock(side_effect=lambda: upstream.Response(json.dumps(documents[0]), True))
+    engine.track("pathfinder://feature/releases/Junos OS", fetch, fetch())
+    assert fetch.call_count == 1
+
+    assert engine.refresh() == []
+    assert fetch.call_count == 1
+
+    assert engine.refresh(force=True) == []
+    documents.pop(0)
+    [change] = engine.refresh(force=True)
+    assert change["uri"] == "pathfinder://feature/releases/Junos OS"
+    assert change["added"] == ["R2"]
+    assert change["removed"] == change["changed"] == []
+    [status] = engine.status()
+    assert status["entries"] == 2
+    assert status["last_changes"]["added"] == ["R2"]
+
+
+def test_subscriptions_match_prefixed_and_derived_uris():
+    assert refresh._matches("pathfinder://hct/category/1", "pathfinder://hct/category/1")
+    assert refresh._matches(
+        "pathfinder://juniper_hardware_compatibility_tool/hct/category/1",
+        "pathfinder://hct/category/1",
+    )
+    assert refresh._matches("pathfinder://feature/tree/chunk/3", "pathfinder://feature/tree")
+    assert not refresh._matches("pathfinder://hct/category/10", "pathfinder://hct/category/1")
+    assert not refresh._matches("pathfinder://hct/categories", "pathfinder://hct/category/1")
+
+
+@pytest.mark.asyncio
+async def test_subscribers_notified_of_changes():
+    uri = "pathfinder://juniper_hardware_compatibility_tool/hct/category/7"
+    updates = Updates()
+    async with Client(pathfinder_mcp, message_handler=updates) as client:
+        assert client.initialize_result.capabilities.resources.subscribe
+        with mock.patch.object(
+            upstream.requests, "get", return_value=ResponseMock([{"modelName": "A"}])
+        ):
+            await client.read_resource(uri)
+        await client.session.subscribe_resource(uri)
+
+        with mock.patch.object(
+            upstream.requests,
+            "get",
+            return_value=ResponseMock([{"modelName": "A"}, {"modelName": "B"}]),
+        ):
+            result = await client.call_tool("refresh_datasets", {"force": True})
+        [change] = result.structured_content["response"]["changes"]
+        assert change["uri"] == "pathfinder://hct/category/7"
+        assert change["added"] == ["B"]
+        await asyncio.wait_for(updates.received.wait(), timeout=5)
+        assert updates.uris == [uri]
+
+        await client.session.unsubscribe_resource(uri)
+        assert not refresh._subscriptions
@@ -0,0 +1,116 @@
+import json
+from unittest import mock
+
+import pytest
+from fastmcp import Client
+from fastmcp.exceptions import ResourceError
+
+from jnpr_pathfinder_mcp import resources, upstream
+from jnpr_pathfinder_mcp.server.cli_explorer import mcp as cli_explorer_mcp
+from jnpr_pathfinder_mcp.server.feature_explorer import mcp as feature_explorer_mcp
+from jnpr_pathfinder_mcp.server.hct import mcp as hct_mcp
+
+
+class ResponseMock:
+    def __init__(self, ok=True, content=""):
+        self.content = content.encode("utf-8")
+        self.ok = ok
+        self.status_code = 200 if ok else 500
+        self.headers = {}
+        self.encoding = "utf-8"
+
+
+HIERARCHY = {
+    "children": [
+        {
+            "name": "protocols",
+            "description": "Routing protocols",
+            "children": [
+                {"name": "bgp", "description": "BGP", "children": [{"name": "group"}]},
+                {"name": "ospf", "description": "OSPF"},
+            ],
+        },
+        {"name": "interfaces", "children": []},
+    ]
+}
+
+
+async def _read(server, uri):
+    async with Client(server) as client:
+        contents = await client.read_resource(uri)
+    return contents[0].text
+
+
+def test_tree_navigation():
+    assert [name for name, _ in resources.children(HIERARCHY)] == ["protocols", "interfaces"]
+    assert resources.node_at(HIERARCHY, "protocols/BGP")["description"] == "BGP"
+    assert resources.children({"MX": [1], "EX": [2]}) == [("MX", [1]), ("EX", [2])]
+    assert resources.children({"name": "leaf"}) is None
+    with pytest.raises(ResourceError):
+        resources.node_at(HIERARCHY, "protocols/isis")
+    nodes = resources.index(HIERARCHY)
+    assert nodes["protocols/bgp/group"] == {"name": "group"}
+    assert all(nodes[path] is resources.node_at(HIERARCHY, path) for path in nodes)
+
+
+@pytest.mark.asyncio
+async def test_cli_hierarchy_resource():
+    response = ResponseMock(True, json.dumps(HIERARCHY))
+    with mock.patch.object(upstream.requests, "post", return_value=response):
+        top = json.loads(await _read(cli_explorer_mcp, "pathfinder://cli/hierarchy"))
+        assert top["children"] == ["protocols", "interfaces"]
+        node = json.loads(await _read(cli_explorer_mcp, "pathfinder://cli/hierarchy/protocols"))
+        assert node["fields"] == {"name": "protocols", "description": "Routing protocols"}
+        assert node["children"] == ["bgp", "ospf"]
+        leaf = json.loads(
+            await _read(cli_explorer_mcp, "pathfinder://cli/hierarchy/protocols/ospf")
+        )
+        assert leaf["node"] == {"name": "ospf", "description": "OSPF"}
+
+
+@pytest.mark.asyncio
+async def test_cli_hierarchy_nodes_are_read_from_one_copy(monkeypatch):
+    response = ResponseMock(True, json.dumps(HIERARCHY))
+    index = mock.Mock(wraps=resources.index)
+    monkeypatch.setattr(resources, "index", index)
+    with mock.patch.object(upstream.requests, "post", return_value=response) as mock_post:
+        for path in ("protocols", "protocols/bgp", "PROTOCOLS/OSPF", "interfaces"):
+            outline = json.loads(
+                await _read(cli_explorer_mcp, f"pathfinder://cli/hierarchy/{path}")
+            )
+            assert outline["path"] == path
+    assert mock_post.call_count == 1
+    assert index.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_feature_tree_chunks(monkeypatch):
+    monkeypatch.setattr(resources, "CHUNK_CHARS", 100)
+    tree = [{"key": f"F{i}", "name": f"feature {i}"} for i in range(20)]
+    response = ResponseMock(True, json.dumps(tree))
+    with mock.patch.object(upstream.requests, "get", return_value=response) as mock_get:
+        manifest = json.loads(await _read(feature_explorer_mcp, "pathfinder://feature/tree"))
+        assert manifest["chunks"] > 1
+        text = ""
+        for index in range(manifest["chunks"]):
+            uri = manifest["chunk_uri"].format(index=index)
+            text += await _read(feature_explorer_mcp, uri)
+        assert json.loads(text) == tree
+        with pytest.raises(Exception, match="out of range"):
+            await _read(feature_explorer_mcp, "pathfinder://feature/tree/chunk/99")
+    assert mock_get.call_count == manifest["chunks"] + 2
+
+
+@pytest.mark.asyncio
+async def test_hct_category_resource():
+    components = [{"modelName": "QSFP-100G-LR4"}]
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(True, json.dumps(components))
+    ) as mock_get:
+        text = await _read(hct_mcp, "pathfinder://hct/category/100001")
+    assert json.loads(text) == components
+    assert mock_get.call_args[0][0].endswith("/model/100001")
+
+    with mock.patch.object(upstream.requests, "get", return_value=ResponseMock(True, "")):
+        with pytest.raises(Exception, match="Empty response"):
+            await _read(hct_mcp, "pathfinder://hct/category/100001")
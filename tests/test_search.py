@@ -0,0 +1,90 @@
+from jnpr_pathfinder_mcp import search
+
+
+def _index():
+    index = search.TextIndex()
+    index.add("QSFP-100G-LR4", "100GbE QSFP28 optics, 10 km", category="Optics")
+    index.add("QSFP-100G-LR4-T2", "100GbE QSFP28 optics, 10 km, extended temp", category="Optics")
+    index.add("QSFP-400G-DR4", "400GbE QSFP-DD optics, 500 m", category="Optics")
+    index.add("JNP-PWR-AC", "AC power supply", category="Power")
+    return index.freeze()
+
+
+def test_normalize():
+    assert search.normalize("QSFP-100G-LR4") == search.normalize("qsfp100g lr4") == "qsfp100glr4"
+
+
+def test_exact_then_prefix():
+    results = _index().search("qsfp-100g-lr4")
+    assert [(r["name"], r["match"]) for r in results[:2]] == [
+        ("QSFP-100G-LR4", "exact"),
+        ("QSFP-100G-LR4-T2", "prefix"),
+    ]
+    assert results[0]["category"] == "Optics"
+
+
+def test_words_match_descriptions():
+    results = _index().search("power supply")
+    assert results[0]["name"] == "JNP-PWR-AC"
+    assert results[0]["match"] == "words"
+
+
+def test_fuzzy_match_tolerates_typos():
+    results = _index().search("QSFP-400G-DR8")
+    assert results[0]["name"] == "QSFP-400G-DR4"
+    assert results[0]["match"] == "fuzzy"
+    assert not _index().search("completely unrelated")
+
+
+def test_limit():
+    assert len(_index().search("qsfp", limit=2)) == 2
+    assert _index().search("") == []
+
+
+def _corpus(bgp_text="Configure BGP peers."):
+    return [
+        ("h:protocols", "protocols", "Routing protocols", {}),
+        ("h:protocols/bgp", "protocols/bgp", bgp_text, {"kind": "statement"}),
+        ("h:protocols/ospf", "protocols/ospf", "Configure OSPF areas and BGP export.", {}),
+        ("r:show bgp neighbor", "show bgp neighbor", "Display BGP peer state.", {}),
+        ("r:show route", "show route", "Display the routing table.", {}),
+    ]
+
+
+def test_bm25_ranks_path_matches_first():
+    index = search.BM25Index()
+    assert index.update(_corpus()) == {"added": 5, "changed": 0, "removed": 0, "unchanged": 0}
+    total, results = index.search("protocols bgp")
+    assert total == 4
+    assert results[0]["path"] == "protocols/bgp"
+    assert results[0]["kind"] == "statement"
+    assert results[0]["score"] > results[1]["score"]
+    total, results = index.search("bgp neighbor", limit=1)
+    assert total == 3
+    assert [r["path"] for r in results] == ["show bgp neighbor"]
+    assert index.search("isis") == (0, [])
+    assert index.search("") == (0, [])
+    assert search.BM25Index().search("bgp") == (0, [])
+
+
+def test_bm25_paging():
+    index = search.BM25Index()
+    index.update(_corpus())
+    _, everything = index.search("bgp", limit=10)
+    _, second = index.search("bgp", limit=1, offset=1)
+    assert second == everything[1:2]
+
+
+def test_bm25_incremental_update():
+    index = search.BM25Index()
+    index.update(_corpus())
+    corpus = _corpus("Configure BGP groups.")[:-1]
+    assert index.update(corpus) == {"added": 0, "changed": 1, "removed": 1, "unchanged": 3}
+    assert len(index) == 4
+    assert index.search("groups")[1][0]["path"] == "protocols/bgp"
+    assert index.search("peers") == (0, [])
+    assert index.search("table") == (0, [])
+    # the same as an index built from scratch.
+    fresh = search.BM25Index()
+    fresh.update(corpus)
+    assert index.search("bgp configure") == fresh.search("bgp configure")
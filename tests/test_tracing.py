@@ -0,0 +1,109 @@
+import json
+import types
+from unittest import mock
+
+import pytest
+from fastmcp import Client, FastMCP
+
+from jnpr_pathfinder_mcp import cache, deadlines, tracing, upstream
+from jnpr_pathfinder_mcp.server import feature_explorer
+
+sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor  # noqa: E402
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (  # noqa: E402
+    InMemorySpanExporter,
+)
+
+
+@pytest.fixture
+def spans():
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracing.use(provider)
+    yield exporter
+    tracing.disable()
+
+
+def response_mock(body):
+    content = json.dumps(body).encode("utf-8")
+    return types.SimpleNamespace(
+        ok=True,
+        status_code=200,
+        headers={},
+        encoding="utf-8",
+        content=content,
+        iter_content=lambda chunk_size: iter([content]),
+        close=lambda: None,
+    )
+
+
+def traced_server():
+    server = FastMCP("traced")
+
+    @server.tool
+    @deadlines.with_deadline(10)
+    def lookup(name: str) -> dict:
+        return upstream.get("lookup", f"https://example.invalid/{name}").json()
+
+    return server
+
+
+def test_disabled_spans_are_null():
+    with tracing.span("nothing") as span:
+        assert span is None
+        tracing.annotate({"pathfinder.cache.hit": True})
+        tracing.event("retry")
+    assert tracing.enabled() is False
+    assert tracing.install(None) is False
+
+
+@pytest.mark.asyncio
+async def test_tool_call_parents_its_upstream_requests(spans):
+    with mock.patch.object(upstream.requests, "get", return_value=response_mock({"a": 1})):
+        async with Client(traced_server()) as client:
+            await client.call_tool("lookup", {"name": "mx204"})
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    tool, request = finished["tool lookup"], finished["GET lookup"]
+    assert request.parent.span_id == tool.context.span_id
+    assert tool.attributes["mcp.tool.name"] == "lookup"
+    assert request.attributes["pathfinder.url_key"] == "lookup"
+    assert request.attributes["http.response.status_code"] == 200
+    assert request.attributes["http.response.body.size"] == len(b'{"a": 1}')
+    assert request.attributes["pathfinder.conditional"] is False
+
+
+def test_cache_lookups_and_catalog_parse(spans, tmp_path, monkeypatch):
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, str(tmp_path))
+    cache.save_snapshot("catalog", {"mx204": 1})
+    assert cache.load_snapshot("catalog") == {"mx204": 1}
+    assert cache.load_snapshot("missing") is None
+    html = '<span class="plorrel" data-family="MX"><span class="prodBtn" id="pid-7">MX204</span>'
+    assert feature_explorer._parse_page_html(html) == [("MX", "MX204", 7)]
+
+    hit, miss, parse = spans.get_finished_spans()
+    assert hit.name == "cache load_snapshot"
+    assert hit.attributes["pathfinder.cache.hit"] is True
+    assert miss.attributes == {"pathfinder.cache.name": "missing", "pathfinder.cache.hit": False}
+    assert parse.name == "catalog parse feature_explorer_page"
+    assert parse.attributes["pathfinder.catalog.entries"] == 1
+
+
+def test_install_file_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    try:
+        assert tracing.install("file", str(path)) is True
+        with tracing.span("tool lookup", {"mcp.tool.name": "lookup"}):
+            tracing.event("retry", {"pathfinder.delay": 0.5})
+        tracing.flush()
+    finally:
+        tracing.disable()
+    [line] = path.read_text().splitlines()
+    span = json.loads(line)
+    assert span["name"] == "tool lookup"
+    assert span["events"][0]["name"] == "retry"
+
+
+def test_install_rejects_unknown_exporters():
+    with pytest.raises(ValueError, match="trace exporter"):
+        tracing.install("jaeger")
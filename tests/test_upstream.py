@@ -0,0 +1,581 @@
+import json
+import threading
+from unittest import mock
+
+import pytest
+import requests
+from fastmcp import Client
+
+from jnpr_pathfinder_mcp import upstream
+from jnpr_pathfinder_mcp.server.pathfinder import mcp as pathfinder_mcp
+
+
+class ResponseMock:
+    def __init__(self, ok=True, content="", status_code=200, headers=None):
+        self.content = content.encode("utf-8") if isinstance(content, str) else content
+        self.ok = ok
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+
+
+class FakeClock:
+    """Stands in for time.monotonic/time.sleep so waits are instant."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with mock.patch.object(upstream.time, "monotonic", fake.monotonic):
+        with mock.patch.object(upstream.time, "sleep", fake.sleep):
+            yield fake
+
+
+@pytest.fixture(autouse=True)
+def limiter():
+    upstream.configure(rate=0, burst=1, min_concurrency=1, max_concurrency=8, max_retries=3)
+
+
+def test_response_wraps_requests_response():
+    response = upstream.Response.from_requests(ResponseMock(True, json.dumps({"a": 1})))
+    assert response.ok
+    assert response.json() == {"a": 1}
+    assert response.text == '{"a": 1}'
+    response.raise_for_status()
+
+    response = upstream.Response.from_requests(ResponseMock(False, "nope", status_code=404))
+    assert response.text == "nope"
+    with pytest.raises(requests.HTTPError):
+        response.raise_for_status()
+
+
+def test_token_bucket_limits_rate(clock):
+    bucket = upstream.TokenBucket(rate=10, burst=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    # bucket is empty, the next token is 1/rate seconds away
+    assert bucket.acquire() == pytest.approx(0.1)
+    clock.now += 10
+    # refills up to the burst size, no further
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.1)
+
+
+def test_token_bucket_pause(clock):
+    bucket = upstream.TokenBucket(rate=0, burst=1)
+    bucket.pause(5)
+    assert bucket.acquire() == pytest.approx(5)
+    assert bucket.acquire() == 0
+
+
+def test_adaptive_concurrency_aimd():
+    limit = upstream.AdaptiveConcurrency(initial=4, minimum=1, maximum=8, cooldown=0)
+    for _ in range(4):
+        limit.acquire()
+    assert limit.in_flight == 4
+    for _ in range(4):
+        limit.release(congested=False)
+    # additive increase, about one per round
+    assert 4.9 < limit.limit < 5.1
+    limit.acquire()
+    limit.release(congested=True)
+    assert limit.limit == pytest.approx(2.5, abs=0.1)
+    for _ in range(5):
+        limit.acquire()
+        limit.release(congested=True)
+    assert limit.limit == 1
+
+
+def test_adaptive_concurrency_cooldown():
+    limit = upstream.AdaptiveConcurrency(initial=8, minimum=1, maximum=8, cooldown=60)
+    for _ in range(3):
+        limit.acquire()
+    for _ in range(3):
+        limit.release(congested=True)
+    # only the first failure of the round counts
+    assert limit.limit == 4
+
+
+def test_request_honors_retry_after(clock):
+    responses = [
+        ResponseMock(False, "slow down", status_code=429, headers={"Retry-After": "2"}),
+        ResponseMock(True, "{}", status_code=200),
+    ]
+    with mock.patch.object(upstream.requests, "get", side_effect=responses) as mock_get:
+        response = upstream.get("thing", "https://example.com/thing")
+    assert response.ok
+    assert mock_get.call_count == 2
+    assert clock.sleeps == [pytest.approx(2)]
+    endpoint = upstream.stats()["endpoints"]["thing"]
+    assert endpoint["throttled"] == 1
+    assert endpoint["retries"] == 1
+    assert endpoint["requests"] == 2
+
+
+def test_request_gives_up_after_max_retries(clock):
+    upstream.configure(rate=0, burst=1, max_retries=2)
+    with mock.patch.object(
+        upstream.requests, "post", return_value=ResponseMock(False, "down", status_code=503)
+    ) as mock_post:
+        response = upstream.post("thing", "https://example.com/thing", json={})
+    assert not response.ok
+    assert response.status_code == 503
+    assert mock_post.call_count == 3
+
+
+def test_request_does_not_retry_client_errors():
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(False, "missing", status_code=404)
+    ) as mock_get:
+        response = upstream.get("thing", "https://example.com/thing")
+    assert response.status_code == 404
+    assert mock_get.call_count == 1
+    assert upstream.stats()["endpoints"]["thing"]["errors"] == 1
+
+
+def test_request_exceptions_are_raised():
+    with mock.patch.object(
+        upstream.requests, "get", side_effect=requests.exceptions.ConnectionError
+    ):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            upstream.get("thing", "https://example.com/thing")
+    stats = upstream.stats()
+    assert stats["in_flight"] == 0
+    assert stats["endpoints"]["thing"]["errors"] == 1
+
+
+def test_retry_after_http_date():
+    response = upstream.Response(
+        "", ok=False, status_code=429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    )
+    # a date in the past means retry now
+    assert upstream._retry_after(response) == 0
+    response.headers["Retry-After"] = "soon"
+    assert upstream._retry_after(response) is None
+
+
+def test_configure_rejects_unknown_settings():
+    with pytest.raises(ValueError, match="Unknown upstream settings"):
+        upstream.configure(not_a_setting=1)
+
+
+def test_circuit_breaker_opens_probes_and_closes(clock):
+    breaker = upstream.CircuitBreaker(window=4, min_requests=4, error_rate=0.5, reset_seconds=30)
+    for success in (True, True, False):
+        breaker.record(success)
+    assert breaker.state == breaker.CLOSED
+    breaker.record(False)
+    assert breaker.state == breaker.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in() == 30
+
+    clock.now += 30
+    # one probe at a time
+    assert breaker.allow()
+    assert breaker.state == breaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == breaker.OPEN
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == breaker.CLOSED
+    assert breaker.allow()
+
+
+def open_circuit(clock, url):
+    upstream.configure(rate=0, max_retries=0, breaker_window=1, breaker_min_requests=1)
+    with mock.patch.object(upstream.requests, "get", side_effect=requests.ConnectionError):
+        with pytest.raises(requests.ConnectionError):
+            upstream.get("thing", url)
+    clock.now += upstream.BREAKER_RESET_SECONDS
+
+
+@pytest.mark.parametrize("where", ["send", "limiter"])
+def test_cancelled_probe_lets_the_next_caller_probe(clock, where):
+    url = "https://example.com/thing"
+    open_circuit(clock, url)
+    if where == "send":
+        interrupted = mock.patch.object(
+            upstream.requests, "get", side_effect=upstream.deadlines.Cancelled
+        )
+    else:
+        interrupted = mock.patch.object(
+            upstream.Limiter, "acquire", side_effect=upstream.deadlines.DeadlineExceeded
+        )
+    with interrupted:
+        with pytest.raises(upstream.deadlines.Interrupted):
+            upstream.get("thing", url)
+    assert upstream.stats()["endpoints"]["thing"]["circuit"] == "half_open"
+
+    with mock.patch.object(upstream.requests, "get", return_value=ResponseMock(True, "{}")):
+        assert upstream.get("thing", url).ok
+    assert upstream.stats()["endpoints"]["thing"]["circuit"] == "closed"
+
+
+@pytest.mark.parametrize("error", [upstream.deadlines.DeadlineExceeded, requests.ReadTimeout])
+def test_deadline_passing_mid_request_does_not_count_against_upstream(clock, error):
+    upstream.configure(rate=0, max_retries=0, breaker_window=1, breaker_min_requests=1)
+    limit = upstream._limiter.concurrency.limit
+
+    def slow_get(*args, **kwargs):
+        # the body is still arriving when the caller's deadline passes.
+        clock.now += 5
+        raise error
+
+    with (
+        upstream.deadlines.use(upstream.deadlines.Deadline(5)),
+        mock.patch.object(upstream.requests, "get", side_effect=slow_get),
+        pytest.raises(error),
+    ):
+        upstream.get("thing", "https://example.com/thing")
+    endpoint = upstream.stats()["endpoints"]["thing"]
+    assert endpoint["circuit"] == "closed"
+    assert endpoint["errors"] == 0
+    assert upstream._limiter.concurrency.limit >= limit
+    assert upstream._limiter.concurrency.in_flight == 0
+
+
+def test_open_circuit_serves_stale_response(clock):
+    upstream.configure(
+        rate=0, max_retries=0, breaker_window=3, breaker_min_requests=3, breaker_reset_seconds=60
+    )
+    url = "https://example.com/thing"
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(True, '{"fresh": true}')
+    ):
+        response = upstream.get("thing", url)
+        assert not response.stale
+
+    clock.now += 5
+    with mock.patch.object(
+        upstream.requests, "get", side_effect=requests.exceptions.ConnectionError
+    ) as mock_get:
+        for _ in range(2):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                upstream.get("thing", url)
+        # circuit is open now, no request is made
+        response = upstream.get("thing", url)
+        assert mock_get.call_count == 2
+    assert response.stale
+    assert response.age == pytest.approx(5)
+    assert response.json() == {"fresh": True}
+
+    # a request we've never seen has nothing to fall back on
+    response = upstream.get("thing", url, params={"other": 1})
+    assert not response.ok
+    assert response.status_code == 503
+    assert "not retrying for 60s" in response.text
+
+    endpoint = upstream.stats()["endpoints"]["thing"]
+    assert endpoint["circuit"] == "open"
+    assert endpoint["stale"] == 1
+    assert endpoint["rejected"] == 1
+
+
+def test_server_errors_trip_the_breaker_but_client_errors_do_not():
+    upstream.configure(rate=0, max_retries=0, breaker_window=2, breaker_min_requests=2)
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(False, "missing", status_code=404)
+    ):
+        for _ in range(3):
+            upstream.get("thing", "https://example.com/thing")
+    assert upstream.stats()["endpoints"]["thing"]["circuit"] == "closed"
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(False, "oops", status_code=500)
+    ):
+        for _ in range(2):
+            upstream.get("thing", "https://example.com/thing")
+    assert upstream.stats()["endpoints"]["thing"]["circuit"] == "open"
+
+
+def test_stale_entries_are_bounded():
+    upstream.configure(rate=0, stale_entries=2)
+    with mock.patch.object(upstream.requests, "get", return_value=ResponseMock(True, "{}")):
+        for n in range(3):
+            upstream.get("thing", f"https://example.com/{n}")
+    assert upstream.stats()["stale_entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_response_is_marked_in_tool_result():
+    from jnpr_pathfinder_mcp.server.hct import mcp as hct_mcp
+
+    upstream.configure(rate=0, max_retries=0, breaker_window=1, breaker_min_requests=1)
+    async with Client(hct_mcp) as client:
+        with mock.patch.object(
+            upstream.requests, "get", return_value=ResponseMock(True, '[{"key": 1}]')
+        ):
+            result = await client.call_tool("categories")
+            assert not result.structured_content.get("stale")
+        with mock.patch.object(
+            upstream.requests, "get", return_value=ResponseMock(False, "down", status_code=502)
+        ):
+            result = await client.call_tool("categories")
+            assert not result.structured_content.get("success")
+            result = await client.call_tool("categories")
+            assert result.structured_content.get("success")
+            assert result.structured_content.get("stale")
+            assert result.structured_content.get("age_seconds") is not None
+            assert result.structured_content.get("response") == [{"key": 1}]
+
+
+def test_revalidation_reuses_parsed_document():
+    url = "https://example.com/tree"
+    validators = {"ETag": '"v1"', "Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    first = ResponseMock(True, '{"tree": [1, 2, 3]}', headers=validators)
+    with mock.patch.object(upstream.requests, "get", return_value=first) as mock_get:
+        response = upstream.get("tree", url, headers={"User-Agent": "test"})
+        assert "If-None-Match" not in mock_get.call_args[1]["headers"]
+    document = response.json()
+    index = response.derived("index", lambda doc: set(doc["tree"]))
+
+    not_modified = ResponseMock(True, "", status_code=304)
+    with mock.patch.object(upstream.requests, "get", return_value=not_modified) as mock_get:
+        revalidated = upstream.get("tree", url, headers={"User-Agent": "test"})
+        headers = mock_get.call_args[1]["headers"]
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert headers["User-Agent"] == "test"
+    # same document, parsed and indexed once
+    assert revalidated.json() is document
+    assert revalidated.derived("index", lambda doc: pytest.fail("rebuilt")) is index
+
+    changed = ResponseMock(True, '{"tree": [4]}', headers={"ETag": '"v2"'})
+    with mock.patch.object(upstream.requests, "get", return_value=changed):
+        assert upstream.get("tree", url).json() == {"tree": [4]}
+    with mock.patch.object(upstream.requests, "get", return_value=not_modified) as mock_get:
+        upstream.get("tree", url)
+        assert mock_get.call_args[1]["headers"]["If-None-Match"] == '"v2"'
+        assert "If-Modified-Since" not in mock_get.call_args[1]["headers"]
+
+    endpoint = upstream.stats()["endpoints"]["tree"]
+    assert endpoint["not_modified"] == 2
+    assert endpoint["bytes_saved"] == len('{"tree": [1, 2, 3]}') + len('{"tree": [4]}')
+
+
+def test_no_conditional_headers_for_post_or_without_validators():
+    with mock.patch.object(
+        upstream.requests, "post", return_value=ResponseMock(True, "{}", headers={"ETag": "x"})
+    ) as mock_post:
+        upstream.post("thing", "https://example.com/thing", json={})
+        upstream.post("thing", "https://example.com/thing", json={})
+        assert "If-None-Match" not in mock_post.call_args[1]["headers"]
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(True, "{}")
+    ) as mock_get:
+        upstream.get("thing", "https://example.com/thing")
+        upstream.get("thing", "https://example.com/thing")
+        assert "If-None-Match" not in mock_get.call_args[1]["headers"]
+
+
+def test_idempotent_post_is_conditional():
+    url = "https://example.com/tree"
+    first = ResponseMock(True, '{"tree": [1]}', headers={"ETag": '"v1"'})
+    with mock.patch.object(upstream.requests, "post", return_value=first):
+        response = upstream.post("tree", url, json={}, idempotent=True)
+    not_modified = ResponseMock(True, "", status_code=304)
+    with mock.patch.object(upstream.requests, "post", return_value=not_modified) as mock_post:
+        assert upstream.post("tree", url, json={}, idempotent=True) is response
+        assert mock_post.call_args[1]["headers"]["If-None-Match"] == '"v1"'
+        assert "idempotent" not in mock_post.call_args[1]
+        # validators are held per body.
+        upstream.post("tree", url, json={"other": 1}, idempotent=True)
+        assert "If-None-Match" not in mock_post.call_args[1]["headers"]
+
+
+def test_requests_advertise_compression():
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(True, "{}")
+    ) as mock_get:
+        upstream.get("thing", "https://example.com/thing", headers={"User-Agent": "test"})
+    headers = mock_get.call_args[1]["headers"]
+    assert "gzip" in headers["Accept-Encoding"]
+    assert headers["User-Agent"] == "test"
+    # callers can still ask for something else
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(True, "{}")
+    ) as mock_get:
+        upstream.get("thing", "https://example.com/thing", headers={"Accept-Encoding": "identity"})
+    assert mock_get.call_args[1]["headers"]["Accept-Encoding"] == "identity"
+
+
+def test_held_responses_are_compressed():
+    url = "https://example.com/tree"
+    body = json.dumps({"tree": [{"name": f"node-{i}", "children": []} for i in range(500)]})
+    first = ResponseMock(True, body, headers={"ETag": '"v1"'})
+    first.raw = mock.Mock(tell=mock.Mock(return_value=len(body) // 10))
+    with mock.patch.object(upstream.requests, "get", return_value=first):
+        response = upstream.get("tree", url)
+    document = response.json()
+    index = response.derived("names", lambda doc: {node["name"] for node in doc["tree"]})
+
+    with mock.patch.object(
+        upstream.requests, "get", return_value=ResponseMock(True, "", status_code=304)
+    ):
+        revalidated = upstream.get("tree", url)
+    assert revalidated.size == len(body)
+    assert revalidated.stored_size < len(body) / 5
+    assert revalidated.json() == document
+    assert revalidated.derived("names", lambda doc: pytest.fail("rebuilt")) is index
+
+    stats = upstream.stats()
+    assert stats["cache"]["raw_bytes"] == len(body)
+    assert stats["cache"]["stored_bytes"] == revalidated.stored_size
+    assert stats["cache"]["compression_ratio"] > 5
+    endpoint = stats["endpoints"]["tree"]
+    assert endpoint["bytes_received"] == len(body) // 10
+    assert endpoint["bytes_decoded"] == len(body)
+
+
+def test_derived_text_of_held_responses_is_compressed():
+    url = "https://example.com/tree"
+    body = json.dumps({"tree": [{"name": f"node-{i}", "children": []} for i in range(500)]})
+    with mock.patch.object(upstream.requests, "get", return_value=ResponseMock(True, body)):
+        response = upstream.get("tree", url)
+    text = response.derived("serialized", lambda doc: json.dumps(doc, separators=(",", ":")))
+
+    held = upstream._limiter.cached(upstream.request_key("get", url))
+    assert held.derived("serialized", lambda doc: pytest.fail("rebuilt")) == text
+    assert held.raw_size == len(body) + len(text)
+    stats = upstream.stats()["cache"]
+    assert stats["raw_bytes"] == held.raw_size
+    assert stats["stored_bytes"] == held.stored_size < held.raw_size / 5
+
+
+def test_cache_compression_can_be_disabled():
+    upstream.configure(rate=0, cache_compression=False)
+    body = json.dumps({"tree": list(range(1000))})
+    with mock.patch.object(upstream.requests, "get", return_value=ResponseMock(True, body)):
+        upstream.get("tree", "https://example.com/tree")
+    cache = upstream.stats()["cache"]
+    assert cache["stored_bytes"] == cache["raw_bytes"] == len(body)
+    assert cache["compression_ratio"] == 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_stats_tool():
+    with mock.patch.object(upstream.requests, "get", return_value=ResponseMock(True, "{}")):
+        upstream.get("thing", "https://example.com/thing")
+    async with Client(pathfinder_mcp) as client:
+        result = await client.call_tool("upstream_stats")
+        assert result.structured_content.get("success")
+        stats = result.structured_content.get("response")
+        assert stats["endpoints"]["thing"]["requests"] == 1
+        assert "concurrency_limit" in stats
+        assert "admission" in stats
+        assert "search_cache" in stats
+
+
+def slow_then_fast(first_answer, release):
+    """requests.get whose first call waits for `release`, the others answer at once."""
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            release.wait(5)
+            return ResponseMock(True, json.dumps(first_answer))
+        return ResponseMock(True, json.dumps({"answer": "hedge"}))
+
+    return get, calls
+
+
+def seed_latency(key, seconds=0.01):
+    upstream._limiter.endpoint(key).samples.extend([seconds] * upstream.HEDGE_MIN_SAMPLES)
+
+
+def test_slow_request_is_hedged_and_the_first_answer_wins():
+    upstream.configure(rate=0, max_concurrency=32, hedge_keys="component_details", hedge_budget=1)
+    seed_latency("component_details")
+    release = threading.Event()
+    get, calls = slow_then_fast({"answer": "first"}, release)
+    try:
+        with (
+            mock.patch.object(upstream.requests, "get", side_effect=get),
+            mock.patch.object(
+                upstream.Limiter, "acquire", autospec=True, side_effect=upstream.Limiter.acquire
+            ) as acquire,
+        ):
+            response = upstream.get("component_details", "https://example.com/details")
+    finally:
+        release.set()
+    assert response.json() == {"answer": "hedge"}
+    assert len(calls) == 2
+    endpoint = upstream.stats()["endpoints"]["component_details"]
+    assert endpoint["hedged"] == 1
+    assert endpoint["hedge_wins"] == 1
+    # the hedge took its own rate token and concurrency slot, and gave the slot back.
+    assert acquire.call_count == 2
+    assert upstream._limiter.concurrency.in_flight == 0
+
+
+def test_hedge_waits_for_an_ok_response():
+    upstream.configure(rate=0, max_concurrency=32, hedge_keys="component_details", hedge_budget=1)
+    seed_latency("component_details")
+    release = threading.Event()
+    threading.Timer(0.2, release.set).start()
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            release.wait(5)
+            return ResponseMock(True, json.dumps({"answer": "first"}))
+        return ResponseMock(False, "busy", status_code=503)
+
+    with mock.patch.object(upstream.requests, "get", side_effect=get):
+        response = upstream.get("component_details", "https://example.com/details")
+    assert response.json() == {"answer": "first"}
+    assert len(calls) == 2
+    assert upstream.stats()["endpoints"]["component_details"]["hedge_wins"] == 0
+
+
+def test_hedged_gets_are_retried():
+    upstream.configure(rate=0, max_concurrency=32, hedge_keys="component_details", hedge_budget=1)
+    seed_latency("component_details", seconds=5)
+    answers = [
+        ResponseMock(False, "busy", status_code=503, headers={"Retry-After": "0"}),
+        ResponseMock(True, json.dumps({"answer": "retried"})),
+    ]
+    with mock.patch.object(upstream.requests, "get", side_effect=answers) as mock_get:
+        response = upstream.get("component_details", "https://example.com/details")
+    assert response.json() == {"answer": "retried"}
+    assert mock_get.call_count == 2
+    assert upstream.stats()["endpoints"]["component_details"]["retries"] == 1
+
+
+def test_hedges_are_limited_by_the_budget():
+    upstream.configure(rate=0, max_concurrency=32, hedge_keys="component_details", hedge_budget=0)
+    seed_latency("component_details")
+    release = threading.Event()
+    threading.Timer(0.2, release.set).start()
+    get, calls = slow_then_fast({"answer": "first"}, release)
+    with mock.patch.object(upstream.requests, "get", side_effect=get):
+        response = upstream.get("component_details", "https://example.com/details")
+    assert response.json() == {"answer": "first"}
+    assert len(calls) == 1
+    assert upstream.stats()["endpoints"]["component_details"]["hedged"] == 0
+
+
+def test_hedge_after_a_percentile_of_recent_gets():
+    upstream.configure(hedge_keys="component_details,feature_details", hedge_percentile=90)
+    assert upstream._limiter.hedge_after("get", "component_details") is None
+    upstream._limiter.endpoint("component_details").samples.extend(x / 100 for x in range(100))
+    assert upstream._limiter.hedge_after("get", "component_details") == 0.9
+    assert upstream._limiter.hedge_after("post", "component_details") is None
+    seed_latency("platform_information")
+    assert upstream._limiter.hedge_after("get", "platform_information") is None